@@ -0,0 +1,97 @@
+"""Compare loading Movies and Comments through the repositories' bulk add_articles and add_comments with adding them one at a time.
+
+    $ python benchmarks/bulk_load.py --articles 1000000 --comments 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, clear_mappers
+
+from chillax.adapters.database_repository import SqlAlchemyRepository
+from chillax.adapters.memory_repository import MemoryRepository
+from chillax.adapters.orm import metadata, map_model_to_tables
+from chillax.domain.model import Movies, User, make_comment
+
+
+def make_articles(count: int):
+    start = date(1950, 1, 1)
+    return [
+        Movies(start + timedelta(days=random.randrange(25000)), f'Movie {id}', 'About it', 'link', 'image', id)
+        for id in range(1, count + 1)
+    ]
+
+
+def make_comments(repo, count: int):
+    # Comments all by one User on one Movies, the case in which checking each Comment's links against the others costs
+    # the most.
+    user = repo.get_user('commenter')
+    article = repo.get_article(1)
+    return [make_comment(f'Comment {number}', user, article) for number in range(count)]
+
+
+def repository_for_comments(repo):
+    repo.add_article(Movies(date(2020, 1, 1), 'Movie', 'About it', 'link', 'image', 1))
+    repo.add_user(User('commenter', 'Password123'))
+    return repo
+
+
+def timed(label: str, count: int, load, unit: str = 'movies'):
+    started = time.perf_counter()
+    load()
+    elapsed = time.perf_counter() - started
+    print(f'{label:<40} {count:>9} {unit:<8} {elapsed:8.2f} s {count / elapsed:12.0f} {unit}/s')
+
+
+def database_repository():
+    clear_mappers()
+    engine = create_engine('sqlite://')
+    metadata.create_all(engine)
+    map_model_to_tables()
+    return SqlAlchemyRepository(sessionmaker(bind=engine))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--articles', type=int, default=1000000, help='number of movies loaded in bulk')
+    parser.add_argument('--comments', type=int, default=100000, help='number of comments loaded in bulk')
+    parser.add_argument('--single', type=int, default=20000, help='number of movies and comments added one at a time')
+    args = parser.parse_args()
+
+    repo = MemoryRepository()
+    timed('memory, add_article', args.single, lambda: [repo.add_article(a) for a in make_articles(args.single)])
+    repo = MemoryRepository()
+    articles = make_articles(args.articles)
+    timed('memory, add_articles', args.articles, lambda: repo.add_articles(articles))
+
+    single = max(args.single // 10, 1)
+    repo = database_repository()
+    timed('database, add_article', single, lambda: [repo.add_article(a) for a in make_articles(single)])
+    repo = database_repository()
+    articles = make_articles(args.articles)
+    timed('database, add_articles', args.articles, lambda: repo.add_articles(articles))
+
+    repo = repository_for_comments(MemoryRepository())
+    comments = make_comments(repo, args.single)
+    timed('memory, add_comment', args.single, lambda: [repo.add_comment(c) for c in comments], 'comments')
+    repo = repository_for_comments(MemoryRepository())
+    comments = make_comments(repo, args.comments)
+    timed('memory, add_comments', args.comments, lambda: repo.add_comments(comments), 'comments')
+
+    repo = repository_for_comments(database_repository())
+    comments = make_comments(repo, single)
+    timed('database, add_comment', single, lambda: [repo.add_comment(c) for c in comments], 'comments')
+    repo = repository_for_comments(database_repository())
+    comments = make_comments(repo, args.comments)
+    timed('database, add_comments', args.comments, lambda: repo.add_comments(comments), 'comments')
+
+
+if __name__ == '__main__':
+    main()
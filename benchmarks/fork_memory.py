@@ -0,0 +1,111 @@
+"""Measure per-worker memory growth of a memory repository shared with forked worker processes.
+
+The master process loads the catalogue (optionally frozen, as with FREEZE_REPOSITORY) and forks workers, as a
+pre-forking server does with --preload. Each worker then reads the whole catalogue and runs the garbage collector, as
+request handling would, and reports how much of the master's memory it had to copy (its private dirty pages).
+
+Linux only, since it reads /proc/self/smaps_rollup.
+
+    $ python benchmarks/fork_memory.py --workers 4 --copies 20
+    $ python benchmarks/fork_memory.py --workers 4 --copies 20 --freeze
+"""
+
+import argparse
+import gc
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from chillax.adapters import memory_repository
+from chillax.adapters.memory_repository import MemoryRepository
+from chillax.domain.model import Movies, Tag, make_tag_association
+from chillax.news.services import articles_to_dict
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'chillax', 'adapters', 'data')
+
+
+def memory_usage():
+    # Returns the process's Rss, Pss and Private_Dirty, in kB.
+    usage = dict()
+    with open('/proc/self/smaps_rollup') as smaps:
+        for line in smaps:
+            fields = line.split()
+            if fields[0] in ('Rss:', 'Pss:', 'Private_Dirty:'):
+                usage[fields[0][:-1]] = int(fields[1])
+    return usage
+
+
+def load(repo: MemoryRepository, copies: int):
+    memory_repository.populate(DATA_PATH, repo)
+
+    # Grow the catalogue with copies of the loaded Movies, so that its size dominates the interpreter's own.
+    originals = list(repo._articles)
+    tags = dict()
+    for copy in range(1, copies):
+        for article in originals:
+            duplicate = Movies(
+                article.date, article.title + f' ({copy})', article.first_para, article.hyperlink,
+                article.image_hyperlink, article.id + copy * 100000
+            )
+            for tag in article.tags:
+                if tag.tag_name not in tags:
+                    tags[tag.tag_name] = Tag(tag.tag_name + ' copies')
+                make_tag_association(duplicate, tags[tag.tag_name])
+            repo.add_article(duplicate)
+
+
+def work(repo: MemoryRepository):
+    # What a worker's requests do to the catalogue: read every Movies, convert it, and collect garbage.
+    for article in list(repo._articles):
+        articles_to_dict([article])
+    gc.collect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--copies', type=int, default=20, help='number of copies of the 1000-movie catalogue to load')
+    parser.add_argument('--freeze', action='store_true', help='freeze the loaded catalogue, as FREEZE_REPOSITORY does')
+    args = parser.parse_args()
+
+    repo = MemoryRepository()
+    if args.freeze:
+        gc.disable()
+    load(repo, args.copies)
+    if args.freeze:
+        gc.freeze()
+        gc.enable()
+    else:
+        gc.collect()
+
+    master = memory_usage()
+    print(f'catalogue: {repo.get_number_of_articles()} movies, freeze={args.freeze}')
+    print(f'master: Rss {master["Rss"]} kB')
+
+    pipes = list()
+    for worker in range(args.workers):
+        read_end, write_end = os.pipe()
+        if os.fork() == 0:
+            os.close(read_end)
+            before = memory_usage()
+            work(repo)
+            after = memory_usage()
+            growth = after['Private_Dirty'] - before['Private_Dirty']
+            os.write(write_end, f'{growth} {after["Pss"]}'.encode())
+            os._exit(0)
+        os.close(write_end)
+        pipes.append(read_end)
+
+    total = 0
+    for worker, read_end in enumerate(pipes):
+        os.wait()
+        growth, pss = (int(value) for value in os.read(read_end, 64).split())
+        total += growth
+        print(f'worker {worker}: private dirty growth {growth} kB, Pss {pss} kB')
+
+    print(f'mean per-worker growth: {total // args.workers} kB')
+
+
+if __name__ == '__main__':
+    main()
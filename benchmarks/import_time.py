@@ -0,0 +1,85 @@
+"""Report the cost of importing the application and creating it, from python -X importtime, for each repository mode.
+
+    $ python benchmarks/import_time.py --modes memory database --top 15
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Run in a fresh interpreter, so that nothing has been imported already.
+BOOT = """
+import time
+started = time.perf_counter()
+from chillax import create_app
+create_app()
+print(f'BOOT {time.perf_counter() - started}')
+"""
+
+# Packages whose import cost is reported as a whole.
+PACKAGES = (
+    'flask', 'werkzeug', 'jinja2', 'sqlalchemy', 'aiosqlite', 'asyncio', 'wtforms', 'flask_wtf', 'better_profanity',
+    'password_validator', 'orjson', 'dotenv', 'chillax'
+)
+
+
+def import_times(mode: str):
+    # Returns the seconds taken to import the application and create it in mode, and the self and cumulative import
+    # times, in microseconds, of each module imported.
+    with tempfile.TemporaryDirectory() as database_dir:
+        # A database of its own, so that the report doesn't touch chillax.db.
+        database_uri = 'sqlite:///' + os.path.join(database_dir, 'chillax.db')
+        environment = dict(os.environ, REPOSITORY=mode, SQLALCHEMY_DATABASE_URI=database_uri, PYTHONPATH=ROOT)
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', BOOT], cwd=ROOT, env=environment, capture_output=True, text=True
+        )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+
+    boot = next(float(line.split()[1]) for line in result.stdout.splitlines() if line.startswith('BOOT '))
+    modules = list()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return boot, modules
+
+
+def report(mode: str, top: int):
+    boot, modules = import_times(mode)
+    total = sum(self_us for _, self_us, _ in modules)
+
+    packages = defaultdict(int)
+    for name, self_us, _ in modules:
+        package = name.split('.')[0]
+        if package in PACKAGES:
+            packages[package] += self_us
+
+    print(f'{mode} mode: create_app, imports included, {boot * 1000:.0f} ms; '
+          f'{len(modules)} modules imported in {total / 1000:.0f} ms')
+    print('  by package (self time):')
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1]):
+        print(f'    {package:<24} {self_us / 1000:8.1f} ms')
+    print(f'  slowest {top} imports (cumulative):')
+    for name, _, cumulative_us in sorted(modules, key=lambda module: -module[2])[:top]:
+        print(f'    {name:<48} {cumulative_us / 1000:8.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modes', nargs='+', default=['memory', 'database'], help='repository modes reported')
+    parser.add_argument('--top', type=int, default=15, help='number of slowest imports listed')
+    args = parser.parse_args()
+
+    for mode in args.modes:
+        report(mode, args.top)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Compare the compiled profanity filter with better_profanity, which the comment validator used before.
+
+    $ python benchmarks/profanity.py --comments 2000
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from better_profanity import profanity
+
+from chillax.news import moderation
+
+VOCABULARY = (
+    'the movie was a great watch with a gripping plot and superb acting though the ending dragged on for far too '
+    'long I would watch it again with friends classic scenes memorable score'
+).split()
+
+
+def make_comments(count: int, words_per_comment: int, profane_share: float):
+    wordlist = moderation.read_wordlist(moderation.DEFAULT_WORDLIST)
+    comments = list()
+    for _ in range(count):
+        words = random.choices(VOCABULARY, k=words_per_comment)
+        if random.random() < profane_share:
+            words[random.randrange(len(words))] = random.choice(wordlist)
+        comments.append(' '.join(words))
+    return comments
+
+
+def timed(label: str, count: int, check):
+    started = time.perf_counter()
+    flagged = check()
+    elapsed = time.perf_counter() - started
+    print(f'{label:<40} {count:>7} comments {elapsed:8.3f} s {count / elapsed:12.0f} comments/s  {flagged} flagged')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--comments', type=int, default=2000, help='number of comments checked')
+    parser.add_argument('--words', type=int, default=40, help='words per comment')
+    parser.add_argument('--profane', type=float, default=0.05, help='share of comments with a profane word')
+    args = parser.parse_args()
+
+    random.seed(235)
+    comments = make_comments(args.comments, args.words, args.profane)
+
+    # Load both wordlists before timing.
+    profanity.load_censor_words()
+    moderation.default_filter()
+
+    timed('better_profanity.contains_profanity', args.comments,
+          lambda: sum(profanity.contains_profanity(comment) for comment in comments))
+    timed('ProfanityFilter.contains_profanity', args.comments,
+          lambda: sum(moderation.contains_profanity(comment) for comment in comments))
+    timed('ProfanityFilter.find_profane (batch)', args.comments,
+          lambda: len(moderation.default_filter().find_profane(comments)))
+
+    # Compile from scratch, rather than from the re module's cache.
+    re.purge()
+    started = time.perf_counter()
+    moderation.ProfanityFilter(moderation.read_wordlist(moderation.DEFAULT_WORDLIST))
+    print(f'compiling the wordlist {time.perf_counter() - started:.3f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,29 @@
 """Initialize Flask app."""
 
+import time
+
+_import_started = time.perf_counter()
+
+import atexit
+import logging
 import os
 
 from flask import Flask
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, clear_mappers
-from sqlalchemy.pool import NullPool
-
 import chillax.adapters.repository as repo
-from chillax.adapters import memory_repository, database_repository
-from chillax.adapters.orm import metadata, map_model_to_tables
+import chillax.adapters.async_repository as async_repo
+from chillax.adapters import memory_repository, caching_repository
+from chillax.authentication import policy
+from chillax.utilities import boot, templates
+
+# The time taken to import the application, reported as the first phase of booting it.
+_import_seconds = time.perf_counter() - _import_started
 
 
 def create_app(test_config=None):
     """Construct the core application."""
+    timings = boot.BootTimings()
+    timings.record('import', _import_seconds)
 
     # Create the Flask app object.
     app = Flask(__name__)
@@ -28,15 +37,59 @@ def create_app(test_config=None):
         app.config.from_mapping(test_config)
         data_path = app.config['TEST_DATA_PATH']
 
+    if not app.logger.level:
+        # Outside debug mode, Flask's logger takes the root logger's level, WARNING, which would drop the boot timings
+        # logged at INFO; a level set by logging configuration is kept.
+        app.logger.setLevel(logging.INFO)
+
+    template_cache_dir = app.config.get('TEMPLATE_CACHE_DIR')
+    if template_cache_dir:
+        # Share compiled templates between workers, and across restarts. A relative directory is in the instance folder.
+        templates.use_bytecode_cache(app, os.path.join(app.instance_path, template_cache_dir))
+
+    # Optionally profile populating the repository, writing the stats to a file in the instance folder.
+    profile_path = app.config.get('PROFILE_POPULATE')
+    if profile_path:
+        os.makedirs(app.instance_path, exist_ok=True)
+        profile_path = os.path.join(app.instance_path, profile_path)
+    timings.mark('config')
+
     # Here the "magic" of our repository pattern happens. We can easily switch between in memory data and
     # persistent database data storage for our application.
 
+    # The number of recent comments either repository keeps in memory for the recent-activity feed.
+    recent_comments_size = int(app.config.get('RECENT_COMMENTS_SIZE') or 50)
+
     if app.config['REPOSITORY'] == 'memory':
         # Create the MemoryRepository instance for a memory-based repository.
-        repo.repo_instance = memory_repository.MemoryRepository()
-        memory_repository.populate(data_path, repo.repo_instance)
+        thread_safe = app.config.get('REPOSITORY_THREAD_SAFE') in (True, 'True')
+        repo.repo_instance = memory_repository.MemoryRepository(
+            thread_safe=thread_safe, recent_comments_size=recent_comments_size
+        )
+
+        with boot.profiled(profile_path):
+            if app.config.get('FREEZE_REPOSITORY') in (True, 'True'):
+                # Load the catalogue so that pre-forked workers share it with the master process.
+                memory_repository.populate_shared(data_path, repo.repo_instance, timings)
+            else:
+                memory_repository.populate(data_path, repo.repo_instance, timings)
+
+        # The async repository, for async views, shares the same Movies, Users and Comments.
+        async_repo.repo_instance = async_repo.AsyncMemoryRepository(repo.repo_instance)
+        timings.mark('repository')
 
     elif app.config['REPOSITORY'] == 'database':
+        # SQLAlchemy and the database adapters are only imported when they are used, so that workers serving the
+        # memory repository start without them.
+        from sqlalchemy import create_engine
+        from sqlalchemy.engine.url import make_url
+        from sqlalchemy.orm import sessionmaker, clear_mappers
+        from sqlalchemy.pool import NullPool
+
+        from chillax.adapters import database_repository, async_database_repository
+        from chillax.adapters.orm import metadata, map_model_to_tables
+        timings.mark('import database adapters')
+
         # Configure database.
         database_uri = app.config['SQLALCHEMY_DATABASE_URI']
 
@@ -47,29 +100,73 @@ def create_app(test_config=None):
         database_echo = app.config['SQLALCHEMY_ECHO']
         database_engine = create_engine(database_uri, connect_args={"check_same_thread": False}, poolclass=NullPool,
                                         echo=database_echo)
+        timings.mark('engine')
 
-        if app.config['TESTING'] == 'True' or len(database_engine.table_names()) == 0:
+        # The database persists across restarts: it is only reloaded from the CSV files when asked to, or when it has
+        # no tables yet. Otherwise startup just checks it against what it was populated with.
+        repopulate = app.config.get('REPOPULATE_DATABASE') in (True, 'True')
+        if repopulate or not database_repository.has_tables(database_engine):
             print("---REPOPULATING DATABASE---")
-            # For testing, or first-time use of the web application, reinitialise the database.
             clear_mappers()
-            metadata.create_all(database_engine)  # Conditionally create database tables.
-            for table in reversed(metadata.sorted_tables):  # Remove any data from the tables.
-                database_engine.execute(table.delete())
+            metadata.drop_all(database_engine)
+            metadata.create_all(database_engine)
+            timings.mark('schema')
 
             # Generate mappings that map domain model classes to the database tables.
             map_model_to_tables()
+            timings.mark('mappers')
 
-            database_repository.populate(database_engine, data_path)
+            with boot.profiled(profile_path):
+                database_repository.populate(database_engine, data_path, timings)
 
         else:
+            # Verify the schema version and row counts, rather than reloading the data. A database made with other
+            # tables can't be served, so SchemaVersionException is left to stop the application.
+            for problem in database_repository.check_database(database_engine, data_path):
+                app.logger.warning(problem)
+            timings.mark('schema')
+
             # Solely generate mappings that map domain model classes to the database tables.
+            clear_mappers()
             map_model_to_tables()
+            timings.mark('mappers')
 
         # Create the database session factory using sessionmaker (this has to be done once, in a global manner)
         session_factory = sessionmaker(autocommit=False, autoflush=True, bind=database_engine)
+
+        comment_writer = None
+        if app.config.get('COMMENT_WRITE_BEHIND') in (True, 'True'):
+            # Queue new comments and write them in batches from a background thread, rather than committing each
+            # one while the request waits. Whatever is still queued is written when the interpreter exits.
+            comment_writer = database_repository.CommentWriter(
+                session_factory,
+                flush_interval=float(app.config.get('COMMENT_FLUSH_INTERVAL') or 0.5),
+                max_queue_size=int(app.config.get('COMMENT_QUEUE_SIZE') or 1024)
+            )
+            atexit.register(comment_writer.close)
+
         # Create the SQLAlchemy DatabaseRepository instance for an sqlite3-based repository.
-        repo.repo_instance = database_repository.SqlAlchemyRepository(session_factory)
+        repo.repo_instance = database_repository.SqlAlchemyRepository(
+            session_factory, comment_writer, recent_comments_size=recent_comments_size
+        )
 
+        # The async repository, for async views, queries the same SQLite file through aiosqlite. An in-memory database
+        # can't be shared with a second connection, so there is no async repository for one.
+        database_path = make_url(database_uri).database
+        if database_path not in (None, '', ':memory:'):
+            async_repo.repo_instance = async_database_repository.AsyncSqliteRepository(database_path)
+        else:
+            async_repo.repo_instance = None
+        timings.mark('repository')
+
+    if app.config.get('REPOSITORY_CACHE') in (True, 'True'):
+        # Wrap either kind of repository in a read-through cache, taking repeated reads off the backing store.
+        cache_size = int(app.config.get('REPOSITORY_CACHE_SIZE') or 1024)
+        repo.repo_instance = caching_repository.CachingRepository(repo.repo_instance, maxsize=cache_size)
+
+    # Build the credential policy once, with the usernames already taken, for every registration to share.
+    policy.policy_instance = policy.CredentialPolicy(repo.repo_instance.get_usernames())
+    timings.mark('credential policy')
 
     # Build the application - these steps require an application context.
     with app.app_context():
@@ -87,17 +184,74 @@ def create_app(test_config=None):
         from .utilities import utilities
         app.register_blueprint(utilities.utilities_blueprint)
 
+        from .watchlist import watchlist
+        app.register_blueprint(watchlist.watchlist_blueprint)
+
+        # Pages post plain forms, such as the watchlist buttons on each movie, which need the session's CSRF token.
+        from flask_wtf.csrf import generate_csrf
+
+        @app.context_processor
+        def inject_csrf_token():
+            return dict(csrf_token=generate_csrf)
+
+        from .api import api
+        app.register_blueprint(api.api_blueprint)
+
+        from .admin import admin
+        app.register_blueprint(admin.admin_blueprint)
+
+        # Register commands, e.g. flask import-users users.csv.
+        from .authentication import user_import
+        app.cli.add_command(user_import.import_users_command)
+        timings.mark('blueprints')
+
+        if app.config.get('PRECOMPILE_TEMPLATES') in (True, 'True'):
+            # Compile every template now, so that a new worker serves its first requests as fast as later ones.
+            templates.precompile_templates(app)
+            timings.mark('templates')
+
+        if app.config.get('FINGERPRINT_STATIC') in (True, 'True'):
+            # Link to static files by content-hashed names, which browsers can cache for good, and serve them
+            # precompressed.
+            from .utilities import assets
+            manifest = assets.AssetManifest(app.static_folder)
+            app.url_defaults(manifest.url_defaults)
+            app.view_functions['static'] = manifest.send_asset
+            app.cli.add_command(assets.build_assets_command)
+            timings.mark('static assets')
+
+        if app.config.get('COMPRESS_RESPONSES') in (True, 'True'):
+            # Compress generated pages and JSON for clients that accept gzip or Brotli.
+            from .utilities import compression
+            minimum_size = int(app.config.get('COMPRESS_MIN_SIZE') or compression.MIN_COMPRESS_SIZE)
+
+            @app.after_request
+            def compress_response(response):
+                return compression.compress_response(response, minimum_size)
+
         # Register a callback the makes sure that database sessions are associated with http requests
         # We reset the session inside the database repository before a new flask request is generated
+        # (only the database repository has sessions, and its module is only imported in database mode)
         @app.before_request
         def before_flask_http_request_function():
-            if isinstance(repo.repo_instance, database_repository.SqlAlchemyRepository):
+            if hasattr(_backing_repository(), 'reset_session'):
                 repo.repo_instance.reset_session()
 
         # Register a tear-down method that will be called after each request has been processed.
         @app.teardown_appcontext
         def shutdown_session(exception=None):
-            if isinstance(repo.repo_instance, database_repository.SqlAlchemyRepository):
+            if hasattr(_backing_repository(), 'close_session'):
                 repo.repo_instance.close_session()
 
+    # Report how long each phase of booting took, in the log and at /admin/boot.
+    app.extensions['boot_timings'] = timings
+    app.logger.info(timings.summary())
+
     return app
+
+
+def _backing_repository():
+    # Look through the read-through cache, if enabled, to the repository that actually stores the data.
+    if isinstance(repo.repo_instance, caching_repository.CachingRepository):
+        return repo.repo_instance.repository
+    return repo.repo_instance
@@ -0,0 +1,274 @@
+import asyncio
+from datetime import date, datetime
+from typing import List
+
+import aiosqlite
+
+from chillax.adapters.async_repository import AbstractAsyncRepository
+from chillax.adapters.database_repository import TIMESTAMP_FORMAT
+from chillax.adapters.repository import CatalogueBounds
+from chillax.adapters.tag_dictionary import normalize_tag_name
+from chillax.domain.model import User, Movies, Comment, Tag
+
+
+class AsyncSqliteRepository(AbstractAsyncRepository):
+    """ An aiosqlite-backed repository over the same SQLite database (and tables) as SqlAlchemyRepository.
+
+    Queries run on aiosqlite's connection thread while the event loop serves other requests. Entities are plain domain
+    objects rather than ORM instances: Movies come with their Tags and Comments, but Tags only list the Movies they
+    were loaded with, Users are loaded without their Comments and get_tags() returns Tags without their Movies (use
+    get_article_ids_for_tag instead).
+
+    Coroutines share one connection, and so one transaction at a time: writes hold a lock from their first statement
+    to their commit, so that one coroutine's commit never includes another's half-done write.
+    """
+
+    def __init__(self, database_path: str):
+        self._database_path = database_path
+        self._connection = None
+        self._write_lock = asyncio.Lock()
+
+    async def connect(self):
+        if self._connection is None:
+            self._connection = await aiosqlite.connect(self._database_path)
+        return self._connection
+
+    async def close(self):
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def _fetchall(self, sql: str, parameters=()):
+        connection = await self.connect()
+        async with connection.execute(sql, parameters) as cursor:
+            return await cursor.fetchall()
+
+    async def _fetchone(self, sql: str, parameters=()):
+        connection = await self.connect()
+        async with connection.execute(sql, parameters) as cursor:
+            return await cursor.fetchone()
+
+    async def _write(self, sql: str, parameters=()):
+        connection = await self.connect()
+        async with self._write_lock:
+            await connection.execute(sql, parameters)
+            await connection.commit()
+
+    async def add_user(self, user: User):
+        await self._write('INSERT INTO users (username, password) VALUES (?, ?)', (user.username, user.password))
+
+    async def get_user(self, username) -> User:
+        row = await self._fetchone('SELECT username, password FROM users WHERE username = ?', (username,))
+        if row is None:
+            return None
+        return User(row[0], row[1])
+
+    async def add_article(self, article: Movies):
+        await self._write(
+            'INSERT INTO articles (id, date, title, first_para, hyperlink, image_hyperlink) VALUES (?, ?, ?, ?, ?, ?)',
+            (article.id, article.date.isoformat(), article.title, article.first_para, article.hyperlink,
+             article.image_hyperlink)
+        )
+
+    async def get_article(self, id: int) -> Movies:
+        articles = await self._load_articles('WHERE id = ?', (id,))
+        return articles[0] if len(articles) > 0 else None
+
+    async def get_articles_by_date(self, target_date: date) -> List[Movies]:
+        if target_date is None:
+            return await self._load_articles('ORDER BY date, id')
+        return await self._load_articles('WHERE date = ? ORDER BY id', (target_date.isoformat(),))
+
+    async def get_number_of_articles(self):
+        row = await self._fetchone('SELECT COUNT(*) FROM articles')
+        return row[0]
+
+    async def get_first_article(self) -> Movies:
+        articles = await self._load_articles('ORDER BY date ASC, id ASC LIMIT 1')
+        return articles[0] if len(articles) > 0 else None
+
+    async def get_last_article(self) -> Movies:
+        articles = await self._load_articles('ORDER BY date DESC, id DESC LIMIT 1')
+        return articles[0] if len(articles) > 0 else None
+
+    async def get_catalogue_bounds(self) -> CatalogueBounds:
+        first = await self._fetchone('SELECT id, date FROM articles ORDER BY date ASC, id ASC LIMIT 1')
+        if first is None:
+            return None
+        last = await self._fetchone('SELECT id, date FROM articles ORDER BY date DESC, id DESC LIMIT 1')
+        return CatalogueBounds(date.fromisoformat(first[1]), date.fromisoformat(last[1]), first[0], last[0])
+
+    async def get_articles_by_id(self, id_list):
+        id_list = list(id_list)
+        if len(id_list) == 0:
+            return list()
+        placeholders = ', '.join('?' * len(id_list))
+        articles = await self._load_articles(f'WHERE id IN ({placeholders})', id_list)
+
+        # Return the Movies in the order of id_list, as the other repositories do.
+        articles_by_id = {article.id: article for article in articles}
+        return [articles_by_id[id] for id in id_list if id in articles_by_id]
+
+    async def get_article_ids_for_tag(self, tag_name: str):
+        rows = await self._fetchall(
+            'SELECT article_tags.article_id FROM article_tags JOIN tags ON tags.id = article_tags.tag_id '
+            'WHERE tags.name = ? ORDER BY article_tags.article_id ASC',
+            (normalize_tag_name(tag_name),)
+        )
+        return [row[0] for row in rows]
+
+    async def get_date_of_previous_article(self, article: Movies):
+        row = await self._fetchone(
+            'SELECT date FROM articles WHERE date < ? ORDER BY date DESC LIMIT 1', (article.date.isoformat(),)
+        )
+        return None if row is None else date.fromisoformat(row[0])
+
+    async def get_date_of_next_article(self, article: Movies):
+        row = await self._fetchone(
+            'SELECT date FROM articles WHERE date > ? ORDER BY date ASC LIMIT 1', (article.date.isoformat(),)
+        )
+        return None if row is None else date.fromisoformat(row[0])
+
+    async def add_tag(self, tag: Tag):
+        connection = await self.connect()
+        async with self._write_lock:
+            cursor = await connection.execute('INSERT INTO tags (name) VALUES (?)', (tag.tag_name,))
+            await connection.executemany(
+                'INSERT INTO article_tags (article_id, tag_id) VALUES (?, ?)',
+                [(article.id, cursor.lastrowid) for article in tag.tagged_articles]
+            )
+            await connection.commit()
+
+    async def get_tags(self) -> List[Tag]:
+        rows = await self._fetchall('SELECT id, name FROM tags ORDER BY id')
+        return [Tag(row[1], row[0]) for row in rows]
+
+    async def add_comment(self, comment: Comment):
+        await super().add_comment(comment)
+        await self._write(
+            'INSERT INTO comments (user_id, article_id, comment, timestamp) '
+            'SELECT id, ?, ?, ? FROM users WHERE username = ?',
+            (comment.article.id, comment.comment, comment.timestamp.strftime(TIMESTAMP_FORMAT), comment.user.username)
+        )
+
+    async def get_comments(self):
+        # Comments are loaded along with their Movies, so that each is linked to its Movies and User.
+        rows = await self._fetchall('SELECT DISTINCT article_id FROM comments')
+        articles = await self.get_articles_by_id([row[0] for row in rows])
+        return [comment for article in articles for comment in article.comments]
+
+    async def get_comments_for_article(self, article_id: int, before: datetime = None,
+                                       limit: int = None) -> List[Comment]:
+        # The same range scan of the (article_id, timestamp) index as SqlAlchemyRepository's pages. The Comments are
+        # linked to a Movies loaded without its other Comments.
+        select_comments = (
+            'SELECT comments.id, users.username, users.password, comments.comment, comments.timestamp '
+            'FROM comments JOIN users ON users.id = comments.user_id WHERE comments.article_id = ?'
+        )
+        parameters = [article_id]
+        if before is not None:
+            select_comments += ' AND comments.timestamp < ?'
+            parameters.append(before.strftime(TIMESTAMP_FORMAT))
+        select_comments += ' ORDER BY comments.timestamp DESC, comments.id DESC'
+        if limit is not None:
+            select_comments += ' LIMIT ?'
+            parameters.append(limit)
+        rows = await self._fetchall(select_comments, parameters)
+
+        if limit is not None and len(rows) == limit:
+            # Don't end the page part way through Comments that share a timestamp.
+            rows.extend(await self._fetchall(
+                'SELECT comments.id, users.username, users.password, comments.comment, comments.timestamp '
+                'FROM comments JOIN users ON users.id = comments.user_id '
+                'WHERE comments.article_id = ? AND comments.timestamp = ? AND comments.id < ? '
+                'ORDER BY comments.id DESC',
+                (article_id, rows[-1][4], rows[-1][0])
+            ))
+
+        row = await self._fetchone(
+            'SELECT id, date, title, first_para, hyperlink, image_hyperlink FROM articles WHERE id = ?', (article_id,)
+        )
+        if row is None:
+            return list()
+        article = Movies(date.fromisoformat(row[1]), row[2], row[3], row[4], row[5], row[0])
+
+        users = dict()
+        comments = list()
+        for _, username, password, comment_text, timestamp in rows:
+            user = users.setdefault(username, User(username, password))
+            comments.append(link_comment(comment_text, user, article, datetime.fromisoformat(timestamp)))
+        return comments
+
+    async def _load_articles(self, clause: str, parameters=()):
+        # Loads the Movies selected by clause, then their Tags and Comments with one query each.
+        rows = await self._fetchall(
+            f'SELECT id, date, title, first_para, hyperlink, image_hyperlink FROM articles {clause}', parameters
+        )
+        articles = [
+            Movies(date.fromisoformat(row[1]), row[2], row[3], row[4], row[5], row[0]) for row in rows
+        ]
+        if len(articles) == 0:
+            return articles
+
+        articles_by_id = {article.id: article for article in articles}
+        placeholders = ', '.join('?' * len(articles_by_id))
+        ids = list(articles_by_id.keys())
+
+        tags = dict()
+        tag_rows = await self._fetchall(
+            'SELECT article_tags.article_id, tags.id, tags.name '
+            'FROM article_tags JOIN tags ON tags.id = article_tags.tag_id '
+            f'WHERE article_tags.article_id IN ({placeholders}) ORDER BY article_tags.id',
+            ids
+        )
+        for article_id, tag_id, tag_name in tag_rows:
+            if tag_id not in tags:
+                tags[tag_id] = Tag(tag_name, tag_id)
+            link_tag(articles_by_id[article_id], tags[tag_id])
+
+        users = dict()
+        comment_rows = await self._fetchall(
+            'SELECT comments.article_id, users.username, users.password, comments.comment, comments.timestamp '
+            'FROM comments JOIN users ON users.id = comments.user_id '
+            f'WHERE comments.article_id IN ({placeholders}) ORDER BY comments.id',
+            ids
+        )
+        for article_id, username, password, comment_text, timestamp in comment_rows:
+            if username not in users:
+                users[username] = User(username, password)
+            link_comment(comment_text, users[username], articles_by_id[article_id], datetime.fromisoformat(timestamp))
+
+        return articles
+
+
+# The domain classes are instrumented while they are mapped by the ORM (database mode), and the ORM's backrefs then
+# complete each link as soon as one side is set. These helpers are the counterparts of make_comment and
+# make_tag_association that don't link an entity twice in that case.
+
+def link_comment(comment_text: str, user: User, article: Movies, timestamp: datetime):
+    comment = Comment(user, article, comment_text, timestamp)
+    if not any(linked is comment for linked in user.comments):
+        user.add_comment(comment)
+    if not any(linked is comment for linked in article.comments):
+        article.add_comment(comment)
+    else:
+        # The backref appended the Comment without going through add_comment, which counts it.
+        article._number_of_comments += 1
+    return comment
+
+
+def link_tag(article: Movies, tag: Tag):
+    if not any(linked is tag for linked in article.tags):
+        article.add_tag(tag)
+    else:
+        # As for a Comment, the backref appended the Tag without counting it.
+        article._number_of_tags += 1
+    if not any(linked is article for linked in tag.tagged_articles):
+        tag.add_article(article)
@@ -0,0 +1,170 @@
+import abc
+from typing import List
+from datetime import date, datetime
+
+from chillax.adapters.repository import CatalogueBounds, RepositoryException
+from chillax.adapters.memory_repository import MemoryRepository
+from chillax.domain.model import User, Movies, Tag, Comment
+
+
+repo_instance = None
+
+
+class AbstractAsyncRepository(abc.ABC):
+    """ Async counterpart of AbstractRepository, for use from async views or an ASGI server.
+
+    Each method is a coroutine with the same meaning, arguments and result as the AbstractRepository method of the
+    same name, so that I/O-bound requests wait on the event loop rather than holding a worker.
+    """
+
+    @abc.abstractmethod
+    async def add_user(self, user: User):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def get_user(self, username) -> User:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def add_article(self, article: Movies):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def get_article(self, id: int) -> Movies:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def get_articles_by_date(self, target_date: date) -> List[Movies]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def get_number_of_articles(self):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def get_first_article(self) -> Movies:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def get_last_article(self) -> Movies:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def get_catalogue_bounds(self) -> CatalogueBounds:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def get_articles_by_id(self, id_list):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def get_article_ids_for_tag(self, tag_name: str):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def get_date_of_previous_article(self, article: Movies):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def get_date_of_next_article(self, article: Movies):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def add_tag(self, tag: Tag):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def get_tags(self) -> List[Tag]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def add_comment(self, comment: Comment):
+        """ Adds a Comment to the repository.
+
+        If the Comment doesn't have bidirectional links with an Movies and a User, this method raises a
+        RepositoryException and doesn't update the repository.
+        """
+        if comment.user is None or not any(linked is comment for linked in comment.user.comments):
+            raise RepositoryException('Comment not correctly attached to a User')
+        if comment.article is None or not any(linked is comment for linked in comment.article.comments):
+            raise RepositoryException('Comment not correctly attached to an Movie')
+
+    @abc.abstractmethod
+    async def get_comments(self):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def get_comments_for_article(self, article_id: int, before: datetime = None,
+                                       limit: int = None) -> List[Comment]:
+        """ Returns a page of the Comments on the Movies with article_id, newest first.
+
+        Pages as AbstractRepository.get_comments_for_article does.
+        """
+        raise NotImplementedError
+
+
+class AsyncMemoryRepository(AbstractAsyncRepository):
+    # Every MemoryRepository operation completes without blocking, so the coroutines simply delegate. Share the
+    # MemoryRepository with threaded (sync) views only if it was created with thread_safe set.
+
+    def __init__(self, repo: MemoryRepository):
+        self._repo = repo
+
+    @property
+    def repository(self) -> MemoryRepository:
+        return self._repo
+
+    async def add_user(self, user: User):
+        self._repo.add_user(user)
+
+    async def get_user(self, username) -> User:
+        return self._repo.get_user(username)
+
+    async def add_article(self, article: Movies):
+        self._repo.add_article(article)
+
+    async def get_article(self, id: int) -> Movies:
+        return self._repo.get_article(id)
+
+    async def get_articles_by_date(self, target_date: date) -> List[Movies]:
+        return self._repo.get_articles_by_date(target_date)
+
+    async def get_number_of_articles(self):
+        return self._repo.get_number_of_articles()
+
+    async def get_first_article(self) -> Movies:
+        return self._repo.get_first_article()
+
+    async def get_last_article(self) -> Movies:
+        return self._repo.get_last_article()
+
+    async def get_catalogue_bounds(self) -> CatalogueBounds:
+        return self._repo.get_catalogue_bounds()
+
+    async def get_articles_by_id(self, id_list):
+        return self._repo.get_articles_by_id(id_list)
+
+    async def get_article_ids_for_tag(self, tag_name: str):
+        return self._repo.get_article_ids_for_tag(tag_name)
+
+    async def get_date_of_previous_article(self, article: Movies):
+        return self._repo.get_date_of_previous_article(article)
+
+    async def get_date_of_next_article(self, article: Movies):
+        return self._repo.get_date_of_next_article(article)
+
+    async def add_tag(self, tag: Tag):
+        self._repo.add_tag(tag)
+
+    async def get_tags(self) -> List[Tag]:
+        return self._repo.get_tags()
+
+    async def add_comment(self, comment: Comment):
+        self._repo.add_comment(comment)
+
+    async def get_comments(self):
+        return self._repo.get_comments()
+
+    async def get_comments_for_article(self, article_id: int, before: datetime = None,
+                                       limit: int = None) -> List[Comment]:
+        return self._repo.get_comments_for_article(article_id, before, limit)
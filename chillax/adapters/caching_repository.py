@@ -0,0 +1,316 @@
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import date
+from typing import List, Iterable, Tuple, Set
+
+from chillax.adapters.repository import AbstractRepository, CatalogueBounds, RecentComment
+from chillax.domain.model import User, Movies, Tag, Comment
+
+
+# Sentinel used to distinguish a cached None from a cache miss.
+_MISSING = object()
+
+
+class LRUCache:
+    """ A bounded, thread-safe least-recently-used mapping. """
+
+    def __init__(self, maxsize: int = 1024):
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=_MISSING):
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CachingRepository(AbstractRepository):
+    """ Read-through cache that wraps any concrete AbstractRepository.
+
+    Read results are memoized in bounded LRUs. Every cache key embeds a generation number; a write bumps the
+    generation of the keys it affects, so stale entries are never served and simply age out of the LRU.
+
+    The generations only count this process's writes. A wrapped repository whose data other processes (e.g. other
+    workers) can change exposes data_version(); refresh() drops every entry when it has changed, and is called at the
+    start of each request, by reset_session().
+    """
+
+    def __init__(self, repo: AbstractRepository, maxsize: int = 1024):
+        self._repo = repo
+        self._lock = threading.Lock()
+
+        # Generation counters. The catalogue generation covers anything that depends on the set of Movies (dates,
+        # counts, first/last); the per-key counters cover individual Movies and Users.
+        self._catalogue_generation = 0
+        self._tags_generation = 0
+        self._article_generations = defaultdict(int)
+        self._user_generations = defaultdict(int)
+
+        self._articles = LRUCache(maxsize)
+        self._users = LRUCache(maxsize)
+        self._catalogue = LRUCache(maxsize)
+        self._tags = LRUCache(maxsize)
+
+        # The wrapped repository's data version when the caches were last known to be fresh, and the number of times
+        # they have been dropped since: an entry loaded while they were dropped isn't put back.
+        self._data_version = getattr(repo, 'data_version', None)
+        self._seen_data_version = self._data_version() if self._data_version is not None else None
+        self._epoch = 0
+
+        # Entities handed out by the SQLAlchemy adapter are bound to a per-request session. When the wrapped
+        # repository knows how to re-attach a cached entity to the current session it exposes adopt().
+        self._adopt = getattr(repo, 'adopt', None)
+
+    @property
+    def repository(self) -> AbstractRepository:
+        return self._repo
+
+    def _bump(self, counters=None, key=None, catalogue=False, tags=False):
+        with self._lock:
+            if counters is not None:
+                counters[key] += 1
+            if catalogue:
+                self._catalogue_generation += 1
+            if tags:
+                self._tags_generation += 1
+
+    def refresh(self):
+        # Drops every cached entry if the wrapped repository's data has changed since it was last checked.
+        if self._data_version is None:
+            return
+        version = self._data_version()
+        with self._lock:
+            if version == self._seen_data_version:
+                return
+            self._seen_data_version = version
+            self._epoch += 1
+        self.clear()
+
+    def reset_session(self):
+        # Called at the start of each request, so that a request sees the changes made before it by other processes.
+        self.refresh()
+        reset_session = getattr(self._repo, 'reset_session', None)
+        if reset_session is not None:
+            reset_session()
+
+    def _put(self, cache: LRUCache, key, value, epoch: int):
+        # Caches a value loaded during epoch, unless the caches have been dropped since it was loaded.
+        with self._lock:
+            if epoch == self._epoch:
+                cache.put(key, value)
+
+    def _attach(self, value):
+        # Only domain entities need adopting; counts, dates and id lists are plain values.
+        if self._adopt is None:
+            return value
+        if isinstance(value, list):
+            return [self._attach(item) for item in value]
+        if isinstance(value, (User, Movies, Tag, Comment)):
+            return self._adopt(value)
+        return value
+
+    def _cached(self, cache: LRUCache, key, loader):
+        value = cache.get(key)
+        if value is _MISSING:
+            epoch = self._epoch
+            value = loader()
+            self._put(cache, key, value, epoch)
+            return value
+        return self._attach(value)
+
+    def _cached_article(self, key, loader):
+        # Catalogue reads that return Movies cache only their ids, and look the Movies up through the per-article
+        # cache, whose entries are invalidated when a Movies' Comments or Tags change; the catalogue generation isn't.
+        article_id = self._catalogue.get(key)
+        if article_id is _MISSING:
+            epoch = self._epoch
+            article = loader()
+            self._put(self._catalogue, key, None if article is None else article.id, epoch)
+            return article
+        return None if article_id is None else self.get_article(article_id)
+
+    def add_user(self, user: User):
+        self._repo.add_user(user)
+        self._bump(self._user_generations, user.username)
+
+    def get_user(self, username) -> User:
+        key = (username, self._user_generations.get(username, 0))
+        return self._cached(self._users, key, lambda: self._repo.get_user(username))
+
+    def get_usernames(self) -> List[str]:
+        return self._repo.get_usernames()
+
+    def add_article(self, article: Movies):
+        self._repo.add_article(article)
+        self._bump(self._article_generations, article.id, catalogue=True)
+
+    def get_article(self, id: int) -> Movies:
+        key = (id, self._article_generations.get(id, 0))
+        return self._cached(self._articles, key, lambda: self._repo.get_article(id))
+
+    def get_articles_by_date(self, target_date: date) -> List[Movies]:
+        # As for _cached_article, only the ids are cached.
+        key = ('by_date', target_date, self._catalogue_generation)
+        ids = self._catalogue.get(key)
+        if ids is _MISSING:
+            epoch = self._epoch
+            articles = self._repo.get_articles_by_date(target_date)
+            self._put(self._catalogue, key, [article.id for article in articles], epoch)
+            return articles
+        return self.get_articles_by_id(ids)
+
+    def get_number_of_articles(self):
+        key = ('count', self._catalogue_generation)
+        return self._cached(self._catalogue, key, self._repo.get_number_of_articles)
+
+    def get_first_article(self) -> Movies:
+        key = ('first', self._catalogue_generation)
+        return self._cached_article(key, self._repo.get_first_article)
+
+    def get_last_article(self) -> Movies:
+        key = ('last', self._catalogue_generation)
+        return self._cached_article(key, self._repo.get_last_article)
+
+    def get_catalogue_bounds(self) -> CatalogueBounds:
+        key = ('bounds', self._catalogue_generation)
+        return self._cached(self._catalogue, key, self._repo.get_catalogue_bounds)
+
+    def get_articles_by_id(self, id_list):
+        # Serve what we can from the per-article cache and fetch the misses in a single call. Generations are read
+        # before loading so that a concurrent write can't leave a stale entry under a current key.
+        epoch = self._epoch
+        generations = {id: self._article_generations.get(id, 0) for id in id_list}
+        found = dict()
+        missing = list()
+        for id, generation in generations.items():
+            article = self._articles.get((id, generation))
+            if article is _MISSING:
+                missing.append(id)
+            else:
+                found[id] = article
+
+        if len(missing) > 0:
+            for article in self._repo.get_articles_by_id(missing):
+                self._put(self._articles, (article.id, generations[article.id]), article, epoch)
+                found[article.id] = article
+
+        # Preserve the wrapped repository's semantics: ids that don't exist are dropped.
+        return self._attach([found[id] for id in id_list if id in found and found[id] is not None])
+
+    def get_article_ids_for_tag(self, tag_name: str):
+        key = ('ids_for_tag', tag_name, self._tags_generation)
+        return self._cached(self._tags, key, lambda: self._repo.get_article_ids_for_tag(tag_name))
+
+    def get_date_of_previous_article(self, article: Movies):
+        key = ('previous_date', article.date, self._catalogue_generation)
+        return self._cached(self._catalogue, key, lambda: self._repo.get_date_of_previous_article(article))
+
+    def get_date_of_next_article(self, article: Movies):
+        key = ('next_date', article.date, self._catalogue_generation)
+        return self._cached(self._catalogue, key, lambda: self._repo.get_date_of_next_article(article))
+
+    def add_tag(self, tag: Tag):
+        self._repo.add_tag(tag)
+        # Tagging changes the Tags listed on each affected Movies.
+        for article in tag.tagged_articles:
+            self._bump(self._article_generations, article.id)
+        self._bump(tags=True)
+
+    def get_tags(self) -> List[Tag]:
+        key = ('tags', self._tags_generation)
+        return self._cached(self._tags, key, self._repo.get_tags)
+
+    def add_comment(self, comment: Comment):
+        self._repo.add_comment(comment)
+        self._bump(self._article_generations, comment.article.id)
+        self._bump(self._user_generations, comment.user.username)
+
+    def get_comments(self):
+        # Comments are unbounded and rarely read in bulk, so they are not cached.
+        return self._repo.get_comments()
+
+    def get_comments_for_article(self, article_id: int, before=None, limit: int = None) -> List[Comment]:
+        # Each page is a single indexed range scan in the wrapped repository, so pages are not cached either.
+        return self._repo.get_comments_for_article(article_id, before, limit)
+
+    def get_comments_by_user(self, username: str, before=None, limit: int = None) -> List[Comment]:
+        return self._repo.get_comments_by_user(username, before, limit)
+
+    def get_recent_comments(self, limit: int = None) -> List[RecentComment]:
+        # The wrapped repository already keeps these in memory.
+        return self._repo.get_recent_comments(limit)
+
+    def get_trending_article_ids(self, window: str, limit: int = 10) -> List[Tuple[int, int]]:
+        # As are these, and they change with every Comment.
+        return self._repo.get_trending_article_ids(window, limit)
+
+    # Watchlists are small per-user structures that the wrapped repository already reads cheaply, so they pass through.
+
+    def add_to_watchlist(self, username: str, article_id: int):
+        self._repo.add_to_watchlist(username, article_id)
+
+    def remove_from_watchlist(self, username: str, article_id: int):
+        self._repo.remove_from_watchlist(username, article_id)
+
+    def get_watchlist(self, username: str) -> List[int]:
+        return self._repo.get_watchlist(username)
+
+    def get_watchlisted_article_ids(self, username: str, article_ids: Iterable[int]) -> Set[int]:
+        return self._repo.get_watchlisted_article_ids(username, article_ids)
+
+    def add_users(self, users: Iterable[User]):
+        users = list(users)
+        self._repo.add_users(users)
+        for user in users:
+            self._bump(self._user_generations, user.username)
+
+    def add_articles(self, articles: Iterable[Movies]):
+        articles = list(articles)
+        self._repo.add_articles(articles)
+        for article in articles:
+            self._bump(self._article_generations, article.id)
+        self._bump(catalogue=True)
+
+    def add_tags(self, tags: Iterable[Tag]):
+        tags = list(tags)
+        self._repo.add_tags(tags)
+        for tag in tags:
+            for article in tag.tagged_articles:
+                self._bump(self._article_generations, article.id)
+        self._bump(tags=True)
+
+    def add_comments(self, comments: Iterable[Comment]):
+        comments = list(comments)
+        self._repo.add_comments(comments)
+        for comment in comments:
+            self._bump(self._article_generations, comment.article.id)
+            self._bump(self._user_generations, comment.user.username)
+
+    def clear(self):
+        for cache in (self._articles, self._users, self._catalogue, self._tags):
+            cache.clear()
+
+    def __getattr__(self, name):
+        # Forward adapter-specific methods (e.g. reset_session/close_session) to the wrapped repository.
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._repo, name)
@@ -1,11 +1,21 @@
 import csv
+import functools
+import hashlib
+import json
+import logging
 import os
+import queue
+import sqlite3
+import threading
 
-from datetime import date
-from typing import List
+from collections import Counter, deque
+from datetime import date, datetime
+from typing import List, Iterable, Optional, Tuple, Set
 
-from sqlalchemy import desc, asc
+from sqlalchemy import desc, asc, func, inspect, select
 from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.orm.exc import NoResultFound, MultipleResultsFound
 from werkzeug.security import generate_password_hash
 
@@ -13,10 +23,38 @@ from sqlalchemy.orm import scoped_session
 from flask import _app_ctx_stack
 
 from chillax.domain.model import User, Movies, Comment, Tag
-from chillax.adapters.repository import AbstractRepository
-
+from chillax.adapters.tag_dictionary import TagDictionary, normalize_tag_name, split_tag_names
+from chillax.adapters.trending import TrendingCounters, TRENDING_WINDOWS
+from chillax.adapters.repository import (
+    AbstractRepository, CatalogueBounds, RepositoryException, RecentComment, RecentComments, check_comment_links
+)
+from chillax.adapters.orm import (
+    users as users_table, articles as articles_table, tags as tags_table, article_tags as article_tags_table,
+    comments as comments_table, watchlist as watchlist_table, schema_version as schema_version_table, SCHEMA_VERSION
+)
+from chillax.utilities.boot import BootTimings
+
+# While populating: the Tag names interned as ids, which become the keys of the tags table, and each Tag id -> ids of
+# the articles with the Tag.
+tag_dictionary = None
 tags = None
 
+logger = logging.getLogger(__name__)
+
+# The format in which SQLAlchemy stores DateTime values in SQLite. Timestamps written without the ORM use it too, so
+# that they compare correctly with those in queries.
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+# SQLite limits the number of parameters in one statement (999 in older versions), which bounds the rows per batch.
+SQLITE_MAX_VARIABLES = 999
+
+# The CSV files, in the data path, from which the database is populated.
+SOURCE_FILES = ('Data1000Movies.csv', 'users.csv', 'comments.csv')
+
+
+class SchemaVersionException(RepositoryException):
+    pass
+
 
 class SessionContextManager:
     def __init__(self, session_factory):
@@ -50,41 +88,282 @@ class SessionContextManager:
             self.__session.close()
 
 
+class CommentWriter:
+    """ Writes Comments to the database in batches, from a background thread.
+
+    Queued Comments are inserted in a single transaction per flush, at most flush_interval seconds after they were
+    queued. The queue is bounded: once it holds max_queue_size Comments, put() blocks until the next flush.
+
+    If a batch fails, its rows are written one at a time, so that a bad row doesn't hold back the others. Each failure
+    is logged. A row that fails is retried by later flushes, after the newly queued rows, and dropped into
+    dead_letters once it has failed max_attempts times. While as many rows as the queue holds are waiting to be
+    retried, flushes don't take any more from the queue, so that put() blocks rather than the retries piling up.
+
+    Closing the writer writes what is still queued, and gives each row waiting to be retried its remaining attempts.
+    Once it is closed, put() raises RepositoryException, as does a put() still waiting for room in the queue.
+    """
+
+    def __init__(self, session_factory, flush_interval: float = 0.5, max_queue_size: int = 1024,
+                 max_attempts: int = 3):
+        self._session_factory = session_factory
+        self._flush_interval = flush_interval
+        self._max_queue_size = max_queue_size
+        self._max_attempts = max_attempts
+        self._queue = queue.Queue(maxsize=max_queue_size)
+
+        # (row, number of failed attempts) for rows that failed to be written, and the rows given up on.
+        self._unwritten = list()
+        self.dead_letters = deque(maxlen=max_queue_size)
+        self._flush_lock = threading.Lock()
+
+        # Numbers of queued Comments per article id and per username, so that readers can tell whether what they
+        # are about to load is missing any.
+        self._pending = Counter()
+        self._pending_lock = threading.Lock()
+
+        # Held while a row is queued and while the writer closes, so that no row is queued after the last flush.
+        self._close_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='comment-writer', daemon=True)
+        self._thread.start()
+
+    def put(self, comment: Comment):
+        if self._closed.is_set():
+            raise RepositoryException('Comment writer is closed')
+
+        row = {
+            'user_id': comment.user.id,
+            'article_id': comment.article.id,
+            'comment': comment.comment,
+            'timestamp': comment.timestamp,
+            'username': comment.user.username
+        }
+        with self._pending_lock:
+            self._pending[('article', row['article_id'])] += 1
+            self._pending[('user', row['username'])] += 1
+        while True:
+            with self._close_lock:
+                if self._closed.is_set():
+                    break
+                try:
+                    self._queue.put_nowait(row)
+                    return
+                except queue.Full:
+                    pass
+            # The queue is full until the next flush, or until the writer closes.
+            self._closed.wait(self._flush_interval)
+
+        self._done([row])
+        raise RepositoryException('Comment writer is closed')
+
+    def has_pending(self, article_ids=(), usernames=()) -> bool:
+        """ Returns True if Comments on any of the given Movies, or by any of the given Users, are still queued. """
+        with self._pending_lock:
+            return any(('article', id) in self._pending for id in article_ids) or \
+                   any(('user', username) in self._pending for username in usernames)
+
+    def flush(self):
+        """ Writes every Comment queued so far, returning once they are committed or have failed. """
+        with self._flush_lock:
+            retries = self._unwritten
+            self._unwritten = list()
+            batch = list()
+            while len(batch) + len(retries) < self._max_queue_size:
+                try:
+                    batch.append((self._queue.get_nowait(), 0))
+                except queue.Empty:
+                    break
+            batch.extend(retries)
+
+            if len(batch) == 0:
+                return
+
+            try:
+                self._write([row for row, _ in batch])
+                written = batch
+            except Exception:
+                logger.exception('Failed to write %d queued comments; writing them one at a time', len(batch))
+                written = list()
+                for row, attempts in batch:
+                    try:
+                        self._write([row])
+                        written.append((row, attempts))
+                    except Exception:
+                        self._failed(row, attempts + 1)
+
+            self._done(row for row, _ in written)
+
+    def close(self):
+        """ Stops the background thread and writes any Comments that are still queued or waiting to be retried.
+
+        Rows that still fail are retried until they have failed max_attempts times, then dropped into dead_letters.
+        """
+        with self._close_lock:
+            self._closed.set()
+        self._thread.join()
+        # Each flush writes or fails every row it takes, and nothing more is queued, so this ends.
+        while len(self._unwritten) > 0 or not self._queue.empty():
+            self.flush()
+
+    def _write(self, rows: List[dict]):
+        session = self._session_factory()
+        try:
+            session.execute(comments_table.insert(), rows)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _failed(self, row: dict, attempts: int):
+        if attempts < self._max_attempts:
+            logger.warning('Failed to write a comment by %s on movie %s (attempt %d of %d)',
+                           row['username'], row['article_id'], attempts, self._max_attempts, exc_info=True)
+            self._unwritten.append((row, attempts))
+        else:
+            logger.error('Giving up on a comment by %s on movie %s after %d attempts',
+                         row['username'], row['article_id'], attempts, exc_info=True)
+            self.dead_letters.append(row)
+            self._done([row])
+
+    def _done(self, rows: Iterable[dict]):
+        # The rows are no longer queued, whether written or given up on.
+        with self._pending_lock:
+            for row in rows:
+                for key in (('article', row['article_id']), ('user', row['username'])):
+                    self._pending[key] -= 1
+                    if self._pending[key] <= 0:
+                        del self._pending[key]
+
+    def _run(self):
+        while not self._closed.wait(self._flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                # flush() handles failed writes itself, so this is unexpected; keep the writer running.
+                logger.exception('Comment writer failed to flush')
+
+
 class SqlAlchemyRepository(AbstractRepository):
 
-    def __init__(self, session_factory):
+    def __init__(self, session_factory, comment_writer: CommentWriter = None, recent_comments_size: int = 50,
+                 trending: TrendingCounters = None):
+        self._session_factory = session_factory
+        if comment_writer is not None:
+            # Queued Comments are written by the CommentWriter, so a query mustn't flush them as a side effect.
+            session_factory = functools.partial(session_factory, autoflush=False)
         self._session_cm = SessionContextManager(session_factory)
+        self._comment_writer = comment_writer
+        self._catalogue_bounds = None
+
+        # The last Comments added, for the recent-activity feed, and the counts behind trending Movies are kept in
+        # memory, so that reading them doesn't query the database. Both are built from the Comments already stored.
+        # Each process has its own, so Comments added by other processes only appear once they are rebuilt (on
+        # restart, or for the trending counters by calling rebuild_trending).
+        self._recent_comments = RecentComments(recent_comments_size)
+        self._recent_comments.extend(load_recent_comments(self._session_factory, recent_comments_size))
+        self._trending = trending if trending is not None else TrendingCounters()
+        self.rebuild_trending()
+
+        self._data_version_connection = connect_for_data_version(self._session_factory)
+        self._data_version_lock = threading.Lock()
+
+    def data_version(self) -> Optional[int]:
+        """ Returns a number that changes whenever the database is changed through any other connection, e.g. by
+        another process, or None for an in-memory database, which no other process can change.
+
+        It is SQLite's data_version, asked of a connection kept for the purpose, which changes with every commit made
+        through the sessions of this repository too.
+        """
+        if self._data_version_connection is None:
+            return None
+        with self._data_version_lock:
+            return self._data_version_connection.execute('PRAGMA data_version').fetchone()[0]
 
     def close_session(self):
         self._session_cm.close_current_session()
 
+    def flush_comments(self):
+        if self._comment_writer is not None:
+            self._comment_writer.flush()
+
+    def close(self):
+        # Makes queued Comments durable, e.g. when the application shuts down.
+        if self._comment_writer is not None:
+            self._comment_writer.close()
+        if self._data_version_connection is not None:
+            with self._data_version_lock:
+                self._data_version_connection.close()
+                self._data_version_connection = None
+
+    def _sync_comments(self, entities):
+        # Read-your-writes: Comments still queued for these Movies/Users are written before their Comments are loaded.
+        # Entities whose Comments this session has already loaded include the queued ones, so they don't need a write.
+        if self._comment_writer is None:
+            return
+        unloaded = [entity for entity in entities if '_comments' in inspect(entity).unloaded]
+        article_ids = [entity.id for entity in unloaded if isinstance(entity, Movies)]
+        usernames = [entity.username for entity in unloaded if isinstance(entity, User)]
+        if self._comment_writer.has_pending(article_ids, usernames):
+            self._comment_writer.flush()
+            # The Movies' comment counts were loaded before the queued Comments were written.
+            for entity in unloaded:
+                if isinstance(entity, Movies):
+                    self._session_cm.session.expire(entity, ['_number_of_comments'])
+
     def reset_session(self):
         self._session_cm.reset_session()
 
+    def adopt(self, entity):
+        # Re-attach an entity loaded by an earlier (now closed) session to the current session, without querying
+        # the database, so that its lazy relationships can still be loaded.
+        session = self._session_cm.session
+        if entity in session:
+            return entity
+        if inspect(entity).modified:
+            # The entity carries a change that was never committed, i.e. a Comment still queued by the CommentWriter,
+            # which merge() can't carry over without writing it. Load a fresh copy instead.
+            entity = session.query(type(entity)).get(inspect(entity).identity)
+            self._sync_comments([entity])
+            return entity
+        return session.merge(entity, load=False)
+
     def add_user(self, user: User):
         with self._session_cm as scm:
             scm.session.add(user)
-            scm.commit()
+            try:
+                scm.commit()
+            except IntegrityError:
+                # Another User has the username; leaving the context rolls back the session.
+                raise RepositoryException(f'Username {user.username} is already taken')
 
     def get_user(self, username) -> User:
         user = None
         try:
             user = self._session_cm.session.query(User).filter_by(_username=username).one()
+            self._sync_comments([user])
         except NoResultFound:
             # Ignore any exception and return None.
             pass
 
         return user
 
+    def get_usernames(self) -> List[str]:
+        rows = self._session_cm.session.execute(select([users_table.c.username]))
+        return [username for username, in rows]
+
     def add_article(self, article: Movies):
         with self._session_cm as scm:
             scm.session.add(article)
             scm.commit()
+        self._catalogue_bounds = None
 
     def get_article(self, id: int) -> Movies:
         article = None
         try:
             article = self._session_cm.session.query(Movies).filter(Movies._id == id).one()
+            self._sync_comments([article])
         except NoResultFound:
             # Ignore any exception and return None.
             pass
@@ -94,33 +373,52 @@ class SqlAlchemyRepository(AbstractRepository):
     def get_articles_by_date(self, target_date: date) -> List[Movies]:
         if target_date is None:
             articles = self._session_cm.session.query(Movies).all()
-            return articles
         else:
             # Return articles matching target_date; return an empty list if there are no matches.
             articles = self._session_cm.session.query(Movies).filter(Movies._date == target_date).all()
-            return articles
+        self._sync_comments(articles)
+        return articles
 
     def get_number_of_articles(self):
         number_of_articles = self._session_cm.session.query(Movies).count()
         return number_of_articles
 
     def get_first_article(self):
-        article = self._session_cm.session.query(Movies).first()
+        article = self._session_cm.session.query(Movies).order_by(asc(Movies._date), asc(Movies._id)).first()
+        if article is not None:
+            self._sync_comments([article])
         return article
 
     def get_last_article(self):
-        article = self._session_cm.session.query(Movies).order_by(desc(Movies._id)).first()
+        article = self._session_cm.session.query(Movies).order_by(desc(Movies._date), desc(Movies._id)).first()
+        if article is not None:
+            self._sync_comments([article])
         return article
 
+    def get_catalogue_bounds(self) -> CatalogueBounds:
+        if self._catalogue_bounds is None:
+            # Both queries are resolved from the index on articles.date, without loading any Movies.
+            session = self._session_cm.session
+            first = session.query(Movies._id, Movies._date).order_by(asc(Movies._date), asc(Movies._id)).first()
+            last = session.query(Movies._id, Movies._date).order_by(desc(Movies._date), desc(Movies._id)).first()
+
+            if first is not None:
+                self._catalogue_bounds = CatalogueBounds(first[1], last[1], first[0], last[0])
+
+        return self._catalogue_bounds
+
     def get_articles_by_id(self, id_list):
         articles = self._session_cm.session.query(Movies).filter(Movies._id.in_(id_list)).all()
+        self._sync_comments(articles)
         return articles
 
     def get_article_ids_for_tag(self, tag_name: str):
         article_ids = []
 
         # Use native SQL to retrieve article ids, since there is no mapped class for the article_tags table.
-        row = self._session_cm.session.execute('SELECT id FROM tags WHERE name = :tag_name', {'tag_name': tag_name}).fetchone()
+        row = self._session_cm.session.execute(
+            'SELECT id FROM tags WHERE name = :tag_name', {'tag_name': normalize_tag_name(tag_name)}
+        ).fetchone()
 
         if row is None:
             # No tag with the name tag_name - create an empty list.
@@ -165,15 +463,270 @@ class SqlAlchemyRepository(AbstractRepository):
             scm.commit()
 
     def get_comments(self) -> List[Comment]:
+        self.flush_comments()
         comments = self._session_cm.session.query(Comment).all()
         return comments
 
+    def get_comments_for_article(self, article_id: int, before: datetime = None, limit: int = None) -> List[Comment]:
+        if self._comment_writer is not None and self._comment_writer.has_pending(article_ids=[article_id]):
+            self._comment_writer.flush()
+
+        return self._page_of_comments(comments_table.c.article_id == article_id, before, limit)
+
+    def get_comments_by_user(self, username: str, before: datetime = None, limit: int = None) -> List[Comment]:
+        if self._comment_writer is not None and self._comment_writer.has_pending(usernames=[username]):
+            self._comment_writer.flush()
+
+        return self._page_of_comments(comments_table.c.user_id == user_id_of(username), before, limit)
+
+    # Helper method that returns a page, newest first, of the Comments matching criterion - one of an article or of a
+    # user. Both queries are range scans of the (article_id, timestamp) or (user_id, timestamp) index, in index order,
+    # so a deep page costs the same as the first.
+    def _page_of_comments(self, criterion, before: datetime = None, limit: int = None) -> List[Comment]:
+        session = self._session_cm.session
+        query = session.query(Comment).filter(criterion)
+        if before is not None:
+            query = query.filter(comments_table.c.timestamp < before)
+        query = query.order_by(desc(comments_table.c.timestamp), desc(comments_table.c.id))
+
+        if limit is None:
+            return query.all()
+
+        comments = query.limit(limit).all()
+        if len(comments) == limit:
+            # Don't end the page part way through Comments that share a timestamp.
+            last = comments[-1]
+            comments.extend(
+                session.query(Comment)
+                .filter(criterion)
+                .filter(comments_table.c.timestamp == last.timestamp)
+                .filter(comments_table.c.id < last.id)
+                .order_by(desc(comments_table.c.id))
+                .all()
+            )
+        return comments
+
     def add_comment(self, comment: Comment):
         super().add_comment(comment)
+        # Copied before the commit expires the Comment's attributes.
+        recent_comment = RecentComment.of(comment)
+        if self._comment_writer is not None:
+            self._queue_comment(comment)
+        else:
+            with self._session_cm as scm:
+                scm.session.add(comment)
+                scm.commit()
+        self._recent_comments.add(recent_comment)
+        self._trending.add(recent_comment.article_id, recent_comment.timestamp)
+
+    def get_recent_comments(self, limit: int = None) -> List[RecentComment]:
+        return self._recent_comments.newest(limit)
+
+    def get_trending_article_ids(self, window: str, limit: int = 10) -> List[Tuple[int, int]]:
+        return self._trending.top(window, limit)
+
+    def rebuild_trending(self):
+        # Replays the Comments made within the longest trending window into the trending counters, reading only those
+        # Comments, from the index on comments.timestamp.
+        self.flush_comments()
+        since = datetime.today() - max(TRENDING_WINDOWS.values())
+        query = (
+            select([comments_table.c.article_id, comments_table.c.timestamp])
+            .where(comments_table.c.timestamp >= since)
+        )
+        session = self._session_factory()
+        try:
+            self._trending.replay(session.execute(query).fetchall())
+        finally:
+            session.close()
+
+    def _queue_comment(self, comment: Comment):
+        self._detach_new_comments([comment])
+        self._comment_writer.put(comment)
+
+    def _detach_new_comments(self, comments: List[Comment]):
+        # The Comments stay on their Movies and Users for the rest of this session, but as if they had been loaded
+        # rather than added, so that nothing in the session is left for a later commit to write. Each Movies' and
+        # User's comments are reset once, however many of the Comments are theirs.
+        session = self._session_cm.session
+        owners = dict()
+        for comment in comments:
+            if comment in session:
+                session.expunge(comment)
+            owners[id(comment.article)] = comment.article
+            owners[id(comment.user)] = comment.user
+        for owner in owners.values():
+            set_committed_value(owner, '_comments', list(owner.comments))
+
+    # The bulk writes insert rows through SQLAlchemy Core, in multi-row INSERT batches within a single transaction, and
+    # only write the entities' own rows: add_articles doesn't save Tags or Comments attached to the Movies, for
+    # example. Write those with add_tags and add_comments.
+
+    def add_users(self, users: Iterable[User]):
+        rows = [{'username': user.username, 'password': user.password} for user in users]
         with self._session_cm as scm:
-            scm.session.add(comment)
+            insert_in_batches(scm.session, users_table, rows)
             scm.commit()
 
+    def add_articles(self, articles: Iterable[Movies]):
+        rows = [
+            {
+                'id': article.id, 'date': article.date, 'title': article.title, 'first_para': article.first_para,
+                'hyperlink': article.hyperlink, 'image_hyperlink': article.image_hyperlink
+            }
+            for article in articles
+        ]
+        with self._session_cm as scm:
+            insert_in_batches(scm.session, articles_table, rows)
+            scm.commit()
+        self._catalogue_bounds = None
+
+    def add_tags(self, tags: Iterable[Tag]):
+        with self._session_cm as scm:
+            article_tag_rows = list()
+            for tag in tags:
+                # Each Tag's id is needed for its article_tags rows; there are few Tags relative to associations.
+                result = scm.session.execute(tags_table.insert().values(name=tag.tag_name))
+                tag_id = result.inserted_primary_key[0]
+                # While the domain classes are mapped, the ORM's backref may have listed a Movies on the Tag twice.
+                article_ids = dict.fromkeys(article.id for article in tag.tagged_articles)
+                article_tag_rows.extend({'article_id': article_id, 'tag_id': tag_id} for article_id in article_ids)
+            insert_in_batches(scm.session, article_tags_table, article_tag_rows)
+            scm.commit()
+
+    def add_comments(self, comments: Iterable[Comment]):
+        comments = list(comments)
+        check_comment_links(comments)
+        recent_comments = [RecentComment.of(comment) for comment in comments]
+
+        if self._comment_writer is not None:
+            self._detach_new_comments(comments)
+            for comment in comments:
+                self._comment_writer.put(comment)
+            self._recent_comments.extend(recent_comments)
+            self._count_trending(recent_comments)
+            return
+
+        with self._session_cm as scm:
+            # A Comment made from entities of this session may have been flushed already (by autoflush), in which case
+            # the commit below writes it; any other is taken out of the session and inserted in a batch.
+            new_comments = [comment for comment in comments if not inspect(comment).persistent]
+            self._detach_new_comments(new_comments)
+
+            usernames = {comment.user.username for comment in new_comments}
+            user_ids = dict()
+            for batch in batches(list(usernames), SQLITE_MAX_VARIABLES):
+                query = select([users_table.c.username, users_table.c.id]).where(users_table.c.username.in_(batch))
+                user_ids.update(scm.session.execute(query).fetchall())
+
+            rows = [
+                {
+                    'user_id': user_ids[comment.user.username], 'article_id': comment.article.id,
+                    'comment': comment.comment, 'timestamp': comment.timestamp
+                }
+                for comment in new_comments
+            ]
+            insert_in_batches(scm.session, comments_table, rows)
+            scm.commit()
+        self._recent_comments.extend(recent_comments)
+        self._count_trending(recent_comments)
+
+    def _count_trending(self, comments: Iterable[RecentComment]):
+        for comment in comments:
+            self._trending.add(comment.article_id, comment.timestamp)
+
+    # The watchlist is stored only as rows of the watchlist table, queried and written through SQLAlchemy Core; each
+    # statement finds the user's id with a scalar subquery on the username.
+
+    def add_to_watchlist(self, username: str, article_id: int):
+        with self._session_cm as scm:
+            scm.session.execute(
+                watchlist_table.insert().prefix_with('OR IGNORE')
+                .values(user_id=user_id_of(username), article_id=article_id)
+            )
+            scm.commit()
+
+    def remove_from_watchlist(self, username: str, article_id: int):
+        with self._session_cm as scm:
+            scm.session.execute(
+                watchlist_table.delete()
+                .where(watchlist_table.c.user_id == user_id_of(username))
+                .where(watchlist_table.c.article_id == article_id)
+            )
+            scm.commit()
+
+    def get_watchlist(self, username: str) -> List[int]:
+        query = (
+            select([watchlist_table.c.article_id])
+            .where(watchlist_table.c.user_id == user_id_of(username))
+            .order_by(watchlist_table.c.article_id)
+        )
+        return [article_id for article_id, in self._session_cm.session.execute(query)]
+
+    def get_watchlisted_article_ids(self, username: str, article_ids: Iterable[int]) -> Set[int]:
+        article_ids = set(article_ids)
+        if len(article_ids) == 0:
+            return set()
+        # A single range scan of the user's watchlist between the least and greatest of the ids, rather than a query
+        # per Movies - or a parameter per id, which SQLite limits.
+        query = (
+            select([watchlist_table.c.article_id])
+            .where(watchlist_table.c.user_id == user_id_of(username))
+            .where(watchlist_table.c.article_id.between(min(article_ids), max(article_ids)))
+        )
+        return {article_id for article_id, in self._session_cm.session.execute(query)} & article_ids
+
+
+def batches(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def insert_in_batches(session, table, rows: List[dict]):
+    # Multi-row INSERT ... VALUES statements, as many rows each as SQLite's parameter limit allows.
+    if len(rows) == 0:
+        return
+    batch_size = max(1, SQLITE_MAX_VARIABLES // len(rows[0]))
+    for batch in batches(rows, batch_size):
+        session.execute(table.insert().values(batch))
+
+
+def user_id_of(username: str):
+    # A scalar subquery for the id of the User named username.
+    return select([users_table.c.id]).where(users_table.c.username == username).as_scalar()
+
+
+def connect_for_data_version(session_factory) -> Optional[sqlite3.Connection]:
+    # A connection to the database file of session_factory's engine, of its own, so that SQLite's data_version on it
+    # counts the commits made through every other connection. Requests are served by several threads, which take
+    # turns with it. None for an in-memory database.
+    session = session_factory()
+    try:
+        url = session.get_bind().url
+    finally:
+        session.close()
+    if url.database in (None, '', ':memory:'):
+        return None
+    return sqlite3.connect(url.database, check_same_thread=False)
+
+
+def load_recent_comments(session_factory, limit: int) -> List[RecentComment]:
+    # The newest limit Comments, read as plain rows in a single query rather than as mapped entities.
+    query = (
+        select([
+            users_table.c.username, comments_table.c.article_id, articles_table.c.title, articles_table.c.date,
+            comments_table.c.comment, comments_table.c.timestamp
+        ])
+        .select_from(comments_table.join(users_table).join(articles_table))
+        .order_by(desc(comments_table.c.timestamp), desc(comments_table.c.id))
+        .limit(limit)
+    )
+    session = session_factory()
+    try:
+        return [RecentComment(*row) for row in session.execute(query)]
+    finally:
+        session.close()
+
 
 def article_record_generator(filename: str):
     with open(filename, mode='r', encoding='utf-8-sig') as infile:
@@ -190,13 +743,9 @@ def article_record_generator(filename: str):
             # article_data = [item.strip() for item in article_data]
 
             # number_of_tags = len(article_data) - 6
-            article_tags = row[2].split(',')
-
             # Add any new tags; associate the current article with tags.
-            for tag in article_tags:
-                if tag not in tags.keys():
-                    tags[tag] = list()
-                tags[tag].append(article_key)
+            for tag_name in split_tag_names(row[2]):
+                tags.setdefault(tag_dictionary.intern(tag_name), list()).append(article_key)
 
             # del article_data[-number_of_tags:]
 
@@ -211,22 +760,14 @@ def article_record_generator(filename: str):
 
 
 def get_tag_records():
-    tag_records = list()
-    tag_key = 0
-
-    for tag in tags.keys():
-        tag_key = tag_key + 1
-        tag_records.append((tag_key, tag))
-    return tag_records
+    return list(tag_dictionary.items())
 
 
 def article_tags_generator():
     article_tags_key = 0
-    tag_key = 0
 
-    for tag in tags.keys():
-        tag_key = tag_key + 1
-        for article_key in tags[tag]:
+    for tag_key, article_keys in tags.items():
+        for article_key in article_keys:
             article_tags_key = article_tags_key + 1
             yield article_tags_key, article_key, tag_key
 
@@ -253,43 +794,139 @@ def process_user(user_row):
     return user_row
 
 
-def populate(engine: Engine, data_path: str):
+def process_comment(comment_row):
+    comment_row[4] = datetime.fromisoformat(comment_row[4]).strftime(TIMESTAMP_FORMAT)
+    return comment_row
+
+
+def populate(engine: Engine, data_path: str, timings: BootTimings = None):
+    # Each step ends a phase of timings, if given.
+    timings = timings or BootTimings()
     conn = engine.raw_connection()
     cursor = conn.cursor()
 
-    global tags
+    global tags, tag_dictionary
     tags = dict()
+    tag_dictionary = TagDictionary()
 
     insert_articles = """
         INSERT INTO articles (
         id, date, title, first_para, hyperlink, image_hyperlink)
         VALUES (?, ?, ?, ?, ?, ?)"""
     cursor.executemany(insert_articles, article_record_generator(os.path.join(data_path, 'Data1000Movies.csv')))
+    timings.mark('populate articles')
 
     insert_tags = """
         INSERT INTO tags (
         id, name)
         VALUES (?, ?)"""
     cursor.executemany(insert_tags, get_tag_records())
+    timings.mark('populate tags')
 
     insert_article_tags = """
         INSERT INTO article_tags (
         id, article_id, tag_id)
         VALUES (?, ?, ?)"""
     cursor.executemany(insert_article_tags, article_tags_generator())
+    timings.mark('populate article tags')
 
     insert_users = """
         INSERT INTO users (
         id, username, password)
         VALUES (?, ?, ?)"""
     cursor.executemany(insert_users, generic_generator(os.path.join(data_path, 'users.csv'), process_user))
+    timings.mark('populate users')
 
     insert_comments = """
         INSERT INTO comments (
         id, user_id, article_id, comment, timestamp)
         VALUES (?, ?, ?, ?, ?)"""
-    cursor.executemany(insert_comments, generic_generator(os.path.join(data_path, 'comments.csv')))
+    cursor.executemany(insert_comments, generic_generator(os.path.join(data_path, 'comments.csv'), process_comment))
+
+    conn.commit()
+    timings.mark('populate comments')
+
+    # Record what was populated, for check_database to verify at later startups.
+    insert_schema_version = """
+        INSERT INTO schema_version (
+        version, sources, articles, tags, users, comments, populated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)"""
+    counts = [cursor.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+              for table in ('articles', 'tags', 'users', 'comments')]
+    cursor.execute('DELETE FROM schema_version')
+    cursor.execute(insert_schema_version, [
+        SCHEMA_VERSION, json.dumps(source_checksums(data_path)), *counts, datetime.now().strftime(TIMESTAMP_FORMAT)
+    ])
 
     conn.commit()
     conn.close()
+    timings.mark('record schema version')
+
+
+def has_tables(engine: Engine) -> bool:
+    return len(inspect(engine).get_table_names()) > 0
+
+
+def check_database(engine: Engine, data_path: str) -> List[str]:
+    """ Verify a populated database without reloading it, returning a description of each problem found.
+
+    Raises SchemaVersionException if the database wasn't made with the current tables, since it can't be used until
+    it is repopulated. Otherwise, the articles and tags must number as many as were populated, and the users and
+    comments at least as many, and the source CSV files must be those the database was populated from; a mismatch is
+    a problem worth reporting, but the database can still be served.
+    """
+    if schema_version_table.name not in inspect(engine).get_table_names():
+        raise SchemaVersionException('The database has no schema version; set REPOPULATE_DATABASE to repopulate it')
+
+    with engine.connect() as connection:
+        record = connection.execute(select([schema_version_table])).first()
+        if record is None or record['version'] != SCHEMA_VERSION:
+            found = None if record is None else record['version']
+            raise SchemaVersionException(
+                f'The database has schema version {found}, not {SCHEMA_VERSION}; '
+                f'set REPOPULATE_DATABASE to repopulate it'
+            )
+
+        problems = list()
+        for table, table_name, may_grow in (
+                (articles_table, 'articles', False), (tags_table, 'tags', False),
+                (users_table, 'users', True), (comments_table, 'comments', True)):
+            count = connection.execute(select([func.count()]).select_from(table)).scalar()
+            expected = record[table_name]
+            if count < expected or (count > expected and not may_grow):
+                problems.append(f'The database has {count} {table_name}, but was populated with {expected}')
+
+    populated_from = json.loads(record['sources'])
+    for filename, checksum in source_checksums(data_path, populated_from).items():
+        if populated_from.get(filename, {}).get('digest') != checksum['digest']:
+            problems.append(f'{filename} has changed since the database was populated from it')
+    return problems
+
+
+def source_checksums(data_path: str, previous: dict = None) -> dict:
+    # The size, modification time and digest of each source file. A file whose size and modification time match those
+    # in previous isn't read again, so that checking an unchanged database costs no more than a stat of each file.
+    checksums = dict()
+    for filename in SOURCE_FILES:
+        path = os.path.join(data_path, filename)
+        if not os.path.isfile(path):
+            checksums[filename] = {'size': None, 'mtime_ns': None, 'digest': None}
+            continue
+        stat = os.stat(path)
+        checksum = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        known = (previous or {}).get(filename, {})
+        if known.get('size') == checksum['size'] and known.get('mtime_ns') == checksum['mtime_ns']:
+            checksum['digest'] = known.get('digest')
+        else:
+            checksum['digest'] = file_digest(path)
+        checksums[filename] = checksum
+    return checksums
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
 
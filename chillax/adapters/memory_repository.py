@@ -1,35 +1,84 @@
 import csv
+from array import array
+import gc
+import heapq
 import os
+import threading
+from contextlib import nullcontext
 from datetime import date, datetime
-from typing import List
+from typing import List, Iterable, Tuple, Set
 
 from bisect import bisect, bisect_left, insort_left
 
 from werkzeug.security import generate_password_hash
 
-from chillax.adapters.repository import AbstractRepository, RepositoryException
+from chillax.adapters.repository import (
+    AbstractRepository, CatalogueBounds, RepositoryException, RecentComment, RecentComments, check_comment_links
+)
+from chillax.adapters.tag_dictionary import TagDictionary, split_tag_names
+from chillax.adapters.trending import TrendingCounters
 from chillax.domain.model import Movies, Tag, User, Comment, make_tag_association, make_comment
+from chillax.utilities.boot import BootTimings
 
 
 class MemoryRepository(AbstractRepository):
     # Movies ordered by date, not id. id is assumed unique.
+    #
+    # With thread_safe set, the repository can be shared by the threads of a threaded server: writers are serialized
+    # by a lock, while readers never take a lock. Collections that are only appended to (tags, users, comments) are
+    # read as a snapshot copy, and the date-ordered Movies list is copied on write and published by replacing the
+    # reference, so each read works on a consistent, unchanging list.
 
-    def __init__(self):
+    def __init__(self, thread_safe: bool = False, recent_comments_size: int = 50, trending: TrendingCounters = None):
         self._articles = list()
         self._articles_index = dict()
         self._tags = list()
+        # Tag names interned as ids, and the first Tag stored under each id, for looking Tags up by name.
+        self._tag_dictionary = TagDictionary()
+        self._tags_by_id = dict()
         self._users = list()
         self._comments = list()
+        self._catalogue_bounds = None
+
+        # Movies id -> (timestamps, Comments), and username -> (timestamps, Comments), each in timestamp order, for
+        # paging through an article's or a user's Comments.
+        self._article_comments = dict()
+        self._user_comments = dict()
+
+        # username -> ids of the Movies on the User's watchlist, as a sorted array of machine integers.
+        self._watchlists = dict()
+
+        # The last Comments added, for the recent-activity feed.
+        self._recent_comments = RecentComments(recent_comments_size)
+
+        # Comment counts per Movies over sliding windows, for ranking trending Movies.
+        self._trending = trending if trending is not None else TrendingCounters()
+
+        self._thread_safe = thread_safe
+        self._write_lock = threading.Lock() if thread_safe else nullcontext()
 
     def add_user(self, user: User):
-        self._users.append(user)
+        with self._write_lock:
+            self._users.append(user)
 
     def get_user(self, username) -> User:
         return next((user for user in self._users if user.username == username), None)
 
+    def get_usernames(self) -> List[str]:
+        return [user.username for user in self._users]
+
     def add_article(self, article: Movies):
-        insort_left(self._articles, article)
-        self._articles_index[article.id] = article
+        with self._write_lock:
+            if self._thread_safe:
+                # Copy on write, so that readers holding the previous list are unaffected.
+                articles = list(self._articles)
+                insort_left(articles, article)
+                self._articles_index[article.id] = article
+                self._articles = articles
+            else:
+                insort_left(self._articles, article)
+                self._articles_index[article.id] = article
+            self._catalogue_bounds = None
 
     def get_article(self, id: int) -> Movies:
         article = None
@@ -50,10 +99,11 @@ class MemoryRepository(AbstractRepository):
             image_hyperlink=None
         )
         matching_articles = list()
+        articles = self._articles
 
         try:
-            index = self.article_index(target_article)
-            for article in self._articles[index:None]:
+            index = self.article_index(target_article, articles)
+            for article in articles[index:None]:
                 if article.date == target_date:
                     matching_articles.append(article)
                 else:
@@ -69,18 +119,30 @@ class MemoryRepository(AbstractRepository):
 
     def get_first_article(self):
         article = None
+        articles = self._articles
 
-        if len(self._articles) > 0:
-            article = self._articles[0]
+        if len(articles) > 0:
+            article = articles[0]
         return article
 
     def get_last_article(self):
         article = None
+        articles = self._articles
 
-        if len(self._articles) > 0:
-            article = self._articles[-1]
+        if len(articles) > 0:
+            article = articles[-1]
         return article
 
+    def get_catalogue_bounds(self) -> CatalogueBounds:
+        # The bounds are a maintained aggregate over the date-ordered Movies, recomputed only after an add.
+        bounds = self._catalogue_bounds
+        articles = self._articles
+        if bounds is None and len(articles) > 0:
+            first, last = articles[0], articles[-1]
+            bounds = CatalogueBounds(first.date, last.date, first.id, last.id)
+            self._catalogue_bounds = bounds
+        return bounds
+
     def get_articles_by_id(self, id_list):
         # Strip out any ids in id_list that don't represent Movies ids in the repository.
         existing_ids = [id for id in id_list if id in self._articles_index]
@@ -90,12 +152,12 @@ class MemoryRepository(AbstractRepository):
         return articles
 
     def get_article_ids_for_tag(self, tag_name: str):
-        # Linear search, to find the first occurrence of a Tag with the name tag_name.
-        tag = next((tag for tag in self._tags if tag.tag_name == tag_name), None)
+        # Find the first Tag stored with the (normalized) name tag_name.
+        tag = self._tags_by_id.get(self._tag_dictionary.id_of(tag_name))
 
         # Retrieve the ids of articles associated with the Tag.
         if tag is not None:
-            article_ids = [article.id for article in tag.tagged_articles]
+            article_ids = sorted(article.id for article in tag.tagged_articles)
         else:
             # No Tag with name tag_name, so return an empty list.
             article_ids = list()
@@ -104,10 +166,11 @@ class MemoryRepository(AbstractRepository):
 
     def get_date_of_previous_article(self, article: Movies):
         previous_date = None
+        articles = self._articles
 
         try:
-            index = self.article_index(article)
-            for stored_article in reversed(self._articles[0:index]):
+            index = self.article_index(article, articles)
+            for stored_article in reversed(articles[0:index]):
                 if stored_article.date < article.date:
                     previous_date = stored_article.date
                     break
@@ -119,10 +182,11 @@ class MemoryRepository(AbstractRepository):
 
     def get_date_of_next_article(self, article: Movies):
         next_date = None
+        articles = self._articles
 
         try:
-            index = self.article_index(article)
-            for stored_article in self._articles[index + 1:len(self._articles)]:
+            index = self.article_index(article, articles)
+            for stored_article in articles[index + 1:len(articles)]:
                 if stored_article.date > article.date:
                     next_date = stored_article.date
                     break
@@ -133,25 +197,170 @@ class MemoryRepository(AbstractRepository):
         return next_date
 
     def add_tag(self, tag: Tag):
-        self._tags.append(tag)
+        with self._write_lock:
+            self._tags.append(tag)
+            self._index_tag(tag)
 
     def get_tags(self) -> List[Tag]:
-        return self._tags
+        return self._snapshot(self._tags)
+
+    @property
+    def tag_dictionary(self) -> TagDictionary:
+        return self._tag_dictionary
 
     def add_comment(self, comment: Comment):
-        super().add_comment(comment)
-        self._comments.append(comment)
+        with self._write_lock:
+            super().add_comment(comment)
+            self._comments.append(comment)
+            self._index_comment(comment)
+            self._recent_comments.add(RecentComment.of(comment))
+            self._trending.add(comment.article.id, comment.timestamp)
 
     def get_comments(self):
-        return self._comments
-
-    # Helper method to return article index.
-    def article_index(self, article: Movies):
-        index = bisect_left(self._articles, article)
-        if index != len(self._articles) and self._articles[index].date == article.date:
+        return self._snapshot(self._comments)
+
+    def add_users(self, users: Iterable[User]):
+        with self._write_lock:
+            self._users.extend(users)
+
+    def add_articles(self, articles: Iterable[Movies]):
+        # Sort the batch and merge it into the date-ordered Movies in one pass, O(n + k log k) for k new Movies,
+        # rather than paying an O(n) insort for each. The order matches adding them one at a time with insort_left:
+        # a new Movies goes before any with the same date, including those earlier in the batch.
+        batch = sorted(reversed(list(articles)))
+        with self._write_lock:
+            # Merge on the date itself: Movies equality compares titles, which would break ties arbitrarily.
+            articles = list(heapq.merge(batch, self._articles, key=lambda article: article.date))
+            for article in batch:
+                self._articles_index[article.id] = article
+            self._articles = articles
+            self._catalogue_bounds = None
+
+    def add_tags(self, tags: Iterable[Tag]):
+        tags = list(tags)
+        with self._write_lock:
+            self._tags.extend(tags)
+            for tag in tags:
+                self._index_tag(tag)
+
+    def add_comments(self, comments: Iterable[Comment]):
+        comments = list(comments)
+        with self._write_lock:
+            check_comment_links(comments)
+            self._comments.extend(comments)
+            for comment in comments:
+                self._index_comment(comment)
+            self._recent_comments.extend(RecentComment.of(comment) for comment in comments)
+            for comment in comments:
+                self._trending.add(comment.article.id, comment.timestamp)
+
+    def get_comments_for_article(self, article_id: int, before: datetime = None, limit: int = None) -> List[Comment]:
+        return self._page_of_comments(self._article_comments.get(article_id), before, limit)
+
+    def get_comments_by_user(self, username: str, before: datetime = None, limit: int = None) -> List[Comment]:
+        return self._page_of_comments(self._user_comments.get(username), before, limit)
+
+    def get_recent_comments(self, limit: int = None) -> List[RecentComment]:
+        return self._recent_comments.newest(limit)
+
+    def get_trending_article_ids(self, window: str, limit: int = 10) -> List[Tuple[int, int]]:
+        return self._trending.top(window, limit)
+
+    def rebuild_trending(self):
+        # Replays every Comment into the trending counters.
+        with self._write_lock:
+            self._trending.replay((comment.article.id, comment.timestamp) for comment in self._comments)
+
+    def add_to_watchlist(self, username: str, article_id: int):
+        with self._write_lock:
+            watchlist = self._watchlists.get(username, array('q'))
+            index = bisect_left(watchlist, article_id)
+            if index < len(watchlist) and watchlist[index] == article_id:
+                return
+            if self._thread_safe:
+                # Copy on write, so that readers holding the previous array are unaffected.
+                watchlist = array('q', watchlist)
+            watchlist.insert(index, article_id)
+            self._watchlists[username] = watchlist
+
+    def remove_from_watchlist(self, username: str, article_id: int):
+        with self._write_lock:
+            watchlist = self._watchlists.get(username, array('q'))
+            index = bisect_left(watchlist, article_id)
+            if index == len(watchlist) or watchlist[index] != article_id:
+                return
+            if self._thread_safe:
+                watchlist = array('q', watchlist)
+            del watchlist[index]
+            self._watchlists[username] = watchlist
+
+    def get_watchlist(self, username: str) -> List[int]:
+        return list(self._watchlists.get(username, ()))
+
+    def get_watchlisted_article_ids(self, username: str, article_ids: Iterable[int]) -> Set[int]:
+        watchlist = self._watchlists.get(username, array('q'))
+        watchlisted = set()
+        for article_id in article_ids:
+            index = bisect_left(watchlist, article_id)
+            if index < len(watchlist) and watchlist[index] == article_id:
+                watchlisted.add(article_id)
+        return watchlisted
+
+    # Helper method, called with the write lock held, that files comment in its Movies' and User's timestamp-ordered
+    # Comments.
+    def _index_comment(self, comment: Comment):
+        self._file_comment(self._article_comments, comment.article.id, comment)
+        self._file_comment(self._user_comments, comment.user.username, comment)
+
+    def _file_comment(self, index: dict, key, comment: Comment):
+        entry = index.get(key)
+        if entry is None:
+            entry = (list(), list())
+        elif self._thread_safe:
+            # Copy on write, as for the Movies list, so that readers holding the previous lists are unaffected.
+            entry = (list(entry[0]), list(entry[1]))
+
+        timestamps, comments = entry
+        position = bisect(timestamps, comment.timestamp)
+        timestamps.insert(position, comment.timestamp)
+        comments.insert(position, comment)
+        index[key] = entry
+
+    # Helper method that returns a page, newest first, of a (timestamps, Comments) entry of the Comment indexes. Finding
+    # the page is a binary search, so a deep page costs the same as the first.
+    @staticmethod
+    def _page_of_comments(entry, before: datetime = None, limit: int = None) -> List[Comment]:
+        timestamps, comments = entry if entry is not None else ((), ())
+
+        end = len(timestamps) if before is None else bisect_left(timestamps, before)
+        start = 0 if limit is None else max(end - limit, 0)
+        # Don't end the page part way through Comments that share a timestamp.
+        while 0 < start < end and timestamps[start - 1] == timestamps[start]:
+            start -= 1
+
+        return list(reversed(comments[start:end]))
+
+    # Helper method to return article index, within articles (by default, the repository's current Movies list).
+    def article_index(self, article: Movies, articles: List[Movies] = None):
+        if articles is None:
+            articles = self._articles
+        index = bisect_left(articles, article)
+        if index != len(articles) and articles[index].date == article.date:
             return index
         raise ValueError
 
+    # Helper method to make a Tag findable by name. A Tag added without an id (e.g. one made by a caller, rather than
+    # loaded) is interned by its name.
+    def _index_tag(self, tag: Tag):
+        tag_id = tag.id if tag.id is not None else self._tag_dictionary.intern(tag.tag_name)
+        self._tags_by_id.setdefault(tag_id, tag)
+
+    # Helper method that, in thread-safe mode, copies an append-only list so callers never see it change.
+    def _snapshot(self, items: list) -> list:
+        if self._thread_safe:
+            return list(items)
+        return items
+
 
 def read_csv_file(filename: str):
     with open(filename, encoding='utf-8-sig') as infile:
@@ -167,17 +376,16 @@ def read_csv_file(filename: str):
 
 
 def load_articles_and_tags(data_path: str, repo: MemoryRepository):
+    # Tag id -> ids of the Movies with the Tag.
     tags = dict()
+    articles = dict()
 
     for data_row in read_csv_file(os.path.join(data_path, 'Data1000Movies.csv')):
 
         article_key = int(data_row[0])
-        article_tags = data_row[2].split(",")
         # Add any new tags; associate the current article with tags.
-        for tag in article_tags:
-            if tag not in tags.keys():
-                tags[tag] = list()
-            tags[tag].append(article_key)
+        for tag_name in split_tag_names(data_row[2]):
+            tags.setdefault(repo.tag_dictionary.intern(tag_name), list()).append(article_key)
 
         # Create Movies object.
         article = Movies(
@@ -188,17 +396,19 @@ def load_articles_and_tags(data_path: str, repo: MemoryRepository):
             hyperlink="{}{}{}".format("https://image.tmdb.org/t/p/", "w400", data_row[13]),
             image_hyperlink="{}{}{}".format("https://image.tmdb.org/t/p/", "w400", data_row[13])
         )
+        articles[article_key] = article
 
-        # Add the Movies to the repository.
-        repo.add_article(article)
+    # Add the Movies to the repository.
+    repo.add_articles(articles.values())
 
     # Create Tag objects, associate them with Movies and add them to the repository.
-    for tag_name in tags.keys():
-        tag = Tag(tag_name)
-        for article_id in tags[tag_name]:
-            article = repo.get_article(article_id)
-            make_tag_association(article, tag)
-        repo.add_tag(tag)
+    tag_objects = list()
+    for tag_id, article_ids in tags.items():
+        tag = Tag(repo.tag_dictionary.name_of(tag_id), tag_id)
+        for article_id in article_ids:
+            make_tag_association(articles[article_id], tag)
+        tag_objects.append(tag)
+    repo.add_tags(tag_objects)
 
 
 def load_users(data_path: str, repo: MemoryRepository):
@@ -209,12 +419,13 @@ def load_users(data_path: str, repo: MemoryRepository):
             username=data_row[1],
             password=generate_password_hash(data_row[2])
         )
-        repo.add_user(user)
         users[data_row[0]] = user
+    repo.add_users(users.values())
     return users
 
 
 def load_comments(data_path: str, repo: MemoryRepository, users):
+    comments = list()
     for data_row in read_csv_file(os.path.join(data_path, 'comments.csv')):
         comment = make_comment(
             comment_text=data_row[3],
@@ -222,15 +433,35 @@ def load_comments(data_path: str, repo: MemoryRepository, users):
             article=repo.get_article(int(data_row[2])),
             timestamp=datetime.fromisoformat(data_row[4])
         )
-        repo.add_comment(comment)
+        comments.append(comment)
+    repo.add_comments(comments)
+
 
+def populate(data_path: str, repo: MemoryRepository, timings: BootTimings = None):
+    # Each step ends a phase of timings, if given.
+    timings = timings or BootTimings()
 
-def populate(data_path: str, repo: MemoryRepository):
     # Load articles and tags into the repository.
     load_articles_and_tags(data_path, repo)
+    timings.mark('populate articles and tags')
 
     # Load users into the repository.
     users = load_users(data_path, repo)
+    timings.mark('populate users')
 
     # Load comments into the repository.
     load_comments(data_path, repo, users)
+    timings.mark('populate comments')
+
+
+def populate_shared(data_path: str, repo: MemoryRepository, timings: BootTimings = None):
+    # Populate the repository in a process that forks its workers after loading (e.g. gunicorn --preload). The garbage
+    # collector is held off while loading, then everything loaded is moved to its permanent generation. Collections in
+    # the workers never visit frozen objects, so they don't write to the catalogue's pages, which stay shared with the
+    # master instead of being copied into every worker.
+    gc.disable()
+    try:
+        populate(data_path, repo, timings)
+    finally:
+        gc.freeze()
+        gc.enable()
@@ -1,13 +1,17 @@
 from sqlalchemy import (
     Table, MetaData, Column, Integer, String, Date, DateTime,
-    ForeignKey
+    ForeignKey, Index, select, func, event
 )
-from sqlalchemy.orm import mapper, relationship
+from sqlalchemy.orm import mapper, relationship, column_property
 
 from chillax.domain import model
 
 metadata = MetaData()
 
+# The version of the tables below. Bump it with any change to them, so that an existing database made with the old
+# tables is recognised at startup and repopulated rather than queried.
+SCHEMA_VERSION = 5
+
 users = Table(
     'users', metadata,
     Column('id', Integer, primary_key=True, autoincrement=True),
@@ -21,13 +25,19 @@ comments = Table(
     Column('user_id', ForeignKey('users.id')),
     Column('article_id', ForeignKey('articles.id')),
     Column('comment', String(1024), nullable=False),
-    Column('timestamp', DateTime, nullable=False)
+    Column('timestamp', DateTime, nullable=False),
+    # Page through an article's or a user's comments in timestamp order; the rowid (id) that SQLite appends to each
+    # index entry breaks ties between equal timestamps.
+    Index('ix_comments_article_id_timestamp', 'article_id', 'timestamp'),
+    Index('ix_comments_user_id_timestamp', 'user_id', 'timestamp'),
+    # Read newest first to load the most recent comments at startup, without sorting every comment.
+    Index('ix_comments_timestamp', 'timestamp')
 )
 
 articles = Table(
     'articles', metadata,
     Column('id', Integer, primary_key=True, autoincrement=True),
-    Column('date', Date, nullable=False),
+    Column('date', Date, nullable=False, index=True),
     Column('title', String(255), nullable=False),
     Column('first_para', String(1024), nullable=False),
     Column('hyperlink', String(255), nullable=False),
@@ -37,14 +47,40 @@ articles = Table(
 tags = Table(
     'tags', metadata,
     Column('id', Integer, primary_key=True, autoincrement=True),
-    Column('name', String(64), nullable=False)
+    # Tag names are normalized and deduplicated when loaded, so each is stored once. Names compare without regard to
+    # case, as the TagDictionary compares them, so the unique index also finds a Tag by a name written in any case.
+    Column('name', String(64, collation='NOCASE'), nullable=False, unique=True)
 )
 
 article_tags = Table(
     'article_tags', metadata,
     Column('id', Integer, primary_key=True, autoincrement=True),
     Column('article_id', ForeignKey('articles.id')),
-    Column('tag_id', ForeignKey('tags.id'))
+    Column('tag_id', ForeignKey('tags.id')),
+    # Counts each Movies' Tags, as loaded with the Movies, without scanning every association.
+    Index('ix_article_tags_article_id', 'article_id')
+)
+
+# Movies on each user's watchlist. The composite primary key's index holds both columns, so listing a watchlist and
+# checking membership are answered from the index alone.
+watchlist = Table(
+    'watchlist', metadata,
+    Column('user_id', ForeignKey('users.id'), primary_key=True),
+    Column('article_id', ForeignKey('articles.id'), primary_key=True)
+)
+
+# A single row, written when the database is populated: the schema version, the size, modification time and digest of
+# each source CSV file, and the number of rows populated from them. Startup checks the database against it, rather
+# than repopulating.
+schema_version = Table(
+    'schema_version', metadata,
+    Column('version', Integer, primary_key=True),
+    Column('sources', String(1024), nullable=False),
+    Column('articles', Integer, nullable=False),
+    Column('tags', Integer, nullable=False),
+    Column('users', Integer, nullable=False),
+    Column('comments', Integer, nullable=False),
+    Column('populated_at', DateTime, nullable=False)
 )
 
 
@@ -66,13 +102,37 @@ def map_model_to_tables():
         '_first_para': articles.c.first_para,
         '_hyperlink': articles.c.hyperlink,
         '_image_hyperlink': articles.c.image_hyperlink,
-        '_comments': relationship(model.Comment, backref='_article')
+        '_comments': relationship(model.Comment, backref='_article'),
+        # Loaded with the Movies, from the index on comments.article_id, so that listing Movies with their number of
+        # comments doesn't load every Movies' comments.
+        '_number_of_comments': column_property(
+            select([func.count(comments.c.id)]).where(comments.c.article_id == articles.c.id).as_scalar()
+        ),
+        # Likewise from the index on article_tags.article_id, so that a Movies' cached dict can be checked for new
+        # Tags without loading its Tags. The count is over article_tags even when Movies are loaded through it, as a
+        # Tag's are.
+        '_number_of_tags': column_property(
+            select([func.count(article_tags.c.id)]).where(article_tags.c.article_id == articles.c.id)
+            .correlate_except(article_tags).as_scalar()
+        )
     })
     mapper(model.Tag, tags, properties={
+        '_id': tags.c.id,
         '_tag_name': tags.c.name,
+        # Merging a Tag (e.g. when re-attaching a cached Tag to a new session) shouldn't drag every tagged Movies
+        # along with it, so the merge cascade is left off this side of the association.
         '_tagged_articles': relationship(
             articles_mapper,
             secondary=article_tags,
-            backref="_tags"
+            backref="_tags",
+            cascade='save-update'
         )
     })
+    # A Movies builds an array of its Tags' ids from its Tags, which is stale once the ORM reloads them.
+    for event_name in ('expire', 'refresh'):
+        if not event.contains(model.Movies, event_name, forget_tag_ids):
+            event.listen(model.Movies, event_name, forget_tag_ids)
+
+
+def forget_tag_ids(article: model.Movies, *args):
+    article._tag_ids = None
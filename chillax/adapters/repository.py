@@ -1,6 +1,9 @@
 import abc
-from typing import List
-from datetime import date
+import heapq
+import threading
+from collections import deque
+from typing import List, NamedTuple, Iterable, Tuple, Set
+from datetime import date, datetime
 
 from chillax.domain.model import User, Movies, Tag, Comment
 
@@ -14,6 +17,56 @@ class RepositoryException(Exception):
         pass
 
 
+class CatalogueBounds(NamedTuple):
+    """ The dates and ids of the first and last Movies, ordered by date. """
+    first_date: date
+    last_date: date
+    first_article_id: int
+    last_article_id: int
+
+
+class RecentComment(NamedTuple):
+    """ A Comment as shown in the recent-activity feed, copied so that it outlives the session that loaded it. """
+    username: str
+    article_id: int
+    article_title: str
+    article_date: date
+    comment: str
+    timestamp: datetime
+
+    @classmethod
+    def of(cls, comment: Comment) -> 'RecentComment':
+        article = comment.article
+        return cls(comment.user.username, article.id, article.title, article.date, comment.comment, comment.timestamp)
+
+
+class RecentComments:
+    """ A thread-safe ring buffer of the last size RecentComments added, so the feed never reads every Comment. """
+
+    def __init__(self, size: int = 50):
+        self._comments = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, comment: RecentComment):
+        with self._lock:
+            self._comments.append(comment)
+
+    def extend(self, comments: Iterable[RecentComment]):
+        # Only the newest of a batch (e.g. the seed loaded at startup) can stay in the buffer; they go in oldest first.
+        newest = heapq.nlargest(self._comments.maxlen, comments, key=lambda comment: comment.timestamp)
+        with self._lock:
+            self._comments.extend(reversed(newest))
+
+    def newest(self, limit: int = None) -> List[RecentComment]:
+        with self._lock:
+            comments = list(self._comments)
+        comments.reverse()
+        return comments if limit is None else comments[:limit]
+
+    def __len__(self):
+        return len(self._comments)
+
+
 class AbstractRepository(abc.ABC):
 
     @abc.abstractmethod
@@ -29,6 +82,11 @@ class AbstractRepository(abc.ABC):
         """
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_usernames(self) -> List[str]:
+        """ Returns the usernames of every User in the repository. """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def add_article(self, article: Movies):
         """ Adds an Movies to the repository. """
@@ -71,6 +129,14 @@ class AbstractRepository(abc.ABC):
         """
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_catalogue_bounds(self) -> CatalogueBounds:
+        """ Returns the CatalogueBounds of the repository's Movies.
+
+        The bounds are cached until a Movies is added. Returns None if the repository is empty.
+        """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def get_articles_by_id(self, id_list):
         """ Returns a list of Movies, whose ids match those in id_list, from the repository.
@@ -81,7 +147,7 @@ class AbstractRepository(abc.ABC):
 
     @abc.abstractmethod
     def get_article_ids_for_tag(self, tag_name: str):
-        """ Returns a list of ids representing Movies that are tagged by tag_name.
+        """ Returns a list of ids, in ascending order, representing Movies that are tagged by tag_name.
 
         If there are Movies that are tagged by tag_name, this method returns an empty list.
         """
@@ -122,9 +188,10 @@ class AbstractRepository(abc.ABC):
         If the Comment doesn't have bidirectional links with an Movies and a User, this method raises a
         RepositoryException and doesn't update the repository.
         """
-        if comment.user is None or comment not in comment.user.comments:
+        # Compare by identity: a User or Movies may have many Comments, and Comment equality compares every field.
+        if comment.user is None or not any(linked is comment for linked in comment.user.comments):
             raise RepositoryException('Comment not correctly attached to a User')
-        if comment.article is None or comment not in comment.article.comments:
+        if comment.article is None or not any(linked is comment for linked in comment.article.comments):
             raise RepositoryException('Comment not correctly attached to an Movie')
 
     @abc.abstractmethod
@@ -132,9 +199,113 @@ class AbstractRepository(abc.ABC):
         """ Returns the Comments stored in the repository. """
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_comments_for_article(self, article_id: int, before: datetime = None, limit: int = None) -> List[Comment]:
+        """ Returns the Comments on the Movies with article_id, newest first.
+
+        Only Comments made before the timestamp before (if given) are returned, and at most limit of them (if given) -
+        except that a page never ends part way through Comments that share a timestamp, so the timestamp of the last
+        Comment returned is the before of the next page. Returns an empty list if there are no such Comments.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_comments_by_user(self, username: str, before: datetime = None, limit: int = None) -> List[Comment]:
+        """ Returns the Comments made by the User named username, newest first.
+
+        Pages through them as get_comments_for_article does: only Comments made before the timestamp before (if
+        given), at most limit of them (if given) but never ending part way through Comments that share a timestamp.
+        Returns an empty list if there are no such Comments.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_recent_comments(self, limit: int = None) -> List[RecentComment]:
+        """ Returns the Comments most recently added to the repository, newest first, as RecentComments.
+
+        The repository holds a bounded number of them, seeded with the newest Comments when it is created, so at most
+        limit (if given) of those are returned. Returns an empty list if there are no Comments.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_trending_article_ids(self, window: str, limit: int = 10) -> List[Tuple[int, int]]:
+        """ Returns (Movies id, number of Comments) pairs for the Movies with the most Comments made within window.
+
+        window names one of the sliding windows in trending.TRENDING_WINDOWS ('hour', 'day' or 'week'); an unknown
+        window raises a KeyError. At most limit pairs are returned, most commented first, ties in order of id.
+        """
+        raise NotImplementedError
 
+    @abc.abstractmethod
+    def add_to_watchlist(self, username: str, article_id: int):
+        """ Adds the Movies with article_id to the watchlist of the User named username.
 
+        Adding a Movies that is already on the watchlist leaves the watchlist unchanged.
+        """
+        raise NotImplementedError
 
+    @abc.abstractmethod
+    def remove_from_watchlist(self, username: str, article_id: int):
+        """ Removes the Movies with article_id, if it's there, from the watchlist of the User named username. """
+        raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_watchlist(self, username: str) -> List[int]:
+        """ Returns the ids, in ascending order, of the Movies on the watchlist of the User named username.
 
+        If the watchlist is empty, or there is no such User, this method returns an empty list.
+        """
+        raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_watchlisted_article_ids(self, username: str, article_ids: Iterable[int]) -> Set[int]:
+        """ Returns those of article_ids that are on the watchlist of the User named username, in one lookup. """
+        raise NotImplementedError
+
+    # Bulk writes. Each adds a batch of entities as the corresponding add_ method would add them one by one; adapters
+    # override them to write the whole batch at once.
+
+    def add_users(self, users: Iterable[User]):
+        """ Adds Users to the repository. """
+        for user in users:
+            self.add_user(user)
+
+    def add_articles(self, articles: Iterable[Movies]):
+        """ Adds Movies to the repository. """
+        for article in articles:
+            self.add_article(article)
+
+    def add_tags(self, tags: Iterable[Tag]):
+        """ Adds Tags to the repository. """
+        for tag in tags:
+            self.add_tag(tag)
+
+    def add_comments(self, comments: Iterable[Comment]):
+        """ Adds Comments to the repository.
+
+        If any Comment doesn't have bidirectional links with an Movies and a User, this method raises a
+        RepositoryException and doesn't add any of the Comments.
+        """
+        comments = list(comments)
+        check_comment_links(comments)
+        for comment in comments:
+            self.add_comment(comment)
+
+
+def check_comment_links(comments: List[Comment]):
+    # Checks the links of each of a batch of Comments, as AbstractRepository.add_comment does, raising
+    # RepositoryException for the first that isn't linked. Each User's and Movies' Comments are gathered into a set once,
+    # rather than scanned for each Comment, so checking a batch takes time linear in its size.
+    linked = dict()
+
+    def is_linked(comment: Comment, entity) -> bool:
+        if id(entity) not in linked:
+            linked[id(entity)] = (entity, {id(linked_comment) for linked_comment in entity.comments})
+        return id(comment) in linked[id(entity)][1]
+
+    for comment in comments:
+        if comment.user is None or not is_linked(comment, comment.user):
+            raise RepositoryException('Comment not correctly attached to a User')
+        if comment.article is None or not is_linked(comment, comment.article):
+            raise RepositoryException('Comment not correctly attached to an Movie')
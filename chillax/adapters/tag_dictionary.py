@@ -0,0 +1,62 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+def normalize_tag_name(tag_name: str) -> str:
+    # Strip the name and collapse runs of white space, so that ' Sci-Fi' and 'Sci-Fi ' name the same Tag.
+    return ' '.join(tag_name.split())
+
+
+# Folds the case of ASCII letters only, as SQLite's NOCASE collation, which the tags table compares names with, does.
+_ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+
+def tag_key(tag_name: str) -> str:
+    # The normalized name without regard to case, which every repository finds a Tag by, so that they all find the same
+    # Tag for a name however it is written.
+    return normalize_tag_name(tag_name).translate(_ASCII_LOWER)
+
+
+def split_tag_names(genres: str) -> List[str]:
+    # The normalized names in a comma-separated genre string, without empty or repeated names, in their given order.
+    names = dict()
+    for tag_name in genres.split(','):
+        tag_name = normalize_tag_name(tag_name)
+        if tag_name:
+            names.setdefault(tag_key(tag_name), tag_name)
+    return list(names.values())
+
+
+class TagDictionary:
+    """ Interns Tag names as small integer ids, 1, 2, 3, ... in the order they are first seen.
+
+    Names are normalized, and compared without regard to case (see tag_key), so each Tag is stored once however it is
+    written in the data. Both repositories load Tags through a TagDictionary, so that a Tag has the same id in either;
+    the ids are the keys of the tags table.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = dict()
+        self._names: List[str] = list()
+
+    def intern(self, tag_name: str) -> int:
+        # Returns the id of tag_name, adding it if it hasn't been seen.
+        tag_name = normalize_tag_name(tag_name)
+        key = tag_key(tag_name)
+        tag_id = self._ids.get(key)
+        if tag_id is None:
+            self._names.append(tag_name)
+            tag_id = self._ids[key] = len(self._names)
+        return tag_id
+
+    def id_of(self, tag_name: str) -> Optional[int]:
+        return self._ids.get(tag_key(tag_name))
+
+    def name_of(self, tag_id: int) -> str:
+        return self._names[tag_id - 1]
+
+    def items(self) -> Iterator[Tuple[int, str]]:
+        # The (id, name) of each Tag, in id order.
+        return enumerate(self._names, start=1)
+
+    def __len__(self) -> int:
+        return len(self._names)
@@ -0,0 +1,125 @@
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+# The sliding windows over which Movies are ranked by the number of Comments made on them.
+TRENDING_WINDOWS = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+    'week': timedelta(weeks=1)
+}
+
+# The number of top Movies each window keeps, which bounds how many can be ranked.
+TRENDING_CAPACITY = 50
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class TrendingCounters:
+    """ Thread-safe counts of the Comments made on each Movies over sliding windows of time.
+
+    Comments are counted into time buckets of bucket_width, and each window keeps a running count per Movies over its
+    buckets, so counting a Comment and sliding a window forward are both incremental. Each window also keeps its top
+    capacity Movies, so ranking them doesn't look at every counted Movies, let alone every Comment.
+    """
+
+    def __init__(self, windows: Dict[str, timedelta] = None, bucket_width: timedelta = timedelta(minutes=5),
+                 capacity: int = TRENDING_CAPACITY, clock=datetime.today):
+        self._windows = {
+            name: max(1, window // bucket_width) for name, window in (windows or TRENDING_WINDOWS).items()
+        }
+        self._bucket_width = bucket_width
+        self._capacity = capacity
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            # Bucket index -> Movies id -> number of Comments, for the buckets within the longest window.
+            self._buckets = dict()
+            # Per window: the oldest bucket it covers, its counts per Movies id, and its top Movies ids and counts.
+            self._starts = dict.fromkeys(self._windows)
+            self._counts = {name: Counter() for name in self._windows}
+            self._top = {name: dict() for name in self._windows}
+            self._stale = set()
+
+    def add(self, article_id: int, timestamp: datetime):
+        bucket = self._bucket(timestamp)
+        with self._lock:
+            self._advance()
+            if bucket < min(self._starts.values()):
+                # Older than every window.
+                return
+            self._buckets.setdefault(bucket, Counter())[article_id] += 1
+            for name, start in self._starts.items():
+                if bucket >= start:
+                    self._counts[name][article_id] += 1
+                    self._offer(name, article_id)
+
+    def replay(self, comments: Iterable[Tuple[int, datetime]]):
+        """ Rebuilds the counts from the (Movies id, timestamp) of every Comment, e.g. those already stored. """
+        self.clear()
+        for article_id, timestamp in comments:
+            self.add(article_id, timestamp)
+
+    def top(self, window: str, limit: int = 10) -> List[Tuple[int, int]]:
+        """ Returns the ids of, and numbers of Comments on, up to limit of the most commented Movies in window.
+
+        Raises KeyError if there is no such window. limit can't usefully exceed the capacity given when the counters
+        were created.
+        """
+        with self._lock:
+            self._advance()
+            if window in self._stale:
+                self._top[window] = dict(self._counts[window].most_common(self._capacity))
+                self._stale.discard(window)
+            top = list(self._top[window].items())
+
+        top.sort(key=lambda item: (-item[1], item[0]))
+        return top[:limit]
+
+    def _bucket(self, timestamp: datetime) -> int:
+        return (timestamp - _EPOCH) // self._bucket_width
+
+    # Helper method, called with the lock held, that keeps article_id in window's top Movies if it now belongs there.
+    def _offer(self, window: str, article_id: int):
+        count = self._counts[window][article_id]
+        top = self._top[window]
+        if article_id in top or len(top) < self._capacity:
+            top[article_id] = count
+            return
+        weakest = min(top, key=top.get)
+        if count > top[weakest]:
+            del top[weakest]
+            top[article_id] = count
+
+    # Helper method, called with the lock held, that slides each window forward to end at the current bucket.
+    def _advance(self):
+        now = self._bucket(self._clock())
+        for name, size in self._windows.items():
+            start = now - size + 1
+            previous = self._starts[name]
+            if previous is not None and start <= previous:
+                continue
+            self._starts[name] = start
+            if previous is None:
+                continue
+
+            counts = self._counts[name]
+            top = self._top[name]
+            for bucket, bucket_counts in self._buckets.items():
+                if previous <= bucket < start:
+                    for article_id, count in bucket_counts.items():
+                        counts[article_id] -= count
+                        if counts[article_id] <= 0:
+                            del counts[article_id]
+                    if not top.keys().isdisjoint(bucket_counts):
+                        # A top Movies lost Comments, so another might overtake it; the top is recomputed when read.
+                        self._stale.add(name)
+
+        # Drop the buckets that have left every window.
+        oldest = min(self._starts.values())
+        for bucket in [bucket for bucket in self._buckets if bucket < oldest]:
+            del self._buckets[bucket]
@@ -0,0 +1,24 @@
+from flask import Blueprint, session, current_app, jsonify, abort
+
+from chillax.authentication.authentication import login_required
+
+
+# Configure Blueprint.
+admin_blueprint = Blueprint(
+    'admin_bp', __name__, url_prefix='/admin')
+
+
+@admin_blueprint.route('/boot', methods=['GET'])
+@login_required
+def boot_timings():
+    # Return how long each phase of creating the application took, as JSON, to the users named in ADMIN_USERNAMES.
+    if session['username'] not in get_admin_usernames():
+        abort(403)
+
+    return jsonify(current_app.extensions['boot_timings'].to_dict())
+
+
+def get_admin_usernames():
+    # ADMIN_USERNAMES is a comma-separated list of usernames.
+    return {username.strip() for username in (current_app.config.get('ADMIN_USERNAMES') or '').split(',')
+            if username.strip()}
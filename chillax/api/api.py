@@ -0,0 +1,142 @@
+from datetime import date
+
+from flask import Blueprint, request, url_for, current_app
+from werkzeug.exceptions import HTTPException, BadRequest, NotFound
+
+import chillax.adapters.repository as repo
+import chillax.news.services as services
+import chillax.utilities.services as utilities_services
+
+from chillax.api.serialization import json_response, parse_fields, select_fields, UnknownFieldException
+from chillax.news.news import get_page_size, bounded_int_arg, parse_timestamp
+
+# The fields of the movie and comment dicts built by news.services, which clients can select with ?fields=.
+ARTICLE_FIELDS = (
+    'id', 'date', 'title', 'first_para', 'hyperlink', 'image_hyperlink', 'number_of_comments', 'tags', 'comments'
+)
+COMMENT_FIELDS = ('username', 'article_id', 'comment_text', 'timestamp')
+
+
+# Configure Blueprint.
+api_blueprint = Blueprint(
+    'api_v1_bp', __name__, url_prefix='/api/v1')
+
+
+@api_blueprint.errorhandler(HTTPException)
+def handle_error(error):
+    # Clients of the API get errors as JSON, not HTML pages.
+    return json_response({'error': error.name, 'message': error.description}, error.code)
+
+
+@api_blueprint.route('/articles', methods=['GET'])
+def articles_by_date():
+    # Return the movies on the date query parameter (by default the first date), with the previous and next dates
+    # that have movies.
+    fields = get_fields(ARTICLE_FIELDS)
+    bounds = services.get_catalogue_bounds(repo.repo_instance)
+    if bounds is None:
+        return json_response({'date': None, 'articles': [], 'previous_url': None, 'next_url': None})
+
+    target_date = request.args.get('date')
+    if target_date is None:
+        target_date = bounds['first_date']
+    else:
+        try:
+            target_date = date.fromisoformat(target_date)
+        except ValueError:
+            raise BadRequest('date must be in YYYY-MM-DD format')
+
+    articles, previous_date, next_date = services.get_articles_by_date(
+        target_date, repo.repo_instance, include_comments=wants_comments(fields))
+
+    return json_response({
+        'date': target_date,
+        'articles': select_fields(articles, fields),
+        'previous_url': page_url('api_v1_bp.articles_by_date', date=previous_date and previous_date.isoformat()),
+        'next_url': page_url('api_v1_bp.articles_by_date', date=next_date and next_date.isoformat())
+    })
+
+
+@api_blueprint.route('/articles/<int:article_id>', methods=['GET'])
+def article(article_id):
+    # Return a single movie, with its comments unless fields leaves them out.
+    fields = get_fields(ARTICLE_FIELDS)
+    include_comments = fields is None or 'comments' in fields
+
+    articles = services.get_articles_by_id([article_id], repo.repo_instance, include_comments=include_comments)
+    if len(articles) == 0:
+        raise NotFound(f'There is no movie with id {article_id}')
+
+    return json_response(select_fields(articles, fields)[0])
+
+
+@api_blueprint.route('/articles/<int:article_id>/comments', methods=['GET'])
+def comments_for_article(article_id):
+    # Return a page of a movie's comments, newest first, as for the comments loaded by its page.
+    fields = get_fields(COMMENT_FIELDS)
+    before = parse_timestamp(request.args.get('before'))
+    limit = bounded_int_arg('limit', int(current_app.config.get('COMMENTS_PER_PAGE') or 20),
+                            int(current_app.config.get('MAX_COMMENTS_PER_PAGE') or 100))
+
+    try:
+        comments = services.get_comments_for_article(article_id, repo.repo_instance, before, limit)
+    except services.NonExistentMoviesException:
+        raise NotFound(f'There is no movie with id {article_id}')
+
+    next_url = None
+    if len(comments) >= limit:
+        next_url = page_url('api_v1_bp.comments_for_article', article_id=article_id,
+                            before=comments[-1]['timestamp'].isoformat(), limit=limit)
+
+    return json_response({'article_id': article_id, 'comments': select_fields(comments, fields), 'next_url': next_url})
+
+
+@api_blueprint.route('/tags', methods=['GET'])
+def tags():
+    tag_names = utilities_services.get_tag_names(repo.repo_instance)
+    return json_response({
+        'tags': [
+            {'name': tag_name, 'articles_url': url_for('api_v1_bp.articles_by_tag', tag_name=tag_name)}
+            for tag_name in tag_names
+        ]
+    })
+
+
+@api_blueprint.route('/tags/<tag_name>/articles', methods=['GET'])
+def articles_by_tag(tag_name):
+    # Return a page of the movies with a tag, with the same cursors as the tag's pages.
+    fields = get_fields(ARTICLE_FIELDS)
+    cursor = request.args.get('cursor')
+    page_size = get_page_size()
+
+    article_ids = services.get_article_ids_for_tag(tag_name, repo.repo_instance)
+    page_ids, prev_cursor, next_cursor, _ = services.get_page_of_article_ids(article_ids, cursor, page_size)
+    articles = services.get_articles_by_id(page_ids, repo.repo_instance, include_comments=wants_comments(fields))
+
+    return json_response({
+        'tag': tag_name,
+        'articles': select_fields(articles, fields),
+        'previous_url': page_url('api_v1_bp.articles_by_tag', tag_name=tag_name, cursor=prev_cursor,
+                                 page_size=page_size),
+        'next_url': page_url('api_v1_bp.articles_by_tag', tag_name=tag_name, cursor=next_cursor, page_size=page_size)
+    })
+
+
+def get_fields(allowed):
+    # Read the fields query parameter, which names the fields to return for each item.
+    try:
+        return parse_fields(request.args.get('fields'), allowed)
+    except UnknownFieldException as e:
+        raise BadRequest(str(e))
+
+
+def wants_comments(fields):
+    # Listings leave out each movie's comments, which clients page through separately, unless fields asks for them.
+    return fields is not None and 'comments' in fields
+
+
+def page_url(endpoint, **values):
+    # The url of another page of results, selecting the same fields, or None if a value naming the page is None.
+    if any(value is None for value in values.values()):
+        return None
+    return url_for(endpoint, fields=request.args.get('fields'), **values)
@@ -0,0 +1,51 @@
+import json
+from datetime import date, datetime
+from typing import Iterable, List, Optional, Sequence
+
+from flask import Response
+
+try:
+    # orjson serializes several times faster than the json module, and handles dates itself.
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class UnknownFieldException(Exception):
+    pass
+
+
+def dumps(payload) -> bytes:
+    # Compact JSON, with dates and datetimes in ISO format.
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False, default=_iso_format).encode('utf-8')
+
+
+def json_response(payload, status: int = 200) -> Response:
+    return Response(dumps(payload), status=status, mimetype='application/json')
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> Optional[List[str]]:
+    # Returns the field names in the comma-separated fields query parameter, or None if there is none. Raises
+    # UnknownFieldException if one isn't in allowed.
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = [name for name in names if name not in allowed]
+    if len(unknown) > 0:
+        raise UnknownFieldException(f'Unknown fields: {", ".join(unknown)}')
+    return names
+
+
+def select_fields(items: Iterable[dict], fields: Optional[List[str]]) -> List[dict]:
+    # Returns items with only the named fields, or unchanged if fields is None.
+    if fields is None:
+        return list(items)
+    return [{name: item[name] for name in fields if name in item} for item in items]
+
+
+def _iso_format(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
@@ -0,0 +1,46 @@
+import asyncio
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from chillax.adapters.async_repository import AbstractAsyncRepository
+from chillax.authentication.services import (
+    NameNotUniqueException, UnknownUserException, AuthenticationException, user_to_dict
+)
+from chillax.domain.model import User
+
+# Async versions of the functions in authentication.services, for async views. Hashing and checking passwords is
+# deliberately slow CPU work, so it runs in the event loop's default executor rather than stalling the loop.
+
+
+async def add_user(username: str, password: str, repo: AbstractAsyncRepository):
+    # Check that the given username is available.
+    user = await repo.get_user(username)
+    if user is not None:
+        raise NameNotUniqueException
+
+    # Encrypt password so that the database doesn't store passwords 'in the clear'.
+    password_hash = await asyncio.get_running_loop().run_in_executor(None, generate_password_hash, password)
+
+    # Create and store the new User, with password encrypted.
+    user = User(username, password_hash)
+    await repo.add_user(user)
+
+
+async def get_user(username: str, repo: AbstractAsyncRepository):
+    user = await repo.get_user(username)
+    if user is None:
+        raise UnknownUserException
+
+    return user_to_dict(user)
+
+
+async def authenticate_user(username: str, password: str, repo: AbstractAsyncRepository):
+    authenticated = False
+
+    user = await repo.get_user(username)
+    if user is not None:
+        authenticated = await asyncio.get_running_loop().run_in_executor(
+            None, check_password_hash, user.password, password
+        )
+    if not authenticated:
+        raise AuthenticationException
@@ -4,12 +4,11 @@ from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, SubmitField
 from wtforms.validators import DataRequired, Length, ValidationError
 
-from password_validator import PasswordValidator
-
 from functools import wraps
 
 import chillax.utilities.utilities as utilities
 import chillax.authentication.services as services
+import chillax.authentication.policy as policy
 import chillax.adapters.repository as repo
 
 # Configure Blueprint.
@@ -26,7 +25,7 @@ def register():
         # Successful POST, i.e. the username and password have passed validation checking.
         # Use the service layer to attempt to add the new user.
         try:
-            services.add_user(form.username.data, form.password.data, repo.repo_instance)
+            services.add_user(form.username.data, form.password.data, repo.repo_instance, policy.get_policy())
 
             # All is well, redirect the user to the login page.
             return redirect(url_for('authentication_bp.login'))
@@ -103,17 +102,12 @@ def login_required(view):
 class PasswordValid:
     def __init__(self, message=None):
         if not message:
-            message = u'Your password must be at least 8 characters, and contain an upper case letter, a lower case letter and a digit'
+            message = policy.CredentialPolicy.PASSWORD_MESSAGE
         self.message = message
 
     def __call__(self, form, field):
-        schema = PasswordValidator()
-        schema \
-            .min(8) \
-            .has().uppercase() \
-            .has().lowercase() \
-            .has().digits()
-        if not schema.validate(field.data):
+        # Check against the shared policy's rules, which are built once rather than for each password.
+        if not policy.get_policy().password_is_valid(field.data):
             raise ValidationError(self.message)
 
 
@@ -0,0 +1,94 @@
+import hashlib
+import math
+import threading
+from typing import Iterable, Optional
+
+from password_validator import PasswordValidator
+
+# The CredentialPolicy shared by every request, built once by create_app from the repository's usernames.
+policy_instance = None
+
+
+class UsernameBloomFilter:
+    """ A compact, thread-safe set of usernames that answers "might this username be taken?".
+
+    might_contain never misses a username that was added, but may wrongly report one that wasn't; once capacity
+    usernames are added, it does so for about error_rate of other usernames.
+    """
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.01):
+        self._size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self._hashes = max(1, round(self._size / capacity * math.log(2)))
+        self._bits = bytearray((self._size + 7) // 8)
+        self._lock = threading.Lock()
+
+    def add(self, username: str):
+        positions = self._positions(username)
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+
+    def might_contain(self, username: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(username))
+
+    def _positions(self, username: str):
+        # Double hashing: the bit positions come from two halves of a single digest.
+        digest = hashlib.blake2b(username.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self._size for i in range(self._hashes)]
+
+
+class CredentialPolicy:
+    """ The rules that new credentials must meet, built once and shared by every registration.
+
+    Passwords are checked against a password_validator schema built when the policy is created, rather than for each
+    password. Usernames already taken are tracked in a UsernameBloomFilter, so a new username - almost every one being
+    registered - is known to be free without looking it up in the repository.
+    """
+
+    USERNAME_MESSAGE = 'Your username is too short'
+    PASSWORD_MESSAGE = ('Your password must be at least 8 characters, and contain an upper case letter, a lower case '
+                        'letter and a digit')
+    MIN_USERNAME_LENGTH = 3
+
+    def __init__(self, usernames: Iterable[str] = (), capacity: int = None):
+        self._password_schema = PasswordValidator()
+        self._password_schema \
+            .min(8) \
+            .has().uppercase() \
+            .has().lowercase() \
+            .has().digits()
+
+        usernames = list(usernames)
+        # Leave room for registrations, so that the false-positive rate stays near its target as users are added.
+        self._usernames = UsernameBloomFilter(capacity or max(100000, 2 * len(usernames)))
+        for username in usernames:
+            self._usernames.add(username)
+
+    def password_is_valid(self, password: str) -> bool:
+        return self._password_schema.validate(password)
+
+    def problem_with(self, username: str, password: str) -> Optional[str]:
+        """ Returns why the credentials break the rules the registration form applies, or None if they don't. """
+        if len(username) < self.MIN_USERNAME_LENGTH:
+            return self.USERNAME_MESSAGE
+        if not self.password_is_valid(password):
+            return self.PASSWORD_MESSAGE
+        return None
+
+    def username_might_be_taken(self, username: str) -> bool:
+        """ Returns False only if username is certainly not taken, as far as this policy has been told. """
+        return self._usernames.might_contain(username)
+
+    def record_username(self, username: str):
+        """ Records that username has been taken. """
+        self._usernames.add(username)
+
+
+def get_policy() -> CredentialPolicy:
+    # Returns the shared CredentialPolicy, creating one that knows no usernames if the application hasn't.
+    global policy_instance
+    if policy_instance is None:
+        policy_instance = CredentialPolicy()
+    return policy_instance
@@ -1,9 +1,16 @@
+from typing import Callable, Iterable, List, Tuple
+
 from werkzeug.security import generate_password_hash, check_password_hash
 
-from chillax.adapters.repository import AbstractRepository
+from chillax.adapters.repository import AbstractRepository, RepositoryException
+from chillax.authentication.policy import CredentialPolicy
 from chillax.domain.model import User
 
 
+# The reason given for rejecting a username, when registering users in bulk, that another User has.
+USERNAME_TAKEN = 'Username already taken'
+
+
 class NameNotUniqueException(Exception):
     pass
 
@@ -16,18 +23,44 @@ class AuthenticationException(Exception):
     pass
 
 
-def add_user(username: str, password: str, repo: AbstractRepository):
-    # Check that the given username is available.
-    user = repo.get_user(username)
-    if user is not None:
-        raise NameNotUniqueException
+def add_user(username: str, password: str, repo: AbstractRepository, policy: CredentialPolicy = None):
+    # Check that the given username is available. The policy knows the usernames already taken, so the repository is
+    # only asked about a username that the policy can't rule out.
+    if policy is None or policy.username_might_be_taken(username):
+        user = repo.get_user(username)
+        if user is not None:
+            raise NameNotUniqueException
 
     # Encrypt password so that the database doesn't store passwords 'in the clear'.
     password_hash = generate_password_hash(password)
 
-    # Create and store the new User, with password encrypted.
+    # Create and store the new User, with password encrypted. A repository that enforces unique usernames still
+    # rejects one taken behind the policy's back.
     user = User(username, password_hash)
-    repo.add_user(user)
+    try:
+        repo.add_user(user)
+    except RepositoryException:
+        raise NameNotUniqueException
+
+    if policy is not None:
+        policy.record_username(username)
+
+
+def store_users(credentials: List[Tuple[str, str]], repo: AbstractRepository, policy: CredentialPolicy,
+                hash_passwords: Callable[[List[str]], Iterable[str]] = None):
+    # Add Users, whose credentials have already been checked, in one bulk write. hash_passwords encrypts a batch of
+    # passwords, e.g. across a pool of processes; by default they are encrypted one after another.
+    if len(credentials) == 0:
+        return
+    hash_passwords = hash_passwords or hash_in_turn
+    password_hashes = hash_passwords([password for _, password in credentials])
+    repo.add_users([User(username, password_hash) for (username, _), password_hash in zip(credentials, password_hashes)])
+    for username, _ in credentials:
+        policy.record_username(username)
+
+
+def hash_in_turn(passwords: List[str]) -> List[str]:
+    return [generate_password_hash(password) for password in passwords]
 
 
 def get_user(username: str, repo: AbstractRepository):
@@ -0,0 +1,110 @@
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Tuple
+
+import click
+from flask.cli import with_appcontext
+from werkzeug.security import generate_password_hash
+
+import chillax.adapters.repository as repo
+import chillax.authentication.policy as policy
+import chillax.authentication.services as services
+from chillax.adapters.repository import AbstractRepository
+from chillax.authentication.policy import CredentialPolicy
+
+
+class ImportReport(NamedTuple):
+    imported: int
+    rejected: int
+    seconds: float
+
+    @property
+    def users_per_second(self) -> float:
+        return (self.imported + self.rejected) / self.seconds if self.seconds > 0 else 0.0
+
+
+def read_credentials(lines: Iterable[str]) -> Iterator[Tuple[int, str, str]]:
+    # Stream the (line number, username, password) of each user in CSV with username and password columns, as in
+    # users.csv; any other columns, such as id, are ignored.
+    reader = csv.DictReader(lines)
+    if reader.fieldnames is None or not {'username', 'password'} <= set(reader.fieldnames):
+        raise ValueError('The users CSV must have username and password columns')
+    for row in reader:
+        yield reader.line_num, (row['username'] or '').strip(), row['password'] or ''
+
+
+def import_users(credentials: Iterable[Tuple[int, str, str]], repo: AbstractRepository, policy: CredentialPolicy,
+                 batch_size: int = 1000, hash_passwords: Callable[[List[str]], Iterable[str]] = None,
+                 reject: Callable[[int, str, str], None] = None) -> ImportReport:
+    """ Registers the users of credentials, as read by read_credentials, batch_size at a time.
+
+    The usernames already taken are read in a single query, then every user is checked against them, against the
+    others in the import and against the policy's rules. Each batch of accepted users has its passwords encrypted by
+    hash_passwords and is then added in one bulk write. reject is called with the line number, username and reason of
+    each user that isn't added.
+    """
+    started = time.perf_counter()
+    taken = set(repo.get_usernames())
+    imported = 0
+    rejected = 0
+
+    credentials = iter(credentials)
+    while True:
+        batch = list(islice(credentials, batch_size))
+        if len(batch) == 0:
+            break
+
+        accepted = list()
+        for line, username, password in batch:
+            problem = services.USERNAME_TAKEN if username in taken else policy.problem_with(username, password)
+            if problem is not None:
+                rejected += 1
+                if reject is not None:
+                    reject(line, username, problem)
+                continue
+            taken.add(username)
+            accepted.append((username, password))
+
+        services.store_users(accepted, repo, policy, hash_passwords)
+        imported += len(accepted)
+
+    return ImportReport(imported, rejected, time.perf_counter() - started)
+
+
+@click.command('import-users')
+@click.argument('users_file', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--rejects', type=click.File('w', encoding='utf-8'), default='rejects.csv', show_default=True,
+              help='CSV file listing the users that were not imported, and why.')
+@click.option('--batch-size', type=click.IntRange(min=1), default=1000, show_default=True,
+              help='Number of users added in each transaction.')
+@click.option('--workers', type=click.IntRange(min=0), default=os.cpu_count(), show_default=True,
+              help='Number of processes encrypting passwords; 0 encrypts them in this process.')
+@with_appcontext
+def import_users_command(users_file, rejects, batch_size, workers):
+    """ Import users from a CSV file with username and password columns. """
+    rejects_writer = csv.writer(rejects)
+    rejects_writer.writerow(['line', 'username', 'reason'])
+
+    def reject(line, username, reason):
+        rejects_writer.writerow([line, username, reason])
+
+    try:
+        if workers == 0:
+            report = import_users(read_credentials(users_file), repo.repo_instance, policy.get_policy(),
+                                  batch_size, reject=reject)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                def hash_passwords(passwords):
+                    return executor.map(generate_password_hash, passwords,
+                                        chunksize=max(1, len(passwords) // (workers * 4)))
+
+                report = import_users(read_credentials(users_file), repo.repo_instance, policy.get_policy(),
+                                      batch_size, hash_passwords, reject)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    click.echo(f'Imported {report.imported} users and rejected {report.rejected} in {report.seconds:.2f} s '
+               f'({report.users_per_second:.0f} users/s); rejects written to {rejects.name}')
@@ -1,5 +1,7 @@
+from array import array
+from bisect import bisect_left, insort
 from datetime import date, datetime
-from typing import List, Iterable
+from typing import List, Iterable, Optional
 
 
 class User:
@@ -66,6 +68,10 @@ class Comment:
 
 
 class Movies:
+    # Movies loaded by the ORM aren't constructed with __init__; their array of Tag ids is built from their Tags when
+    # first needed (and again when the ORM reloads them).
+    _tag_ids = None
+
     def __init__(
             self, date: date, title: str, first_para: str, hyperlink: str, image_hyperlink: str, id: int = None
     ):
@@ -76,7 +82,14 @@ class Movies:
         self._hyperlink: str = hyperlink
         self._image_hyperlink: str = image_hyperlink
         self._comments: List[Comment] = list()
+        # Counted as Comments are added, so that the count doesn't need the Comments loaded. The ORM maps it to a
+        # COUNT of the Movies' rows in the comments table.
+        self._number_of_comments: int = 0
         self._tags: List[Tag] = list()
+        # Counted as Tags are added, as Comments are. The ORM maps it to a COUNT of the Movies' rows in article_tags.
+        self._number_of_tags: int = 0
+        # The ids of the Tags, as a sorted array of machine integers, for membership tests that compare ints.
+        self._tag_ids = array('I')
 
     @property
     def id(self) -> int:
@@ -108,17 +121,21 @@ class Movies:
 
     @property
     def number_of_comments(self) -> int:
-        return len(self._comments)
+        return self._number_of_comments
 
     @property
     def number_of_tags(self) -> int:
-        return len(self._tags)
+        return self._number_of_tags
 
     @property
     def tags(self) -> Iterable['Tag']:
         return iter(self._tags)
 
     def is_tagged_by(self, tag: 'Tag'):
+        tag_ids = self._current_tag_ids() if tag.id is not None else None
+        if tag_ids is not None:
+            index = bisect_left(tag_ids, tag.id)
+            return index < len(tag_ids) and tag_ids[index] == tag.id
         return tag in self._tags
 
     def is_tagged(self) -> bool:
@@ -126,9 +143,22 @@ class Movies:
 
     def add_comment(self, comment: Comment):
         self._comments.append(comment)
+        self._number_of_comments += 1
 
     def add_tag(self, tag: 'Tag'):
         self._tags.append(tag)
+        self._number_of_tags += 1
+        if tag.id is not None and self._tag_ids is not None:
+            insort(self._tag_ids, tag.id)
+
+    def _current_tag_ids(self) -> Optional[array]:
+        # The array of Tag ids, rebuilt if Tags were added without it, as the ORM adds them, or None if a Tag has no id
+        # (it hasn't been interned or stored), in which case the array can't answer for the Tags.
+        if self._tag_ids is None or len(self._tag_ids) != len(self._tags):
+            if any(tag.id is None for tag in self._tags):
+                return None
+            self._tag_ids = array('I', sorted(tag.id for tag in self._tags))
+        return self._tag_ids
 
     def __repr__(self):
         return f'<Movies {self._date.isoformat()} {self._title}>'
@@ -150,11 +180,16 @@ class Movies:
 
 class Tag:
     def __init__(
-            self, tag_name: str
+            self, tag_name: str, id: int = None
     ):
+        self._id: int = id
         self._tag_name: str = tag_name
         self._tagged_articles: List[Movies] = list()
 
+    @property
+    def id(self) -> int:
+        return self._id
+
     @property
     def tag_name(self) -> str:
         return self._tag_name
@@ -168,7 +203,8 @@ class Tag:
         return len(self._tagged_articles)
 
     def is_applied_to(self, article: Movies) -> bool:
-        return article in self._tagged_articles
+        # Ask the Movies, which has a handful of Tags, rather than searching the Tag's (possibly many) Movies.
+        return article.is_tagged_by(self)
 
     def add_article(self, article: Movies):
         self._tagged_articles.append(article)
@@ -183,7 +219,9 @@ class ModelException(Exception):
     pass
 
 
-def make_comment(comment_text: str, user: User, article: Movies, timestamp: datetime = datetime.today()):
+def make_comment(comment_text: str, user: User, article: Movies, timestamp: datetime = None):
+    if timestamp is None:
+        timestamp = datetime.today()
     comment = Comment(user, article, comment_text, timestamp)
     user.add_comment(comment)
     article.add_comment(comment)
@@ -1,5 +1,7 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, url_for
 
+import chillax.adapters.repository as repo
+import chillax.news.services as news_services
 import chillax.utilities.utilities as utilities
 
 
@@ -11,5 +13,24 @@ def home():
     return render_template(
         'home/home.html',
         selected_articles=utilities.get_selected_articles(),
-        tag_urls=utilities.get_tags_and_urls()
+        tag_urls=utilities.get_tags_and_urls(),
+        recent_comments=get_recent_comments(),
+        trending_articles=get_trending_articles()
     )
+
+
+def get_trending_articles(window='day', quantity=5):
+    articles = news_services.get_trending_articles(window, repo.repo_instance, quantity)
+
+    for article in articles:
+        article['hyperlink'] = url_for('news_bp.articles_by_date', date=article['date'].isoformat())
+    return articles
+
+
+def get_recent_comments(quantity=10):
+    comments = news_services.get_recent_comments(repo.repo_instance, quantity)
+
+    for comment in comments:
+        comment['hyperlink'] = url_for('news_bp.articles_by_date', date=comment['article_date'].isoformat(),
+                                       view_comments_for=comment['article_id'])
+    return comments
@@ -0,0 +1,99 @@
+from datetime import datetime
+
+from chillax.adapters.async_repository import AbstractAsyncRepository
+from chillax.domain.model import make_comment
+from chillax.news.services import (
+    NonExistentMoviesException, UnknownUserException, dto_cache, bounds_to_dict, comments_to_dict
+)
+
+# Async versions of the functions in news.services, for async views. They take an AbstractAsyncRepository, raise the
+# same exceptions and return the same dictionaries as their synchronous counterparts.
+
+
+async def add_comment(article_id: int, comment_text: str, username: str, repo: AbstractAsyncRepository):
+    # Check that the article exists.
+    article = await repo.get_article(article_id)
+    if article is None:
+        raise NonExistentMoviesException
+
+    user = await repo.get_user(username)
+    if user is None:
+        raise UnknownUserException
+
+    # Create comment.
+    comment = make_comment(comment_text, user, article)
+
+    # Update the repository.
+    await repo.add_comment(comment)
+
+
+async def get_article(article_id: int, repo: AbstractAsyncRepository):
+    article = await repo.get_article(article_id)
+
+    if article is None:
+        raise NonExistentMoviesException
+
+    return dto_cache(repo).article_to_dict(article)
+
+
+async def get_first_article(repo: AbstractAsyncRepository):
+    article = await repo.get_first_article()
+    return dto_cache(repo).article_to_dict(article)
+
+
+async def get_last_article(repo: AbstractAsyncRepository):
+    article = await repo.get_last_article()
+    return dto_cache(repo).article_to_dict(article)
+
+
+async def get_catalogue_bounds(repo: AbstractAsyncRepository):
+    bounds = await repo.get_catalogue_bounds()
+
+    if bounds is None:
+        return None
+
+    return bounds_to_dict(bounds)
+
+
+async def get_articles_by_date(date, repo: AbstractAsyncRepository, include_comments: bool = True):
+    # Returns articles for the target date (empty if no matches), the date of the previous article (might be null), the date of the next article (might be null)
+
+    articles = await repo.get_articles_by_date(target_date=date)
+
+    articles_dto = list()
+    prev_date = next_date = None
+
+    if len(articles) > 0:
+        prev_date = await repo.get_date_of_previous_article(articles[0])
+        next_date = await repo.get_date_of_next_article(articles[0])
+
+        # Convert Articles to dictionary form.
+        articles_dto = dto_cache(repo).articles_to_dict(articles, include_comments)
+
+    return articles_dto, prev_date, next_date
+
+
+async def get_article_ids_for_tag(tag_name, repo: AbstractAsyncRepository):
+    article_ids = await repo.get_article_ids_for_tag(tag_name)
+
+    return article_ids
+
+
+async def get_articles_by_id(id_list, repo: AbstractAsyncRepository, include_comments: bool = True):
+    articles = await repo.get_articles_by_id(id_list)
+
+    # Convert Articles to dictionary form.
+    articles_as_dict = dto_cache(repo).articles_to_dict(articles, include_comments)
+
+    return articles_as_dict
+
+
+async def get_comments_for_article(article_id, repo: AbstractAsyncRepository, before: datetime = None,
+                                   limit: int = None):
+    # Returns a page of the article's comments newest first, as services.get_comments_for_article does.
+    article = await repo.get_article(article_id)
+
+    if article is None:
+        raise NonExistentMoviesException
+
+    return comments_to_dict(await repo.get_comments_for_article(article_id, before, limit))
@@ -0,0 +1,131 @@
+import functools
+import importlib.util
+import os
+import re
+from bisect import bisect_right
+from typing import Iterable, List
+
+from chillax.domain.model import Comment
+
+# The characters that may stand in for a letter of a profane word, as in better_profanity (e.g. '4' or '@' for 'a').
+LEET_VARIANTS = {
+    'a': 'a@*4',
+    'i': 'i*l1',
+    'o': 'o*0@',
+    'u': 'u*v',
+    'v': 'v*u',
+    'l': 'l1',
+    'e': 'e*3',
+    's': 's$5',
+    't': 't7',
+}
+
+# better_profanity's wordlist, which the validator has always checked comments against. The package is only located,
+# not imported, since importing it loads and expands the wordlist, which this module compiles itself.
+DEFAULT_WORDLIST = os.path.join(
+    importlib.util.find_spec('better_profanity').submodule_search_locations[0], 'profanity_wordlist.txt'
+)
+
+# Words are runs of letters, digits and the characters that stand in for letters; a profane word only matches a whole
+# word (or, for a phrase, whole words separated by whitespace), so 'classic' doesn't match 'ass'.
+_WORD_CHARACTER = r'''(?:[^\W_]|[@$*"'])'''
+
+
+class ProfanityFilter:
+    """ Finds profane words, and their leetspeak spellings, in text.
+
+    The wordlist is compiled once into a single regular expression, shaped as a trie of the words, so a text is scanned
+    in one pass by the regex engine rather than word by word in Python.
+    """
+
+    def __init__(self, words: Iterable[str]):
+        self._pattern = re.compile(
+            f'(?<!{_WORD_CHARACTER})(?:{trie_pattern(words)})(?!{_WORD_CHARACTER})', re.IGNORECASE
+        )
+
+    def contains_profanity(self, text: str) -> bool:
+        return self._pattern.search(text) is not None
+
+    def censor(self, text: str, censor_char: str = '*') -> str:
+        return self._pattern.sub(censor_char * 4, text)
+
+    def find_profane(self, texts: List[str]) -> List[int]:
+        """ Returns the indexes, in ascending order, of those of texts that contain profanity.
+
+        The texts are joined and scanned together, rather than searched one at a time.
+        """
+        if len(texts) == 0:
+            return []
+
+        # The texts are joined with a NUL, which is neither whitespace nor a character a word may contain, so no match
+        # can include it and none spans two texts. (A newline would let a phrase's whitespace span the join.)
+        starts = list()
+        offset = 0
+        for text in texts:
+            starts.append(offset)
+            offset += len(text) + 1
+
+        profane = list()
+        for match in self._pattern.finditer('\0'.join(texts)):
+            index = bisect_right(starts, match.start()) - 1
+            if len(profane) == 0 or profane[-1] != index:
+                profane.append(index)
+        return profane
+
+
+@functools.lru_cache(maxsize=None)
+def default_filter() -> ProfanityFilter:
+    # Compiled on first use, then shared.
+    return ProfanityFilter(read_wordlist(DEFAULT_WORDLIST))
+
+
+def contains_profanity(text: str) -> bool:
+    return default_filter().contains_profanity(text)
+
+
+def find_profane_comments(comments: Iterable[Comment], profanity_filter: ProfanityFilter = None) -> List[Comment]:
+    # Re-moderates a batch of Comments, e.g. every stored Comment after the wordlist changes, returning those that
+    # contain profanity.
+    comments = list(comments)
+    profanity_filter = profanity_filter or default_filter()
+    return [comments[index] for index in profanity_filter.find_profane([comment.comment for comment in comments])]
+
+
+def read_wordlist(filename: str) -> List[str]:
+    with open(filename, encoding='utf-8') as wordlist:
+        return [word.strip().lower() for word in wordlist if word.strip()]
+
+
+def trie_pattern(words: Iterable[str]) -> str:
+    # Builds a regular expression that matches any of words, with each letter matching its leetspeak variants and each
+    # space matching any whitespace. Words that share a prefix share the start of the expression, so the engine tries
+    # each prefix once rather than once per word.
+    trie = dict()
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, dict())
+        node[''] = None
+    return _node_pattern(trie)
+
+
+def _node_pattern(node: dict) -> str:
+    alternatives = [
+        _char_pattern(char) + _node_pattern(child) for char, child in sorted(node.items()) if char != ''
+    ]
+    if len(alternatives) == 0:
+        return ''
+    pattern = alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+    if '' in node:
+        # A word ends here, and longer words continue.
+        pattern = f'(?:{pattern})?'
+    return pattern
+
+
+def _char_pattern(char: str) -> str:
+    if char == ' ':
+        return r'\s+'
+    variants = LEET_VARIANTS.get(char)
+    if variants is None:
+        return re.escape(char)
+    return '[' + ''.join(re.escape(variant) for variant in variants) + ']'
@@ -1,16 +1,18 @@
-from datetime import date
+from datetime import date, datetime
 
 from flask import Blueprint
-from flask import request, render_template, redirect, url_for, session
+from flask import request, render_template, redirect, url_for, session, jsonify, abort, current_app
 
-from better_profanity import profanity
 from flask_wtf import FlaskForm
 from wtforms import TextAreaField, HiddenField, SubmitField
 from wtforms.validators import DataRequired, Length, ValidationError
 
 import chillax.adapters.repository as repo
+from chillax.adapters.trending import TRENDING_WINDOWS, TRENDING_CAPACITY
 import chillax.utilities.utilities as utilities
 import chillax.news.services as services
+import chillax.news.moderation as moderation
+import chillax.watchlist.services as watchlist_services
 
 from chillax.authentication.authentication import login_required
 
@@ -26,13 +28,16 @@ def articles_by_date():
     target_date = request.args.get('date')
     article_to_show_comments = request.args.get('view_comments_for')
 
-    # Fetch the first and last articles in the series.
-    first_article = services.get_first_article(repo.repo_instance)
-    last_article = services.get_last_article(repo.repo_instance)
+    # Fetch the dates of the first and last articles in the series.
+    bounds = services.get_catalogue_bounds(repo.repo_instance)
+
+    if bounds is None:
+        # There are no articles at all, so return the homepage.
+        return redirect(url_for('home_bp.home'))
 
     if target_date is None:
         # No date query parameter, so return articles from day 1 of the series.
-        target_date = first_article['date']
+        target_date = bounds['first_date']
     else:
         # Convert target_date from string to date.
         target_date = date.fromisoformat(target_date)
@@ -46,7 +51,7 @@ def articles_by_date():
 
     # Fetch article(s) for the target date. This call also returns the previous and next dates for articles immediately
     # before and after the target date.
-    articles, previous_date, next_date = services.get_articles_by_date(target_date, repo.repo_instance)
+    articles, previous_date, next_date = services.get_articles_by_date(target_date, repo.repo_instance, include_comments=False)
 
     first_article_url = None
     last_article_url = None
@@ -58,25 +63,29 @@ def articles_by_date():
         if previous_date is not None:
             # There are articles on a previous date, so generate URLs for the 'previous' and 'first' navigation buttons.
             prev_article_url = url_for('news_bp.articles_by_date', date=previous_date.isoformat())
-            first_article_url = url_for('news_bp.articles_by_date', date=first_article['date'].isoformat())
+            first_article_url = url_for('news_bp.articles_by_date', date=bounds['first_date'].isoformat())
 
         # There are articles on a subsequent date, so generate URLs for the 'next' and 'last' navigation buttons.
         if next_date is not None:
             next_article_url = url_for('news_bp.articles_by_date', date=next_date.isoformat())
-            last_article_url = url_for('news_bp.articles_by_date', date=last_article['date'].isoformat())
+            last_article_url = url_for('news_bp.articles_by_date', date=bounds['last_date'].isoformat())
+
+        watchlisted = get_watchlisted_ids([article['id'] for article in articles])
 
         # Construct urls for viewing article comments and adding comments.
         for article in articles:
             article['view_comment_url'] = url_for('news_bp.articles_by_date', date=target_date, view_comments_for=article['id'])
             article['add_comment_url'] = url_for('news_bp.comment_on_article', article=article['id'])
+            article['comments_url'] = url_for('news_bp.comments_for_article', article_id=article['id'])
+            add_watchlist_url(article, watchlisted)
 
         # Generate the webpage to display the articles.
-        return render_template(
+        return utilities.render_page(
             'news/articles.html',
             title='Movies',
             articles_title=target_date.strftime('%A %B %e %Y'),
             articles=articles,
-            selected_articles=utilities.get_selected_articles(len(articles) * 2),
+            selected_articles=utilities.get_selected_articles(),
             tag_urls=utilities.get_tags_and_urls(),
             first_article_url=first_article_url,
             last_article_url=last_article_url,
@@ -91,12 +100,11 @@ def articles_by_date():
 
 @news_blueprint.route('/articles_by_tag', methods=['GET'])
 def articles_by_tag():
-    articles_per_page = 1000
-
     # Read query parameters.
     tag_name = request.args.get('tag')
     cursor = request.args.get('cursor')
     article_to_show_comments = request.args.get('view_comments_for')
+    articles_per_page = get_page_size()
 
     if article_to_show_comments is None:
         # No view-comments query parameter, so set to a non-existent article id.
@@ -105,50 +113,50 @@ def articles_by_tag():
         # Convert article_to_show_comments from string to int.
         article_to_show_comments = int(article_to_show_comments)
 
-    if cursor is None:
-        # No cursor query parameter, so initialise cursor to start at the beginning.
-        cursor = 0
-    else:
-        # Convert cursor from string to int.
-        cursor = int(cursor)
-
     # Retrieve article ids for articles that are tagged with tag_name.
     article_ids = services.get_article_ids_for_tag(tag_name, repo.repo_instance)
 
-    # Retrieve the batch of articles to display on the Web page.
-    articles = services.get_articles_by_id(article_ids[cursor:cursor + articles_per_page], repo.repo_instance)
+    # Select the page of article ids starting at cursor. A missing or malformed cursor starts at the beginning.
+    page_ids, prev_cursor, next_cursor, last_cursor = services.get_page_of_article_ids(
+        article_ids, cursor, articles_per_page)
+
+    # Retrieve the batch of articles to display on the Web page. Comments are fetched on demand by the page, and
+    # articles are converted as the page is generated.
+    articles = services.iter_articles_by_id(page_ids, repo.repo_instance, include_comments=False)
 
     first_article_url = None
     last_article_url = None
     next_article_url = None
     prev_article_url = None
 
-    if cursor > 0:
+    if prev_cursor is not None:
         # There are preceding articles, so generate URLs for the 'previous' and 'first' navigation buttons.
-        prev_article_url = url_for('news_bp.articles_by_tag', tag=tag_name, cursor=cursor - articles_per_page)
-        first_article_url = url_for('news_bp.articles_by_tag', tag=tag_name)
+        prev_article_url = url_for('news_bp.articles_by_tag', tag=tag_name, cursor=prev_cursor, page_size=articles_per_page)
+        first_article_url = url_for('news_bp.articles_by_tag', tag=tag_name, page_size=articles_per_page)
 
-    if cursor + articles_per_page < len(article_ids):
+    if next_cursor is not None:
         # There are further articles, so generate URLs for the 'next' and 'last' navigation buttons.
-        next_article_url = url_for('news_bp.articles_by_tag', tag=tag_name, cursor=cursor + articles_per_page)
+        next_article_url = url_for('news_bp.articles_by_tag', tag=tag_name, cursor=next_cursor, page_size=articles_per_page)
+        last_article_url = url_for('news_bp.articles_by_tag', tag=tag_name, cursor=last_cursor, page_size=articles_per_page)
 
-        last_cursor = articles_per_page * int(len(article_ids) / articles_per_page)
-        if len(article_ids) % articles_per_page == 0:
-            last_cursor -= articles_per_page
-        last_article_url = url_for('news_bp.articles_by_tag', tag=tag_name, cursor=last_cursor)
+    watchlisted = get_watchlisted_ids(page_ids)
 
-    # Construct urls for viewing article comments and adding comments.
-    for article in articles:
-        article['view_comment_url'] = url_for('news_bp.articles_by_tag', tag=tag_name, cursor=cursor, view_comments_for=article['id'])
-        article['add_comment_url'] = url_for('news_bp.comment_on_article', article=article['id'])
+    def articles_with_urls():
+        # Construct urls for viewing article comments and adding comments.
+        for article in articles:
+            article['view_comment_url'] = url_for('news_bp.articles_by_tag', tag=tag_name, cursor=cursor, view_comments_for=article['id'])
+            article['add_comment_url'] = url_for('news_bp.comment_on_article', article=article['id'])
+            article['comments_url'] = url_for('news_bp.comments_for_article', article_id=article['id'])
+            add_watchlist_url(article, watchlisted)
+            yield article
 
     # Generate the webpage to display the articles.
-    return render_template(
+    return utilities.render_page(
         'news/articles.html',
         title='Movies',
         articles_title='All movies in ' + tag_name,
-        articles=articles,
-        selected_articles=utilities.get_selected_articles(len(articles) * 2),
+        articles=articles_with_urls(),
+        selected_articles=utilities.get_selected_articles(),
         tag_urls=utilities.get_tags_and_urls(),
         first_article_url=first_article_url,
         last_article_url=last_article_url,
@@ -158,6 +166,95 @@ def articles_by_tag():
     )
 
 
+@news_blueprint.route('/articles/<int:article_id>/comments', methods=['GET'])
+def comments_for_article(article_id):
+    # Return a page of the comments for a single article as JSON, newest first, for pages that load comments on demand.
+    # The page holds the comments made before the before query parameter (an ISO timestamp); a missing or malformed
+    # one starts with the newest comment.
+    before = parse_timestamp(request.args.get('before'))
+    limit = bounded_int_arg('limit', int(current_app.config.get('COMMENTS_PER_PAGE') or 20),
+                            int(current_app.config.get('MAX_COMMENTS_PER_PAGE') or 100))
+
+    try:
+        comments = services.get_comments_for_article(article_id, repo.repo_instance, before, limit)
+    except services.NonExistentMoviesException:
+        abort(404)
+
+    next_url = None
+    if len(comments) >= limit:
+        next_url = url_for('news_bp.comments_for_article', article_id=article_id,
+                           before=comments[-1]['timestamp'].isoformat(), limit=limit)
+
+    for comment in comments:
+        comment['timestamp'] = comment['timestamp'].isoformat()
+
+    return jsonify(article_id=article_id, comments=comments, next_url=next_url)
+
+
+@news_blueprint.route('/users/<username>/comments', methods=['GET'])
+def comments_by_user(username):
+    # Show a page of a user's comments, newest first, with a link to the next (older) page. As for an article's
+    # comments, the page holds the comments made before the before query parameter.
+    before = parse_timestamp(request.args.get('before'))
+    limit = bounded_int_arg('limit', int(current_app.config.get('COMMENTS_PER_PAGE') or 20),
+                            int(current_app.config.get('MAX_COMMENTS_PER_PAGE') or 100))
+
+    try:
+        comments = services.get_comments_by_user(username, repo.repo_instance, before, limit)
+    except services.UnknownUserException:
+        abort(404)
+
+    for comment in comments:
+        comment['hyperlink'] = url_for('news_bp.articles_by_date', date=comment['article_date'].isoformat(),
+                                       view_comments_for=comment['article_id'])
+
+    next_url = None
+    if len(comments) >= limit:
+        next_url = url_for('news_bp.comments_by_user', username=username,
+                           before=comments[-1]['timestamp'].isoformat(), limit=limit)
+
+    return render_template(
+        'news/user_comments.html',
+        username=username,
+        comments=comments,
+        next_url=next_url,
+        first_url=url_for('news_bp.comments_by_user', username=username) if before is not None else None,
+        tag_urls=utilities.get_tags_and_urls()
+    )
+
+
+@news_blueprint.route('/articles/trending', methods=['GET'])
+def trending_articles():
+    # Return the articles with the most comments made within the last hour, day or week (the window query parameter,
+    # by default a day) as JSON, most commented first.
+    window = request.args.get('window', 'day')
+    if window not in TRENDING_WINDOWS:
+        abort(404)
+    limit = bounded_int_arg('limit', 10, TRENDING_CAPACITY)
+
+    articles = services.get_trending_articles(window, repo.repo_instance, limit)
+    for article in articles:
+        article['date'] = article['date'].isoformat()
+        article['url'] = url_for('news_bp.articles_by_date', date=article['date'])
+
+    return jsonify(window=window, articles=articles)
+
+
+@news_blueprint.route('/comments/recent', methods=['GET'])
+def recent_comments():
+    # Return the comments most recently made on any article as JSON, newest first. They are held in memory by the
+    # repository, so this never reads every comment.
+    size = int(current_app.config.get('RECENT_COMMENTS_SIZE') or 50)
+    limit = bounded_int_arg('limit', size, size)
+
+    comments = services.get_recent_comments(repo.repo_instance, limit)
+    for comment in comments:
+        comment['article_date'] = comment['article_date'].isoformat()
+        comment['timestamp'] = comment['timestamp'].isoformat()
+
+    return jsonify(comments=comments)
+
+
 @news_blueprint.route('/comment', methods=['GET', 'POST'])
 @login_required
 def comment_on_article():
@@ -210,6 +307,45 @@ def comment_on_article():
     )
 
 
+def get_watchlisted_ids(article_ids):
+    # Returns those of article_ids on the logged in user's watchlist, looked up for the whole page at once.
+    if 'username' not in session:
+        return set()
+    return watchlist_services.get_watchlisted_article_ids(session['username'], article_ids, repo.repo_instance)
+
+
+def add_watchlist_url(article, watchlisted):
+    # Mark whether article is on the watchlist (its id is in watchlisted), with the url that toggles it.
+    article['on_watchlist'] = article['id'] in watchlisted
+    article['watchlist_url'] = url_for('watchlist_bp.remove' if article['on_watchlist'] else 'watchlist_bp.add')
+
+
+def get_page_size():
+    # Read the page_size query parameter, bounded by the configured maximum.
+    return bounded_int_arg('page_size', int(current_app.config.get('ARTICLES_PER_PAGE') or 50),
+                           int(current_app.config.get('MAX_ARTICLES_PER_PAGE') or 200))
+
+
+def bounded_int_arg(name, default, maximum):
+    # Read an integer query parameter, falling back to default if it's missing or malformed, bounded by maximum.
+    try:
+        value = int(request.args.get(name, default))
+    except ValueError:
+        value = default
+
+    return min(max(value, 1), maximum)
+
+
+def parse_timestamp(value):
+    # Returns the datetime given by an ISO timestamp, or None if value is missing or malformed.
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
 class ProfanityFree:
     def __init__(self, message=None):
         if not message:
@@ -217,7 +353,7 @@ class ProfanityFree:
         self.message = message
 
     def __call__(self, form, field):
-        if profanity.contains_profanity(field.data):
+        if moderation.contains_profanity(field.data):
             raise ValidationError(self.message)
 
 
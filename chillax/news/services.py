@@ -1,7 +1,14 @@
+import base64
+import binascii
+import weakref
+from bisect import bisect_left
+from datetime import datetime
 from typing import List, Iterable
 
-from chillax.adapters.repository import AbstractRepository
+from chillax.adapters.caching_repository import LRUCache
+from chillax.adapters.repository import AbstractRepository, CatalogueBounds, RecentComment
 from chillax.domain.model import make_comment, Movies, Comment, Tag
+from chillax.news import moderation
 
 
 class NonExistentMoviesException(Exception):
@@ -35,23 +42,32 @@ def get_article(article_id: int, repo: AbstractRepository):
     if article is None:
         raise NonExistentMoviesException
 
-    return article_to_dict(article)
+    return dto_cache(repo).article_to_dict(article)
 
 
 def get_first_article(repo: AbstractRepository):
 
     article = repo.get_first_article()
 
-    return article_to_dict(article)
+    return dto_cache(repo).article_to_dict(article)
 
 
 def get_last_article(repo: AbstractRepository):
 
     article = repo.get_last_article()
-    return article_to_dict(article)
+    return dto_cache(repo).article_to_dict(article)
 
 
-def get_articles_by_date(date, repo: AbstractRepository):
+def get_catalogue_bounds(repo: AbstractRepository):
+    bounds = repo.get_catalogue_bounds()
+
+    if bounds is None:
+        return None
+
+    return bounds_to_dict(bounds)
+
+
+def get_articles_by_date(date, repo: AbstractRepository, include_comments: bool = True):
     # Returns articles for the target date (empty if no matches), the date of the previous article (might be null), the date of the next article (might be null)
 
     articles = repo.get_articles_by_date(target_date=date)
@@ -64,7 +80,7 @@ def get_articles_by_date(date, repo: AbstractRepository):
         next_date = repo.get_date_of_next_article(articles[0])
 
         # Convert Articles to dictionary form.
-        articles_dto = articles_to_dict(articles)
+        articles_dto = dto_cache(repo).articles_to_dict(articles, include_comments)
 
     return articles_dto, prev_date, next_date
 
@@ -75,29 +91,171 @@ def get_article_ids_for_tag(tag_name, repo: AbstractRepository):
     return article_ids
 
 
-def get_articles_by_id(id_list, repo: AbstractRepository):
+def get_articles_by_id(id_list, repo: AbstractRepository, include_comments: bool = True):
     articles = repo.get_articles_by_id(id_list)
 
     # Convert Articles to dictionary form.
-    articles_as_dict = articles_to_dict(articles)
+    articles_as_dict = dto_cache(repo).articles_to_dict(articles, include_comments)
 
     return articles_as_dict
 
 
-def get_comments_for_article(article_id, repo: AbstractRepository):
+def iter_articles_by_id(id_list, repo: AbstractRepository, include_comments: bool = True):
+    # Like get_articles_by_id, but converts each Movies to dictionary form only as it is consumed.
+    articles = repo.get_articles_by_id(id_list)
+    cache = dto_cache(repo)
+
+    for article in articles:
+        yield cache.article_to_dict(article, include_comments)
+
+
+def get_page_of_article_ids(article_ids: List[int], cursor, page_size: int):
+    # Returns the ids on the page starting at cursor, and the cursors of the previous, next and last pages (any of
+    # which might be null). article_ids must be in ascending order, as returned by get_article_ids_for_tag.
+    start_id = decode_cursor(cursor)
+    start = 0 if start_id is None else bisect_left(article_ids, start_id)
+
+    page = article_ids[start:start + page_size]
+
+    prev_cursor = next_cursor = last_cursor = None
+    if start > 0:
+        prev_cursor = encode_cursor(article_ids[max(start - page_size, 0)])
+    if start + page_size < len(article_ids):
+        next_cursor = encode_cursor(article_ids[start + page_size])
+        last_start = page_size * ((len(article_ids) - 1) // page_size)
+        last_cursor = encode_cursor(article_ids[last_start])
+
+    return page, prev_cursor, next_cursor, last_cursor
+
+
+def encode_cursor(article_id: int) -> str:
+    # Cursors are opaque to clients; they name the id of the first article on a page, so they stay valid as
+    # articles are added to a tag.
+    return base64.urlsafe_b64encode(str(article_id).encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    # Returns the article id named by cursor, or None if cursor is missing or malformed.
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode('ascii')).decode('ascii'))
+    except (ValueError, binascii.Error, UnicodeError):
+        return None
+
+
+def get_comments_for_article(article_id, repo: AbstractRepository, before: datetime = None, limit: int = None):
+    # Returns the article's comments newest first, optionally only those made before the timestamp before and at most
+    # limit of them (see AbstractRepository.get_comments_for_article).
     article = repo.get_article(article_id)
 
     if article is None:
         raise NonExistentMoviesException
 
-    return comments_to_dict(article.comments)
+    return comments_to_dict(repo.get_comments_for_article(article_id, before, limit))
+
+
+def get_comments_by_user(username: str, repo: AbstractRepository, before: datetime = None, limit: int = None):
+    # Returns the user's comments newest first, each with the title and date of the article commented on, optionally
+    # only those made before the timestamp before and at most limit of them (see
+    # AbstractRepository.get_comments_by_user).
+    user = repo.get_user(username)
+
+    if user is None:
+        raise UnknownUserException
+
+    comments = list()
+    for comment in repo.get_comments_by_user(username, before, limit):
+        comment_dict = comment_to_dict(comment)
+        comment_dict['article_title'] = comment.article.title
+        comment_dict['article_date'] = comment.article.date
+        comments.append(comment_dict)
+    return comments
+
+
+def get_trending_articles(window: str, repo: AbstractRepository, limit: int = 10):
+    # Returns the articles with the most comments made within window ('hour', 'day' or 'week'), most commented first,
+    # each with its number of comments in the window. Raises KeyError for an unknown window.
+    trending = repo.get_trending_article_ids(window, limit)
+    articles = {article.id: article for article in repo.get_articles_by_id([article_id for article_id, _ in trending])}
+
+    trending_articles = list()
+    for article_id, count in trending:
+        if article_id in articles:
+            article = dto_cache(repo).article_to_dict(articles[article_id], include_comments=False)
+            article['comment_count'] = count
+            trending_articles.append(article)
+    return trending_articles
+
+
+def get_profane_comments(repo: AbstractRepository):
+    # Re-moderates every stored comment in one batch, returning those that contain profanity.
+    return comments_to_dict(moderation.find_profane_comments(repo.get_comments()))
+
+
+def get_recent_comments(repo: AbstractRepository, limit: int = None):
+    # Returns the comments most recently made on any article, newest first.
+    return recent_comments_to_dict(repo.get_recent_comments(limit))
+
+
+# ============================================
+# Memoized conversion of Movies to dicts
+# ============================================
+
+class ArticleDTOCache:
+    """ Memoizes Movies dicts, rebuilding an article's dict only when its comments or tags change.
+
+    Comments and tags are only ever added, so their counts serve as the version of a cached dict.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self._dtos = LRUCache(maxsize)
+
+    def article_to_dict(self, article: Movies, include_comments: bool = True):
+        if article.id is None:
+            return article_to_dict(article, include_comments)
+
+        key = (article.id, include_comments)
+        version = (article.number_of_comments, article.number_of_tags)
+        entry = self._dtos.get(key, None)
+        if entry is None or entry[0] != version:
+            entry = (version, article_to_dict(article, include_comments))
+            self._dtos.put(key, entry)
+
+        # Callers add request-specific urls to the dict, and to its comments, so hand out a copy of each.
+        return copy_article_dict(entry[1])
+
+    def articles_to_dict(self, articles: Iterable[Movies], include_comments: bool = True):
+        return [self.article_to_dict(article, include_comments) for article in articles]
+
+
+def copy_article_dict(article_dict):
+    # A copy of an article's dict that shares nothing that can be changed with it: the lists of comment and tag dicts
+    # are copied, dict by dict. The values in those are immutable (strings, dates and ids).
+    article_dict = dict(article_dict)
+    for key in ('comments', 'tags'):
+        if key in article_dict:
+            article_dict[key] = [dict(item) for item in article_dict[key]]
+    return article_dict
+
+
+# Each repository gets its own cache, so that Movies ids from different repositories never collide.
+_dto_caches = weakref.WeakKeyDictionary()
+
+
+def dto_cache(repo: AbstractRepository) -> ArticleDTOCache:
+    cache = _dto_caches.get(repo)
+    if cache is None:
+        cache = _dto_caches.setdefault(repo, ArticleDTOCache())
+    return cache
 
 
 # ============================================
 # Functions to convert model entities to dicts
 # ============================================
 
-def article_to_dict(article: Movies):
+def article_to_dict(article: Movies, include_comments: bool = True):
     article_dict = {
         'id': article.id,
         'date': article.date,
@@ -105,14 +263,26 @@ def article_to_dict(article: Movies):
         'first_para': article.first_para,
         'hyperlink': article.hyperlink,
         'image_hyperlink': article.image_hyperlink,
-        'comments': comments_to_dict(article.comments),
-        'tags': tags_to_dict(article.tags)
+        'number_of_comments': article.number_of_comments,
+        'tags': tags_to_refs(article.tags)
     }
+    if include_comments:
+        article_dict['comments'] = comments_to_dict(article.comments)
     return article_dict
 
 
-def articles_to_dict(articles: Iterable[Movies]):
-    return [article_to_dict(article) for article in articles]
+def articles_to_dict(articles: Iterable[Movies], include_comments: bool = True):
+    return [article_to_dict(article, include_comments) for article in articles]
+
+
+def bounds_to_dict(bounds: CatalogueBounds):
+    bounds_dict = {
+        'first_date': bounds.first_date,
+        'last_date': bounds.last_date,
+        'first_article_id': bounds.first_article_id,
+        'last_article_id': bounds.last_article_id
+    }
+    return bounds_dict
 
 
 def comment_to_dict(comment: Comment):
@@ -129,6 +299,22 @@ def comments_to_dict(comments: Iterable[Comment]):
     return [comment_to_dict(comment) for comment in comments]
 
 
+def recent_comment_to_dict(comment: RecentComment):
+    comment_dict = {
+        'username': comment.username,
+        'article_id': comment.article_id,
+        'article_title': comment.article_title,
+        'article_date': comment.article_date,
+        'comment_text': comment.comment,
+        'timestamp': comment.timestamp
+    }
+    return comment_dict
+
+
+def recent_comments_to_dict(comments: Iterable[RecentComment]):
+    return [recent_comment_to_dict(comment) for comment in comments]
+
+
 def tag_to_dict(tag: Tag):
     tag_dict = {
         'name': tag.tag_name,
@@ -141,6 +327,18 @@ def tags_to_dict(tags: Iterable[Tag]):
     return [tag_to_dict(tag) for tag in tags]
 
 
+def tag_to_ref(tag: Tag):
+    # A lightweight reference to a Tag, without its (potentially huge) list of tagged Movies.
+    tag_ref = {
+        'name': tag.tag_name
+    }
+    return tag_ref
+
+
+def tags_to_refs(tags: Iterable[Tag]):
+    return [tag_to_ref(tag) for tag in tags]
+
+
 # ============================================
 # Functions to convert dicts to model entities
 # ============================================
@@ -0,0 +1,131 @@
+import hashlib
+import mimetypes
+import os
+
+import click
+from flask import Response, current_app, send_from_directory
+from flask.cli import with_appcontext
+
+from chillax.utilities.compression import accepted_encoding, compress, brotli, MIN_COMPRESS_SIZE
+
+# Files of these types are worth compressing; images such as PNGs and JPEGs are compressed already.
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.json', '.html', '.txt', '.svg', '.ico', '.map'}
+
+# The extensions of the precompressed variants of a file, e.g. main.css.gz, by encoding.
+VARIANT_EXTENSIONS = {'gzip': '.gz', 'br': '.br'}
+
+# Fingerprinted files never change, since a change gives them a new name, so browsers may cache them for a year.
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+class AssetManifest:
+    """ Content-hashed names for the files in a static folder, e.g. css/main.3fa2b8c1d9e0.css for css/main.css.
+
+    url_for('static', filename=...) is given the fingerprinted name, which send_asset serves with headers letting
+    browsers cache it for good. Compressible files are sent in the encoding the client accepts, from the .gz or .br
+    variant written by build_variants or, failing that, compressed once and kept in memory.
+    """
+
+    def __init__(self, static_folder: str):
+        self._folder = static_folder
+        self._fingerprints = dict()
+        self._filenames = dict()
+        self._variants = dict()
+
+        for directory, _, files in os.walk(static_folder):
+            for file in files:
+                if os.path.splitext(file)[1] in VARIANT_EXTENSIONS.values():
+                    continue
+                filename = os.path.relpath(os.path.join(directory, file), static_folder).replace(os.sep, '/')
+                digest = file_digest(os.path.join(directory, file))
+                stem, extension = os.path.splitext(filename)
+                fingerprinted = f'{stem}.{digest}{extension}'
+                self._fingerprints[filename] = (fingerprinted, digest)
+                self._filenames[fingerprinted] = filename
+
+    def fingerprinted(self, filename: str) -> str:
+        # Returns the fingerprinted name of filename, or filename itself if it isn't in the static folder.
+        entry = self._fingerprints.get(filename)
+        return filename if entry is None else entry[0]
+
+    def url_defaults(self, endpoint, values):
+        # Registered with app.url_defaults, so that url_for('static', filename=...) links to the fingerprinted name.
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = self.fingerprinted(values['filename'])
+
+    def send_asset(self, filename):
+        # Replaces the app's static view.
+        original = self._filenames.get(filename)
+        if original is None:
+            # A plain name, e.g. one written into a page by hand, is served as Flask would serve it.
+            return send_from_directory(self._folder, filename)
+
+        encoding = accepted_encoding() if is_compressible(original) else None
+        data = self._variant(original, encoding) if encoding is not None else None
+        if data is None:
+            response = send_from_directory(self._folder, original)
+        else:
+            response = Response(data, mimetype=mimetypes.guess_type(original)[0])
+            response.headers['Content-Encoding'] = encoding
+
+        if is_compressible(original):
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = IMMUTABLE
+        response.set_etag(self._fingerprints[original][1] + ('' if encoding is None else '-' + encoding))
+        return response
+
+    def build_variants(self):
+        # Write the .gz and (if brotli is installed) .br variants of each compressible file, returning their paths.
+        written = list()
+        for filename in self._fingerprints:
+            path = os.path.join(self._folder, filename)
+            if not is_compressible(filename) or os.path.getsize(path) < MIN_COMPRESS_SIZE:
+                continue
+            with open(path, 'rb') as file:
+                data = file.read()
+            for encoding, extension in VARIANT_EXTENSIONS.items():
+                if encoding == 'br' and brotli is None:
+                    continue
+                with open(path + extension, 'wb') as variant:
+                    variant.write(compress(data, encoding, best=True))
+                written.append(path + extension)
+        return written
+
+    def _variant(self, filename: str, encoding: str):
+        # Returns filename's content in encoding, or None if it is too small to be worth compressing.
+        key = (filename, encoding)
+        if key not in self._variants:
+            path = os.path.join(self._folder, filename)
+            variant_path = path + VARIANT_EXTENSIONS[encoding]
+            if os.path.getsize(path) < MIN_COMPRESS_SIZE:
+                data = None
+            elif os.path.isfile(variant_path) and os.path.getmtime(variant_path) >= os.path.getmtime(path):
+                with open(variant_path, 'rb') as variant:
+                    data = variant.read()
+            else:
+                with open(path, 'rb') as file:
+                    data = compress(file.read(), encoding, best=True)
+            self._variants[key] = data
+        return self._variants[key]
+
+
+def is_compressible(filename: str) -> bool:
+    return os.path.splitext(filename)[1].lower() in COMPRESSIBLE_EXTENSIONS
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=6)
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+    """ Write precompressed .gz and .br variants of the compressible static files. """
+    written = AssetManifest(current_app.static_folder).build_variants()
+    for path in written:
+        click.echo(path)
+    click.echo(f'Wrote {len(written)} precompressed files')
@@ -0,0 +1,54 @@
+import cProfile
+import time
+from contextlib import contextmanager
+from typing import List, Tuple
+
+
+class BootTimings:
+    """ The time taken by each phase of creating the application, in the order they ran.
+
+    Each call to mark ends a phase, which began when the previous phase ended (or when the timings were created).
+    """
+
+    def __init__(self):
+        self._last = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = list()
+
+    def record(self, phase: str, seconds: float):
+        # Adds a phase timed elsewhere, e.g. importing the application before it was created.
+        self.phases.append((phase, seconds))
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    @property
+    def total(self) -> float:
+        return sum(seconds for _, seconds in self.phases)
+
+    def to_dict(self):
+        return {
+            'phases': [{'phase': phase, 'ms': round(seconds * 1000, 1)} for phase, seconds in self.phases],
+            'total_ms': round(self.total * 1000, 1)
+        }
+
+    def summary(self) -> str:
+        phases = ', '.join(f'{phase} {seconds * 1000:.1f} ms' for phase, seconds in self.phases)
+        return f'Booted in {self.total * 1000:.1f} ms: {phases}'
+
+
+@contextmanager
+def profiled(path: str = None):
+    # Profile the block with cProfile, writing the stats to path (for pstats or snakeviz); without a path, just run it.
+    if not path:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
@@ -0,0 +1,80 @@
+import gzip
+import zlib
+
+from flask import request
+
+try:
+    # Brotli compresses text better than gzip, but is an optional dependency.
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this gain too little from compression to be worth it.
+MIN_COMPRESS_SIZE = 500
+
+# The types of generated response worth compressing.
+COMPRESSIBLE_MIMETYPES = {'text/html', 'text/plain', 'text/css', 'application/json', 'application/javascript'}
+
+
+def compress_response(response, minimum_size: int = MIN_COMPRESS_SIZE):
+    # Compress the body of response, if it is of a compressible type, the client accepts an encoding and the body is
+    # at least minimum_size bytes. A streamed body, whose size isn't known, is compressed as it is streamed. Files and
+    # already-encoded responses are left alone.
+    if response.direct_passthrough or 'Content-Encoding' in response.headers \
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES \
+            or not 200 <= response.status_code < 300 or response.status_code == 204:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = accepted_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < minimum_size:
+            return response
+        response.set_data(compress(data, encoding))
+
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def accepted_encoding():
+    # Returns the encoding, 'br' or 'gzip', in which to send the response to this request, or None for neither.
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br'] > 0:
+        return 'br'
+    if accepted['gzip'] > 0:
+        return 'gzip'
+    return None
+
+
+def compress(data: bytes, encoding: str, best: bool = False) -> bytes:
+    # Generated responses use mid-range levels: most of the saving of the highest level, at a fraction of its cost.
+    # Static files are compressed once, so best uses the highest.
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if best else 5)
+    return gzip.compress(data, compresslevel=9 if best else 6)
+
+
+def compress_stream(chunks, encoding: str):
+    # Compress each chunk of a streamed body as it is produced, flushing after each so that the client receives the
+    # page as it is generated, as it would uncompressed.
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=5)
+        for chunk in chunks:
+            yield compressor.process(encode(chunk)) + compressor.flush()
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            yield compressor.compress(encode(chunk)) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+
+
+def encode(chunk) -> bytes:
+    return chunk.encode('utf-8') if isinstance(chunk, str) else chunk
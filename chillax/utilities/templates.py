@@ -0,0 +1,26 @@
+import os
+import time
+
+from flask import Flask
+from jinja2 import FileSystemBytecodeCache
+
+
+def use_bytecode_cache(app: Flask, cache_dir: str):
+    # Have Jinja keep compiled templates in cache_dir, so that each new worker loads them rather than compiling them
+    # again. This must be done before the app's Jinja environment is first used.
+    os.makedirs(cache_dir, exist_ok=True)
+    app.jinja_options = dict(app.jinja_options, bytecode_cache=FileSystemBytecodeCache(cache_dir))
+
+
+def precompile_templates(app: Flask) -> int:
+    # Load every template in the app's template folder into the Jinja environment's cache - from the bytecode cache,
+    # if there is one, or by compiling it - so that the first request to use each doesn't wait for it. Returns the
+    # number of templates loaded, and logs how long it took at INFO, which create_app has the app's logger report
+    # outside debug mode too.
+    started = time.perf_counter()
+    loader = app.jinja_loader
+    names = loader.list_templates() if loader is not None else []
+    for name in names:
+        app.jinja_env.get_template(name)
+    app.logger.info('Precompiled %d templates in %.1f ms', len(names), (time.perf_counter() - started) * 1000)
+    return len(names)
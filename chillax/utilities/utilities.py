@@ -1,4 +1,5 @@
 from flask import Blueprint, request, render_template, redirect, url_for, session
+from flask import Response, current_app, stream_with_context
 
 import chillax.adapters.repository as repo
 import chillax.utilities.services as services
@@ -18,6 +19,27 @@ def get_tags_and_urls():
     return tag_urls
 
 
+def render_page(template_name, **context):
+    # Render a (potentially large) page, streaming it to the client when STREAM_TEMPLATES is enabled.
+    if current_app.config.get('STREAM_TEMPLATES') in (True, 'True'):
+        return stream_template(template_name, **context)
+    return render_template(template_name, **context)
+
+
+def stream_template(template_name, **context):
+    # Generate the page with Jinja's streaming interface, so that the header and first articles are sent while the rest
+    # of the page - including any generators passed in context - is still being produced.
+    app = current_app._get_current_object()
+    app.update_template_context(context)
+    template = app.jinja_env.get_template(template_name)
+
+    stream = template.stream(context)
+    # Group Jinja's many small fragments into fewer, larger chunks.
+    stream.enable_buffering(size=int(app.config.get('STREAM_BUFFER_SIZE') or 32))
+
+    return Response(stream_with_context(stream), mimetype='text/html')
+
+
 def get_selected_articles(quantity=25):
     articles = services.get_random_articles(quantity, repo.repo_instance)
 
@@ -0,0 +1,44 @@
+from typing import Iterable
+
+from chillax.adapters.repository import AbstractRepository
+
+
+class NonExistentMoviesException(Exception):
+    pass
+
+
+class UnknownUserException(Exception):
+    pass
+
+
+def add_to_watchlist(username: str, article_id: int, repo: AbstractRepository):
+    check_user_and_article(username, article_id, repo)
+
+    repo.add_to_watchlist(username, article_id)
+
+
+def remove_from_watchlist(username: str, article_id: int, repo: AbstractRepository):
+    check_user_and_article(username, article_id, repo)
+
+    repo.remove_from_watchlist(username, article_id)
+
+
+def get_watchlist(username: str, repo: AbstractRepository):
+    # Returns the ids, in ascending order, of the movies on the user's watchlist.
+    if repo.get_user(username) is None:
+        raise UnknownUserException
+
+    return repo.get_watchlist(username)
+
+
+def get_watchlisted_article_ids(username: str, article_ids: Iterable[int], repo: AbstractRepository):
+    # Returns those of article_ids that are on the user's watchlist, in a single lookup.
+    return repo.get_watchlisted_article_ids(username, article_ids)
+
+
+def check_user_and_article(username: str, article_id: int, repo: AbstractRepository):
+    if repo.get_user(username) is None:
+        raise UnknownUserException
+
+    if repo.get_article(article_id) is None:
+        raise NonExistentMoviesException
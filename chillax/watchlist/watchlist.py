@@ -0,0 +1,129 @@
+from urllib.parse import urlsplit
+
+from flask import Blueprint, request, redirect, url_for, session, jsonify, abort
+
+from flask_wtf import FlaskForm
+from wtforms import HiddenField
+from wtforms.validators import DataRequired
+
+import chillax.adapters.repository as repo
+import chillax.news.services as news_services
+import chillax.utilities.utilities as utilities
+import chillax.watchlist.services as services
+
+from chillax.authentication.authentication import login_required
+from chillax.news.news import get_page_size, add_watchlist_url
+
+
+# Configure Blueprint.
+watchlist_blueprint = Blueprint(
+    'watchlist_bp', __name__, url_prefix='/watchlist')
+
+
+@watchlist_blueprint.route('/', methods=['GET'])
+@login_required
+def watchlist():
+    username = session['username']
+    cursor = request.args.get('cursor')
+    articles_per_page = get_page_size()
+
+    try:
+        article_ids = services.get_watchlist(username, repo.repo_instance)
+    except services.UnknownUserException:
+        # The user has been removed since logging in.
+        return redirect(url_for('authentication_bp.login'))
+
+    # Select the page of article ids starting at cursor, as for the movies with a tag.
+    page_ids, prev_cursor, next_cursor, last_cursor = news_services.get_page_of_article_ids(
+        article_ids, cursor, articles_per_page)
+    articles = news_services.get_articles_by_id(page_ids, repo.repo_instance, include_comments=False)
+
+    first_article_url = None
+    last_article_url = None
+    next_article_url = None
+    prev_article_url = None
+
+    if prev_cursor is not None:
+        prev_article_url = url_for('watchlist_bp.watchlist', cursor=prev_cursor, page_size=articles_per_page)
+        first_article_url = url_for('watchlist_bp.watchlist', page_size=articles_per_page)
+
+    if next_cursor is not None:
+        next_article_url = url_for('watchlist_bp.watchlist', cursor=next_cursor, page_size=articles_per_page)
+        last_article_url = url_for('watchlist_bp.watchlist', cursor=last_cursor, page_size=articles_per_page)
+
+    # Every movie on the page is on the watchlist, so its button removes it.
+    watchlisted = set(page_ids)
+    for article in articles:
+        article['add_comment_url'] = url_for('news_bp.comment_on_article', article=article['id'])
+        article['comments_url'] = url_for('news_bp.comments_for_article', article_id=article['id'])
+        add_watchlist_url(article, watchlisted)
+
+    return utilities.render_page(
+        'news/articles.html',
+        title='Watchlist',
+        articles_title='Your watchlist',
+        articles=articles,
+        selected_articles=utilities.get_selected_articles(),
+        tag_urls=utilities.get_tags_and_urls(),
+        first_article_url=first_article_url,
+        last_article_url=last_article_url,
+        prev_article_url=prev_article_url,
+        next_article_url=next_article_url,
+        show_comments_for_article=-1
+    )
+
+
+@watchlist_blueprint.route('/add', methods=['POST'])
+@login_required
+def add():
+    return update_watchlist(services.add_to_watchlist)
+
+
+@watchlist_blueprint.route('/remove', methods=['POST'])
+@login_required
+def remove():
+    return update_watchlist(services.remove_from_watchlist)
+
+
+@watchlist_blueprint.route('/contains', methods=['GET'])
+@login_required
+def contains():
+    # Return which of the comma-separated movie ids in the ids query parameter are on the user's watchlist, as JSON.
+    try:
+        article_ids = [int(article_id) for article_id in request.args.get('ids', '').split(',') if article_id]
+    except ValueError:
+        abort(400)
+
+    watchlisted = services.get_watchlisted_article_ids(session['username'], article_ids, repo.repo_instance)
+    return jsonify(article_ids=sorted(watchlisted))
+
+
+def update_watchlist(update):
+    form = WatchlistForm()
+    if not form.validate_on_submit():
+        abort(400)
+
+    try:
+        update(session['username'], int(form.article_id.data), repo.repo_instance)
+    except (services.UnknownUserException, services.NonExistentMoviesException, ValueError):
+        abort(404)
+
+    # Return to the page the button was on, if it is a page of this site.
+    next_url = form.next.data
+    if not is_local_url(next_url):
+        next_url = url_for('watchlist_bp.watchlist')
+    return redirect(next_url)
+
+
+def is_local_url(url):
+    # A path on this site: no scheme or host, nor a '//host' or '/\\host' url that browsers take to be another site.
+    if not url or not url.startswith('/') or url.startswith('//') or '\\' in url:
+        return False
+    parts = urlsplit(url)
+    return parts.scheme == '' and parts.netloc == ''
+
+
+class WatchlistForm(FlaskForm):
+    article_id = HiddenField('Movie id', [DataRequired()])
+    # The page the button is on, to return to.
+    next = HiddenField('Next page')
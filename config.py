@@ -21,4 +21,41 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
     REPOSITORY = environ.get('REPOSITORY')
-
+    REPOPULATE_DATABASE = environ.get('REPOPULATE_DATABASE')
+    REPOSITORY_THREAD_SAFE = environ.get('REPOSITORY_THREAD_SAFE')
+    FREEZE_REPOSITORY = environ.get('FREEZE_REPOSITORY')
+
+    # Pagination configuration
+    ARTICLES_PER_PAGE = environ.get('ARTICLES_PER_PAGE')
+    MAX_ARTICLES_PER_PAGE = environ.get('MAX_ARTICLES_PER_PAGE')
+    COMMENTS_PER_PAGE = environ.get('COMMENTS_PER_PAGE')
+    MAX_COMMENTS_PER_PAGE = environ.get('MAX_COMMENTS_PER_PAGE')
+
+    # Streaming of large listing pages
+    STREAM_TEMPLATES = environ.get('STREAM_TEMPLATES')
+    STREAM_BUFFER_SIZE = environ.get('STREAM_BUFFER_SIZE')
+
+    # Read-through repository cache configuration
+    REPOSITORY_CACHE = environ.get('REPOSITORY_CACHE')
+    REPOSITORY_CACHE_SIZE = environ.get('REPOSITORY_CACHE_SIZE')
+
+    # Write-behind queue for comments (database repository only)
+    COMMENT_WRITE_BEHIND = environ.get('COMMENT_WRITE_BEHIND')
+    COMMENT_FLUSH_INTERVAL = environ.get('COMMENT_FLUSH_INTERVAL')
+    COMMENT_QUEUE_SIZE = environ.get('COMMENT_QUEUE_SIZE')
+
+    # Recent-activity feed
+    RECENT_COMMENTS_SIZE = environ.get('RECENT_COMMENTS_SIZE')
+
+    # Static asset fingerprinting and response compression
+    FINGERPRINT_STATIC = environ.get('FINGERPRINT_STATIC')
+    COMPRESS_RESPONSES = environ.get('COMPRESS_RESPONSES')
+    COMPRESS_MIN_SIZE = environ.get('COMPRESS_MIN_SIZE')
+
+    # Template compilation
+    TEMPLATE_CACHE_DIR = environ.get('TEMPLATE_CACHE_DIR')
+    PRECOMPILE_TEMPLATES = environ.get('PRECOMPILE_TEMPLATES')
+
+    # Boot diagnostics
+    PROFILE_POPULATE = environ.get('PROFILE_POPULATE')
+    ADMIN_USERNAMES = environ.get('ADMIN_USERNAMES')
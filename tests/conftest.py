@@ -88,6 +88,7 @@ def client():
     my_app = create_app({
         'TESTING': True,  # Set to True during testing.
         'REPOSITORY': 'database',  # Set to 'memory' or 'database' depending on desired repository.
+        'REPOPULATE_DATABASE': True,  # Start each test from the test data.
         'TEST_DATA_PATH': TEST_DATA_PATH_DATABASE,  # Path for loading test data into the repository.
         'WTF_CSRF_ENABLED': False  # test_client will not send a CSRF token, so disable validation.
     })
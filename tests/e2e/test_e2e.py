@@ -0,0 +1,384 @@
+import gzip
+import os
+import re
+import subprocess
+import sys
+import uuid
+
+import pytest
+from flask import url_for
+
+from chillax import create_app
+from conftest import TEST_DATA_PATH_MEMORY, TEST_DATA_PATH_DATABASE
+
+
+def test_articles_by_tag_is_paginated(client):
+    response = client.get('/articles_by_tag?tag=Drama&page_size=10')
+    assert response.status_code == 200
+
+    # Only one page of cards is rendered, and comments are not embedded in the page.
+    assert response.data.count(b'class="ui card"') == 10
+    assert b'data-comments-url="/articles/' in response.data
+    assert b'cursor=' in response.data
+
+
+def test_articles_by_tag_page_size_is_bounded(client):
+    response = client.get('/articles_by_tag?tag=Drama&page_size=100000')
+    assert response.status_code == 200
+    assert response.data.count(b'class="ui card"') <= 200
+
+
+def test_comments_for_article(client):
+    response = client.get('/articles/1/comments')
+    assert response.status_code == 200
+
+    data = response.get_json()
+    assert data['article_id'] == 1
+    assert len(data['comments']) > 0
+    assert {'username', 'comment_text', 'timestamp'} <= set(data['comments'][0].keys())
+
+
+def test_comments_for_article_are_paged(client):
+    data = client.get('/articles/1/comments?limit=2').get_json()
+
+    assert len(data['comments']) == 2
+    assert data['next_url'] is not None
+
+    data = client.get(data['next_url']).get_json()
+    assert len(data['comments']) == 1
+    assert data['next_url'] is None
+
+
+def test_comments_for_non_existent_article(client):
+    response = client.get('/articles/5000/comments')
+    assert response.status_code == 404
+
+
+def test_recent_comments(client):
+    response = client.get('/comments/recent?limit=2')
+    assert response.status_code == 200
+
+    comments = response.get_json()['comments']
+    assert [comment['comment_text'] for comment in comments] == [
+        "I hope it's not as bad here as Italy!", 'Yeah Freddie, bad news'
+    ]
+    assert {'username', 'article_id', 'article_title', 'timestamp'} <= set(comments[0].keys())
+
+
+def test_comments_by_user(client):
+    response = client.get('/users/fmercury/comments')
+    assert response.status_code == 200
+    assert b'Comments by fmercury' in response.data
+    assert b'Oh no, COVID-19 has hit New Zealand' in response.data
+    assert b'Older comments' not in response.data
+
+    assert client.get('/users/nobody/comments').status_code == 404
+
+
+def test_trending_articles(client):
+    response = client.get('/articles/trending?window=week')
+    assert response.status_code == 200
+    assert response.get_json() == {'window': 'week', 'articles': []}
+
+    assert client.get('/articles/trending?window=year').status_code == 404
+
+
+def test_home_page_shows_recent_comments(client):
+    response = client.get('/')
+    assert response.status_code == 200
+    assert b'Latest Comments' in response.data
+    assert b'Yeah Freddie, bad news' in response.data
+
+
+def test_listing_pages_can_be_streamed(client):
+    client.application.config['STREAM_TEMPLATES'] = True
+
+    response = client.get('/articles_by_tag?tag=Drama&page_size=10')
+
+    # A streamed response is sent before its length is known.
+    assert response.status_code == 200
+    assert 'Content-Length' not in response.headers
+    assert response.data.count(b'class="ui card"') == 10
+    assert response.data.rstrip().endswith(b'</html>')
+
+
+def test_listing_pages_can_be_rendered_without_streaming(client):
+    client.application.config['STREAM_TEMPLATES'] = False
+
+    response = client.get('/articles_by_tag?tag=Drama&page_size=10')
+
+    assert response.status_code == 200
+    assert 'Content-Length' in response.headers
+    assert response.data.count(b'class="ui card"') == 10
+
+
+def test_watchlist_requires_login(client):
+    response = client.get('/watchlist/')
+    assert response.headers['Location'] == 'http://localhost/authentication/login'
+
+
+def test_watchlist(client, auth):
+    auth.login()
+
+    for article_id in [3, 1]:
+        response = client.post('/watchlist/add', data={'article_id': article_id})
+        assert response.status_code == 302
+
+    response = client.get('/watchlist/')
+    assert response.status_code == 200
+    assert b'Your watchlist' in response.data
+    assert response.data.count(b'class="ui card"') == 2
+    assert response.data.count(b'Remove from watchlist') == 2
+
+    assert client.get('/watchlist/contains?ids=1,2,3').get_json() == {'article_ids': [1, 3]}
+
+    client.post('/watchlist/remove', data={'article_id': 3})
+    assert client.get('/watchlist/contains?ids=1,2,3').get_json() == {'article_ids': [1]}
+
+    assert client.post('/watchlist/add', data={'article_id': 50000}).status_code == 404
+
+
+def test_watchlist_buttons_return_only_to_pages_of_this_site(client, auth):
+    auth.login()
+
+    response = client.get('/articles_by_tag?tag=Action')
+    assert b'name="next" value="/articles_by_tag?tag=Action"' in response.data
+
+    response = client.post('/watchlist/add', data={'article_id': 1, 'next': '/articles_by_tag?tag=Action'})
+    assert response.headers['Location'] == 'http://localhost/articles_by_tag?tag=Action'
+
+    for next_url in ['http://example.com/', '//example.com/', '/\\example.com/', None]:
+        data = {'article_id': 1} if next_url is None else {'article_id': 1, 'next': next_url}
+        response = client.post('/watchlist/remove', data=data, headers={'Referer': 'http://example.com/'})
+        assert response.headers['Location'] == 'http://localhost/watchlist/'
+
+
+def test_import_users_command(client, auth, tmp_path):
+    # The database outlives a test run, so the imported usernames are new each time.
+    suffix = uuid.uuid4().hex[:8]
+    users_file = tmp_path / 'users.csv'
+    users_file.write_text(
+        f'id,username,password\n1,jlennon{suffix},abcd1A23\n2,thorke,abcd1A23\n3,rstarr{suffix},abcd1A23\n'
+    )
+    rejects_file = tmp_path / 'rejects.csv'
+
+    result = client.application.test_cli_runner().invoke(
+        args=['import-users', str(users_file), '--rejects', str(rejects_file), '--batch-size', '2', '--workers', '2']
+    )
+
+    assert result.exit_code == 0
+    assert 'Imported 2 users and rejected 1' in result.output
+    assert rejects_file.read_text().splitlines() == ['line,username,reason', '3,thorke,Username already taken']
+
+    response = auth.login(f'rstarr{suffix}', 'abcd1A23')
+    assert response.headers['Location'] == 'http://localhost/'
+
+
+def test_api_articles_by_date(client):
+    response = client.get('/api/v1/articles?date=2014-07-30')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/json'
+
+    data = response.get_json()
+    assert data['date'] == '2014-07-30'
+    assert 1 in [article['id'] for article in data['articles']]
+    assert all(article['date'] == '2014-07-30' for article in data['articles'])
+    assert 'comments' not in data['articles'][0]
+
+    assert client.get('/api/v1/articles?date=yesterday').status_code == 400
+
+
+def test_api_fields_are_selectable(client):
+    data = client.get('/api/v1/articles/1?fields=id,title').get_json()
+    assert list(data) == ['id', 'title']
+
+    data = client.get('/api/v1/articles/1').get_json()
+    assert len(data['comments']) == 3 and 'tags' in data
+
+    response = client.get('/api/v1/articles/1?fields=id,rating')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Bad Request'
+
+    assert client.get('/api/v1/articles/50000').status_code == 404
+
+
+def test_api_articles_by_tag_are_paginated(client):
+    data = client.get('/api/v1/tags').get_json()
+    assert {'name': 'Action', 'articles_url': '/api/v1/tags/Action/articles'} in data['tags']
+
+    data = client.get('/api/v1/tags/Action/articles?page_size=5&fields=id').get_json()
+    assert len(data['articles']) == 5
+    assert data['previous_url'] is None
+
+    next_page = client.get(data['next_url']).get_json()
+    assert next_page['articles'][0]['id'] > data['articles'][-1]['id']
+    assert list(next_page['articles'][0]) == ['id']
+
+
+def test_api_comments_for_article(client):
+    data = client.get('/api/v1/articles/1/comments?limit=1&fields=comment_text').get_json()
+    assert data['comments'] == [{'comment_text': "I hope it's not as bad here as Italy!"}]
+
+    data = client.get(data['next_url']).get_json()
+    assert data['comments'] == [{'comment_text': 'Yeah Freddie, bad news'}]
+
+
+def test_api_responses_are_compressed(client):
+    response = client.get('/api/v1/tags', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+    response = client.get('/api/v1/tags')
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_static_files_are_fingerprinted(client):
+    page = client.get('/authentication/login').data.decode('utf-8')
+    match = re.search(r'/static/(favicon\.[0-9a-f]{12}\.png)', page)
+    assert match is not None
+
+    response = client.get('/static/' + match.group(1))
+    assert response.status_code == 200
+    assert 'immutable' in response.headers['Cache-Control']
+
+    # Plain names still work, with the default caching.
+    response = client.get('/static/favicon.png')
+    assert response.status_code == 200
+    assert 'immutable' not in response.headers.get('Cache-Control', '')
+
+
+def test_compressible_static_files_are_sent_compressed(client):
+    with client.application.test_request_context():
+        url = url_for('static', filename='favicon.ico')
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    with open(os.path.join(client.application.static_folder, 'favicon.ico'), 'rb') as icon:
+        assert gzip.decompress(response.data) == icon.read()
+
+    response = client.get(url)
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_pages_are_compressed(client):
+    response = client.get('/articles_by_tag?tag=Action', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert b'class="ui card"' in gzip.decompress(response.data)
+
+    response = client.get('/articles_by_tag?tag=Action')
+    assert 'Content-Encoding' not in response.headers
+    assert b'class="ui card"' in response.data
+
+
+def test_templates_are_precompiled_into_the_bytecode_cache(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'REPOSITORY': 'memory',
+        'TEST_DATA_PATH': TEST_DATA_PATH_MEMORY,
+        'TEMPLATE_CACHE_DIR': str(tmp_path),
+        'PRECOMPILE_TEMPLATES': True
+    })
+
+    assert len(list(tmp_path.glob('__jinja2_*.cache'))) == len(app.jinja_loader.list_templates())
+    assert app.test_client().get('/authentication/login').status_code == 200
+
+
+def test_template_precompilation_is_logged_outside_debug_mode(caplog, tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'ENV': 'production',
+        'DEBUG': False,
+        'REPOSITORY': 'memory',
+        'TEST_DATA_PATH': TEST_DATA_PATH_MEMORY,
+        'TEMPLATE_CACHE_DIR': str(tmp_path),
+        'PRECOMPILE_TEMPLATES': True
+    })
+
+    assert any(
+        record.name == app.logger.name and record.getMessage().startswith('Precompiled ') for record in caplog.records
+    )
+
+
+def test_memory_mode_does_not_import_database_or_profanity_packages():
+    # Run in a fresh interpreter, since this one has imported everything already.
+    boot = (
+        'import sys\n'
+        'from chillax import create_app\n'
+        'create_app()\n'
+        'print(sorted(name for name in ("sqlalchemy", "aiosqlite", "better_profanity") if name in sys.modules))\n'
+    )
+    root = os.path.join(os.path.dirname(__file__), '..', '..')
+    result = subprocess.run([sys.executable, '-c', boot], cwd=root, env=dict(os.environ, REPOSITORY='memory'),
+                            capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines()[-1] == '[]'
+
+
+def test_boot_timings_are_logged_outside_debug_mode(caplog):
+    app = create_app({
+        'TESTING': True,
+        'ENV': 'production',
+        'DEBUG': False,
+        'REPOSITORY': 'memory',
+        'TEST_DATA_PATH': TEST_DATA_PATH_MEMORY
+    })
+
+    assert any(
+        record.name == app.logger.name and record.getMessage().startswith('Booted in ') for record in caplog.records
+    )
+
+
+def test_boot_timings_are_reported_to_admins(client, auth):
+    assert client.get('/admin/boot').status_code == 302
+
+    auth.login()
+    assert client.get('/admin/boot').status_code == 403
+
+    client.application.config['ADMIN_USERNAMES'] = 'fmercury, thorke'
+    data = client.get('/admin/boot').get_json()
+    phases = [phase['phase'] for phase in data['phases']]
+    assert phases[:2] == ['import', 'config']
+    assert {'engine', 'schema', 'mappers', 'repository', 'blueprints'} <= set(phases)
+    assert data['total_ms'] >= sum(phase['ms'] for phase in data['phases']) - 1
+
+
+def test_populate_can_be_profiled(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'REPOSITORY': 'memory',
+        'TEST_DATA_PATH': TEST_DATA_PATH_MEMORY,
+        'PROFILE_POPULATE': str(tmp_path / 'populate.prof')
+    })
+
+    assert (tmp_path / 'populate.prof').stat().st_size > 0
+    phases = [phase for phase, _ in app.extensions['boot_timings'].phases]
+    assert 'populate articles and tags' in phases
+
+
+def test_database_persists_across_restarts(tmp_path):
+    config = {
+        'TESTING': True,
+        'REPOSITORY': 'database',
+        'TEST_DATA_PATH': TEST_DATA_PATH_DATABASE,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'chillax.db'),
+        'WTF_CSRF_ENABLED': False
+    }
+
+    # The first start populates the empty database.
+    app = create_app(config)
+    phases = [phase for phase, _ in app.extensions['boot_timings'].phases]
+    assert 'populate articles' in phases
+    app.test_client().post('/authentication/register', data={'username': 'restarter', 'password': 'Abcd1234'})
+
+    # A restart only checks it, keeping the new user.
+    app = create_app(config)
+    phases = [phase for phase, _ in app.extensions['boot_timings'].phases]
+    assert not any(phase.startswith('populate') for phase in phases)
+    response = app.test_client().post('/authentication/login', data={'username': 'restarter', 'password': 'Abcd1234'})
+    assert response.headers['Location'] == 'http://localhost/'
+
+    # Unless a repopulate is asked for.
+    app = create_app(dict(config, REPOPULATE_DATABASE=True))
+    response = app.test_client().post('/authentication/login', data={'username': 'restarter', 'password': 'Abcd1234'})
+    assert b'Username not recognised' in response.data
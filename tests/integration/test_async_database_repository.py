@@ -0,0 +1,185 @@
+import asyncio
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import clear_mappers
+
+from chillax.adapters import database_repository
+from chillax.adapters.async_database_repository import AsyncSqliteRepository
+from chillax.adapters.orm import metadata, map_model_to_tables
+from chillax.adapters.repository import RepositoryException
+from chillax.domain.model import User, Movies, Tag, Comment, make_comment, make_tag_association
+from chillax.news import async_services
+from tests.conftest import TEST_DATA_PATH_DATABASE
+
+
+@pytest.fixture
+def database_path(tmp_path):
+    # The async repository uses its own connection, so it needs a database file rather than an in-memory database.
+    clear_mappers()
+    path = str(tmp_path / 'chillax.db')
+    engine = create_engine(f'sqlite:///{path}')
+    metadata.create_all(engine)
+    database_repository.populate(engine, TEST_DATA_PATH_DATABASE)
+    engine.dispose()
+    return path
+
+
+@pytest.fixture
+def mapped_database_path(database_path):
+    # In database mode the domain classes are also mapped for the SqlAlchemyRepository, so the ORM's backrefs link the
+    # entities the async repository builds.
+    map_model_to_tables()
+    yield database_path
+    clear_mappers()
+
+
+def run(database_path, operation):
+    # Runs operation(repo) on a fresh event loop, against a repository that is closed afterwards.
+    async def run_operation():
+        async with AsyncSqliteRepository(database_path) as repo:
+            return await operation(repo)
+    return asyncio.run(run_operation())
+
+
+def test_repository_can_retrieve_article_with_tags_and_comments(database_path):
+    article = run(database_path, lambda repo: repo.get_article(1))
+
+    assert article.title == 'Guardians of the Galaxy'
+    assert article.is_tagged_by(Tag('Action'))
+    assert len(list(article.comments)) == 3
+    assert all(comment.article is article for comment in article.comments)
+
+
+def test_repository_does_not_retrieve_a_non_existent_article(database_path):
+    assert run(database_path, lambda repo: repo.get_article(5000)) is None
+
+
+def test_repository_can_retrieve_a_user(database_path):
+    user = run(database_path, lambda repo: repo.get_user('fmercury'))
+
+    assert user == User('fmercury', '8734gfe2058v')
+    assert run(database_path, lambda repo: repo.get_user('prince')) is None
+
+
+def test_repository_can_retrieve_articles_by_date_and_id(database_path):
+    articles = run(database_path, lambda repo: repo.get_articles_by_date(date.fromisoformat('2014-07-30')))
+    assert 1 in [article.id for article in articles]
+
+    articles = run(database_path, lambda repo: repo.get_articles_by_id([6, 5, 5000]))
+    assert [article.id for article in articles] == [6, 5]
+
+
+def test_repository_can_get_catalogue_bounds_and_count(database_path):
+    bounds = run(database_path, lambda repo: repo.get_catalogue_bounds())
+
+    assert bounds.first_date == date.fromisoformat('1984-06-08')
+    assert bounds.last_article_id == 617
+    assert run(database_path, lambda repo: repo.get_number_of_articles()) == 1000
+
+
+def test_repository_returns_dates_of_neighbouring_articles(database_path):
+    async def neighbours(repo):
+        article = await repo.get_first_article()
+        return await repo.get_date_of_previous_article(article), await repo.get_date_of_next_article(article)
+
+    previous_date, next_date = run(database_path, neighbours)
+
+    assert previous_date is None
+    assert next_date > date.fromisoformat('1984-06-08')
+
+
+def test_repository_can_add_a_comment(database_path):
+    async def add_comment(repo):
+        comment = make_comment('Great!', await repo.get_user('thorke'), await repo.get_article(2), datetime.today())
+        await repo.add_comment(comment)
+        return await repo.get_article(2)
+
+    article = run(database_path, add_comment)
+
+    assert [comment.comment for comment in article.comments] == ['Great!']
+    assert [comment.user.username for comment in article.comments] == ['thorke']
+
+
+def test_repository_does_not_add_a_comment_without_a_user(database_path):
+    async def add_comment(repo):
+        comment = Comment(None, await repo.get_article(2), 'Great!', datetime.today())
+        await repo.add_comment(comment)
+
+    with pytest.raises(RepositoryException):
+        run(database_path, add_comment)
+
+
+def test_repository_can_add_an_article_a_tag_and_a_user(database_path):
+    async def add(repo):
+        article = Movies(date.fromisoformat('2020-03-09'), 'New movie', 'About it', 'link', 'image', 5000)
+        await repo.add_article(article)
+        tag = Tag('Motoring')
+        make_tag_association(article, tag)
+        await repo.add_tag(tag)
+        await repo.add_user(User('Dave', '123456789'))
+        return (await repo.get_article_ids_for_tag('motoring '), await repo.get_last_article(),
+                await repo.get_user('Dave'))
+
+    article_ids, last_article, user = run(database_path, add)
+
+    assert article_ids == [5000]
+    assert last_article.title == 'New movie'
+    assert user.username == 'Dave'
+
+
+def test_repository_can_retrieve_comments_and_tags(database_path):
+    comments = run(database_path, lambda repo: repo.get_comments())
+    tags = run(database_path, lambda repo: repo.get_tags())
+
+    assert len(comments) == 3
+    assert Tag('Action') in tags
+
+
+def test_repository_serves_concurrent_reads(database_path):
+    async def read_concurrently(repo):
+        return await asyncio.gather(*(repo.get_article(id) for id in range(1, 21)))
+
+    articles = run(database_path, read_concurrently)
+    assert [article.id for article in articles] == list(range(1, 21))
+
+
+def test_repository_pages_through_comments_for_an_article_newest_first(database_path):
+    async def pages(repo):
+        first = await repo.get_comments_for_article(1, limit=2)
+        rest = await repo.get_comments_for_article(1, before=first[-1].timestamp, limit=2)
+        return first, rest, await repo.get_comments_for_article(5000)
+
+    first, rest, none = run(database_path, pages)
+
+    assert [comment.comment for comment in first] == ["I hope it's not as bad here as Italy!", 'Yeah Freddie, bad news']
+    assert [comment.comment for comment in rest] == ['Oh no, COVID-19 has hit New Zealand']
+    assert all(comment.article.id == 1 for comment in first + rest)
+    assert none == []
+
+
+def test_repository_serialises_concurrent_writes(database_path):
+    async def write_concurrently(repo):
+        articles = await repo.get_articles_by_id([2, 3])
+        tags = [Tag(f'Concurrent {i}') for i in range(10)]
+        for tag in tags:
+            make_tag_association(articles[0], tag)
+            make_tag_association(articles[1], tag)
+        await asyncio.gather(*(repo.add_tag(tag) for tag in tags))
+        return [await repo.get_article_ids_for_tag(tag.tag_name) for tag in tags]
+
+    assert run(database_path, write_concurrently) == [[2, 3]] * 10
+
+
+def test_repository_counts_comments_while_the_domain_classes_are_mapped(mapped_database_path):
+    async def comment(repo):
+        before = await async_services.get_article(1, repo)
+        await async_services.add_comment(1, 'Another one here', 'thorke', repo)
+        after = await async_services.get_article(1, repo)
+        return before, after
+
+    before, after = run(mapped_database_path, comment)
+
+    assert (before['number_of_comments'], len(before['comments'])) == (3, 3)
+    assert (after['number_of_comments'], len(after['comments'])) == (4, 4)
@@ -1,10 +1,21 @@
+import shutil
+import threading
+import time
 from datetime import date, datetime
 
 import pytest
-
-from chillax.adapters.database_repository import SqlAlchemyRepository
-from chillax.domain.model import User, Movies, Tag, Comment, make_comment
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+
+import chillax.news.services as news_services
+from chillax.adapters.caching_repository import CachingRepository
+from chillax.adapters.database_repository import (
+    SqlAlchemyRepository, CommentWriter, SchemaVersionException, check_database, SOURCE_FILES
+)
+from chillax.adapters.orm import articles, schema_version
+from chillax.domain.model import User, Movies, Tag, Comment, make_comment, make_tag_association
 from chillax.adapters.repository import RepositoryException
+from conftest import TEST_DATA_PATH_DATABASE
 
 
 def test_repository_can_add_a_user(session_factory):
@@ -28,6 +39,25 @@ def test_repository_can_retrieve_a_user(session_factory):
     assert user == User('fmercury', '8734gfe2058v')
 
 
+def test_repository_does_not_add_a_user_with_a_taken_username(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    with pytest.raises(RepositoryException):
+        repo.add_user(User('thorke', '123456789'))
+
+    # The session is still usable.
+    assert repo.get_user('fmercury') is not None
+
+
+def test_repository_can_retrieve_usernames(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    usernames = repo.get_usernames()
+
+    assert 'thorke' in usernames and 'fmercury' in usernames
+    assert len(usernames) == len(set(usernames))
+
+
 def test_repository_does_not_retrieve_a_non_existent_user(session_factory):
     repo = SqlAlchemyRepository(session_factory)
 
@@ -136,14 +166,37 @@ def test_repository_can_get_first_article(session_factory):
     repo = SqlAlchemyRepository(session_factory)
 
     article = repo.get_first_article()
-    assert article.title == 'Guardians of the Galaxy'
+    assert article.title == 'Ghostbusters'
 
 
 def test_repository_can_get_last_article(session_factory):
     repo = SqlAlchemyRepository(session_factory)
 
     article = repo.get_last_article()
-    assert article.title == 'Nine Lives'
+    assert article.title == "2307: Winter's Dream"
+
+
+def test_repository_can_get_catalogue_bounds(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    bounds = repo.get_catalogue_bounds()
+
+    assert bounds.first_date == date(1984, 6, 8)
+    assert bounds.first_article_id == 80
+    assert bounds.last_date == date(2018, 8, 9)
+    assert bounds.last_article_id == 617
+
+
+def test_catalogue_bounds_are_updated_when_an_article_is_added(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    repo.get_catalogue_bounds()
+
+    article = make_article(date.fromisoformat('2020-03-09'))
+    repo.add_article(article)
+
+    bounds = repo.get_catalogue_bounds()
+    assert bounds.last_date == date(2020, 3, 9)
+    assert bounds.last_article_id == article.id
 
 
 def test_repository_can_get_articles_by_ids(session_factory):
@@ -265,6 +318,345 @@ def test_repository_can_retrieve_comments(session_factory):
     assert len(repo.get_comments()) == 3
 
 
+def count_comments(session_factory):
+    session = session_factory()
+    try:
+        return session.query(Comment).count()
+    finally:
+        session.close()
+
+
+def test_write_behind_repository_queues_comments_until_flushed(session_factory):
+    writer = CommentWriter(session_factory, flush_interval=60)
+    repo = SqlAlchemyRepository(session_factory, writer)
+
+    article = repo.get_article(2)
+    comment = make_comment("Trump's onto it!", repo.get_user('thorke'), article)
+    repo.add_comment(comment)
+
+    # The Comment is on the Movies straight away, but hasn't been written yet.
+    assert comment in article.comments
+    assert count_comments(session_factory) == 3
+
+    repo.flush_comments()
+    assert count_comments(session_factory) == 4
+    writer.close()
+
+
+def test_write_behind_repository_flushes_queued_comments_before_they_are_read(session_factory):
+    writer = CommentWriter(session_factory, flush_interval=60)
+    repo = SqlAlchemyRepository(session_factory, writer)
+
+    comment = make_comment('First death in Australia', repo.get_user('thorke'), repo.get_article(5))
+    repo.add_comment(comment)
+
+    # A new session, as for the next http request, loads the Movies with the queued Comment.
+    repo.reset_session()
+    article = repo.get_article(5)
+    assert article.number_of_comments == 1
+    comments = list(article.comments)
+    assert [c.comment for c in comments] == ['First death in Australia']
+    assert count_comments(session_factory) == 4
+    writer.close()
+
+
+def test_comment_writer_flushes_in_the_background_and_on_close(database_engine):
+    session_factory = sessionmaker(bind=database_engine)
+    writer = CommentWriter(session_factory, flush_interval=0.05)
+    repo = SqlAlchemyRepository(session_factory, writer)
+
+    user = repo.get_user('thorke')
+    repo.add_comment(make_comment('Queued', user, repo.get_article(1)))
+
+    deadline = time.time() + 5
+    while count_comments(session_factory) < 4 and time.time() < deadline:
+        time.sleep(0.05)
+    assert count_comments(session_factory) == 4
+
+    repo.add_comment(make_comment('Queued at shutdown', user, repo.get_article(1)))
+    repo.close()
+    assert count_comments(session_factory) == 5
+
+    with pytest.raises(RepositoryException):
+        repo.add_comment(make_comment('Too late', user, repo.get_article(1)))
+
+
+def test_comment_writer_retries_a_failing_comment_then_gives_up_on_it(session_factory, caplog):
+    writer = CommentWriter(session_factory, flush_interval=60, max_attempts=2)
+    repo = SqlAlchemyRepository(session_factory, writer)
+    user = repo.get_user('thorke')
+
+    # A Comment without text breaks the batch, but not the Comment queued with it.
+    repo.add_comment(make_comment(None, user, repo.get_article(2)))
+    repo.add_comment(make_comment('Written anyway', user, repo.get_article(3)))
+    repo.flush_comments()
+    assert count_comments(session_factory) == 4
+    assert writer.has_pending(article_ids=[2])
+    assert 'Failed to write a comment by thorke on movie 2' in caplog.text
+
+    repo.add_comment(make_comment('Written after the retry', user, repo.get_article(3)))
+    repo.flush_comments()
+    assert count_comments(session_factory) == 5
+    assert not writer.has_pending(article_ids=[2, 3])
+    assert [row['article_id'] for row in writer.dead_letters] == [2]
+    assert 'Giving up on a comment by thorke on movie 2' in caplog.text
+    writer.close()
+
+
+def test_comment_writer_stops_taking_from_the_queue_while_its_retries_are_full(session_factory):
+    writer = CommentWriter(session_factory, flush_interval=60, max_queue_size=2, max_attempts=5)
+    repo = SqlAlchemyRepository(session_factory, writer)
+    user = repo.get_user('thorke')
+
+    repo.add_comment(make_comment(None, user, repo.get_article(2)))
+    repo.add_comment(make_comment(None, user, repo.get_article(2)))
+    repo.flush_comments()
+
+    # The queued Comment waits, so that the queue fills and puts block, until the retries are written or dropped.
+    repo.add_comment(make_comment('Waiting', user, repo.get_article(3)))
+    repo.flush_comments()
+    assert count_comments(session_factory) == 3
+    assert writer.has_pending(article_ids=[3])
+    writer.close()
+
+
+def test_comment_writer_retries_failing_comments_when_it_closes(session_factory):
+    writer = CommentWriter(session_factory, flush_interval=60, max_attempts=3)
+    repo = SqlAlchemyRepository(session_factory, writer)
+    user = repo.get_user('thorke')
+
+    repo.add_comment(make_comment(None, user, repo.get_article(2)))
+    repo.flush_comments()
+    assert writer.has_pending(article_ids=[2])
+
+    writer.close()
+    assert not writer.has_pending(article_ids=[2])
+    assert [row['article_id'] for row in writer.dead_letters] == [2]
+
+
+def test_comment_writer_refuses_a_put_waiting_for_room_when_it_closes(session_factory):
+    writer = CommentWriter(session_factory, flush_interval=60, max_queue_size=1)
+    repo = SqlAlchemyRepository(session_factory, writer)
+    user = repo.get_user('thorke')
+    writer.put(make_comment('Queued', user, repo.get_article(2)))
+    waiting_comment = make_comment('Waiting for room', user, repo.get_article(3))
+
+    errors = list()
+
+    def put_into_the_full_queue():
+        try:
+            writer.put(waiting_comment)
+        except RepositoryException as e:
+            errors.append(e)
+
+    waiting = threading.Thread(target=put_into_the_full_queue)
+    waiting.start()
+    time.sleep(0.1)
+    writer.close()
+    waiting.join(timeout=5)
+
+    assert not waiting.is_alive()
+    assert len(errors) == 1
+    assert count_comments(session_factory) == 4
+    assert not writer.has_pending(article_ids=[2, 3])
+
+
+def test_repository_can_add_articles_users_and_tags_in_bulk(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    # More rows than fit in one multi-row INSERT.
+    articles = [
+        Movies(date.fromisoformat('2020-03-09'), f'Movie {id}', 'About it', 'link', 'image', id)
+        for id in range(2000, 2400)
+    ]
+    repo.add_articles(articles)
+
+    tag = Tag('Motoring')
+    for article in articles[:2]:
+        make_tag_association(article, tag)
+    repo.add_tags([tag])
+    repo.add_users([User('Dave', '123456789'), User('Martin', '123456789')])
+
+    assert repo.get_number_of_articles() == 1400
+    assert repo.get_article(2399).title == 'Movie 2399'
+    assert repo.get_catalogue_bounds().last_article_id == 2399
+    assert repo.get_article_ids_for_tag('Motoring') == [2000, 2001]
+    assert repo.get_user('Martin') == User('Martin', '123456789')
+
+
+def test_repository_can_add_comments_in_bulk(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    user = repo.get_user('thorke')
+    comments = [make_comment(f'Comment {i}', user, repo.get_article(i + 2), datetime.today()) for i in range(5)]
+    repo.add_comments(comments)
+
+    # Each Comment is written exactly once, however it reached the database.
+    repo.reset_session()
+    assert len(repo.get_comments()) == 8
+    assert [comment.comment for comment in repo.get_article(4).comments] == ['Comment 2']
+
+
+def test_repository_pages_through_comments_for_an_article_newest_first(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    user = repo.get_user('thorke')
+    article = repo.get_article(2)
+    timestamps = ['2020-03-01 10:00', '2020-03-03 10:00', '2020-03-02 10:00', '2020-03-02 10:00', '2020-03-04 10:00']
+    repo.add_comments(
+        make_comment(f'Comment {i}', user, article, datetime.fromisoformat(timestamp))
+        for i, timestamp in enumerate(timestamps)
+    )
+
+    page = repo.get_comments_for_article(2, limit=2)
+    assert [comment.comment for comment in page] == ['Comment 4', 'Comment 1']
+
+    # The next page doesn't stop part way through the two Comments made at the same time.
+    page = repo.get_comments_for_article(2, before=page[-1].timestamp, limit=1)
+    assert [comment.comment for comment in page] == ['Comment 3', 'Comment 2']
+
+    page = repo.get_comments_for_article(2, before=page[-1].timestamp, limit=2)
+    assert [comment.comment for comment in page] == ['Comment 0']
+
+    # Seeded comments have whole-second timestamps, which must still compare equal to themselves.
+    page = repo.get_comments_for_article(1, limit=1)
+    assert len(repo.get_comments_for_article(1, before=page[0].timestamp)) == 2
+
+
+def test_repository_pages_through_comments_by_a_user_newest_first(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    user = repo.get_user('thorke')
+    timestamps = ['2020-03-01 10:00', '2020-03-03 10:00', '2020-03-02 10:00', '2020-03-02 10:00']
+    repo.add_comments(
+        make_comment(f'Comment {i}', user, repo.get_article(i + 2), datetime.fromisoformat(timestamp))
+        for i, timestamp in enumerate(timestamps)
+    )
+
+    page = repo.get_comments_by_user('thorke', limit=2)
+    assert [comment.comment for comment in page] == ['Comment 1', 'Comment 3', 'Comment 2']
+
+    page = repo.get_comments_by_user('thorke', before=page[-1].timestamp, limit=2)
+    assert [comment.comment for comment in page] == ['Comment 0', 'Yeah Freddie, bad news']
+
+    assert [c.comment for c in repo.get_comments_by_user('fmercury')] == ['Oh no, COVID-19 has hit New Zealand']
+    assert repo.get_comments_by_user('nobody') == []
+
+
+def test_comments_by_a_user_are_read_from_the_composite_index(session_factory):
+    session = session_factory()
+
+    plan = session.execute(
+        'EXPLAIN QUERY PLAN SELECT id FROM comments '
+        'WHERE user_id = (SELECT id FROM users WHERE username = :username) AND timestamp < :before '
+        'ORDER BY timestamp DESC, id DESC LIMIT 20',
+        {'username': 'thorke', 'before': '2020-03-01 00:00:00.000000'}
+    ).fetchall()
+    plan = ' '.join(str(row[-1]) for row in plan)
+
+    assert 'ix_comments_user_id_timestamp' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+def test_repository_keeps_the_most_recent_comments(session_factory):
+    repo = SqlAlchemyRepository(session_factory, recent_comments_size=2)
+
+    # Seeded with the newest stored Comments, newest first.
+    assert [c.comment for c in repo.get_recent_comments()] == [
+        "I hope it's not as bad here as Italy!", 'Yeah Freddie, bad news'
+    ]
+
+    article = repo.get_article(2)
+    repo.add_comment(make_comment("Trump's onto it!", repo.get_user('thorke'), article))
+
+    recent = repo.get_recent_comments()
+    assert [c.comment for c in recent] == ["Trump's onto it!", "I hope it's not as bad here as Italy!"]
+    assert (recent[0].username, recent[0].article_id, recent[0].article_date) == ('thorke', 2, article.date)
+
+
+def test_repository_ranks_trending_movies(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    user = repo.get_user('thorke')
+    repo.add_comment(make_comment('Comment', user, repo.get_article(2)))
+    repo.add_comments([make_comment('Comment', user, repo.get_article(3)) for _ in range(2)])
+
+    assert repo.get_trending_article_ids('hour') == [(3, 2), (2, 1)]
+
+    # A new repository rebuilds the counters from the stored Comments.
+    assert SqlAlchemyRepository(session_factory).get_trending_article_ids('day') == [(3, 2), (2, 1)]
+
+
+def test_repository_keeps_a_watchlist_for_each_user(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    for article_id in [5, 2, 9, 2]:
+        repo.add_to_watchlist('thorke', article_id)
+    repo.add_to_watchlist('fmercury', 7)
+
+    assert repo.get_watchlist('thorke') == [2, 5, 9]
+    assert repo.get_watchlisted_article_ids('thorke', range(1, 1001)) == {2, 5, 9}
+    assert repo.get_watchlisted_article_ids('thorke', [1, 3]) == set()
+
+    repo.remove_from_watchlist('thorke', 5)
+    repo.remove_from_watchlist('thorke', 6)
+    assert repo.get_watchlist('thorke') == [2, 9]
+    assert repo.get_watchlist('fmercury') == [7]
+    assert repo.get_watchlist('nobody') == []
+
+
+def test_watchlist_is_read_from_the_primary_key_index_alone(session_factory):
+    session = session_factory()
+
+    plan = session.execute(
+        'EXPLAIN QUERY PLAN SELECT article_id FROM watchlist '
+        'WHERE user_id = (SELECT id FROM users WHERE username = :username) AND article_id BETWEEN 1 AND 1000'
+        , {'username': 'thorke'}
+    ).fetchall()
+    plan = ' '.join(str(row[-1]) for row in plan)
+
+    assert 'COVERING INDEX' in plan
+
+
+def test_comments_for_an_article_are_read_from_the_composite_index(session_factory):
+    session = session_factory()
+
+    plan = session.execute(
+        'EXPLAIN QUERY PLAN SELECT id FROM comments WHERE article_id = 1 AND timestamp < :before '
+        'ORDER BY timestamp DESC, id DESC LIMIT 20',
+        {'before': '2020-03-01 00:00:00.000000'}
+    ).fetchall()
+    plan = ' '.join(str(row[-1]) for row in plan)
+
+    assert 'ix_comments_article_id_timestamp' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+def test_most_recent_comments_are_read_from_the_timestamp_index(session_factory):
+    session = session_factory()
+
+    plan = session.execute(
+        'EXPLAIN QUERY PLAN SELECT users.username, comments.article_id, articles.title, articles.date, '
+        'comments.comment, comments.timestamp '
+        'FROM comments JOIN users ON users.id = comments.user_id JOIN articles ON articles.id = comments.article_id '
+        'ORDER BY comments.timestamp DESC, comments.id DESC LIMIT 20'
+    ).fetchall()
+    plan = ' '.join(str(row[-1]) for row in plan)
+
+    assert 'ix_comments_timestamp' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+def test_trending_replays_comments_from_the_timestamp_index(session_factory):
+    session = session_factory()
+
+    plan = session.execute(
+        'EXPLAIN QUERY PLAN SELECT article_id, timestamp FROM comments WHERE timestamp >= :since',
+        {'since': '2020-03-01 00:00:00.000000'}
+    ).fetchall()
+    plan = ' '.join(str(row[-1]) for row in plan)
+
+    assert 'SEARCH comments USING INDEX ix_comments_timestamp' in plan
+
+
 def make_article(new_article_date):
     article = Movies(
         new_article_date,
@@ -291,3 +683,154 @@ def test_can_retrieve_an_article_and_add_a_comment_to_it(session_factory):
 
     assert comment in article_fetched.comments
     assert comment in author_fetched.comments
+
+
+def test_caching_repository_reattaches_cached_articles_to_a_new_session(session_factory):
+    repo = CachingRepository(SqlAlchemyRepository(session_factory))
+
+    repo.get_article(1)
+
+    # Start a new session, as happens at the start of each http request; the cached Article is now detached.
+    repo.reset_session()
+    article = repo.get_article(1)
+
+    # Relationships that were never loaded can still be loaded through the new session.
+    assert article.title == 'Guardians of the Galaxy'
+    assert article.is_tagged_by(Tag('Action'))
+    assert len(list(article.comments)) == 3
+
+
+def test_tags_are_stored_with_the_ids_they_are_interned_as(session_factory):
+    # The same ids as the memory repository gives them.
+    repo = SqlAlchemyRepository(session_factory)
+
+    tags = repo.get_tags()
+    assert [(tag.id, tag.tag_name) for tag in tags[:3]] == [(1, 'Action'), (2, 'Adventure'), (3, 'Sci-Fi')]
+    assert sorted(tag.id for tag in repo.get_article(2).tags) == [2, 3, 4]
+    assert repo.get_article_ids_for_tag(' Sci-Fi')[:2] == [1, 2]
+
+
+def test_movies_loaded_from_the_database_compare_tag_ids(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    article = repo.get_article(2)
+
+    assert article.is_tagged_by(Tag('Sci-Fi', 3))
+    assert not article.is_tagged_by(Tag('Action', 1))
+    assert list(article._tag_ids) == [2, 3, 4]
+
+    # The array is rebuilt once the Tags are reloaded.
+    session = session_factory()
+    article = session.query(Movies).get(2)
+    assert article.is_tagged_by(Tag('Mystery', 4))
+    session.expire(article)
+    assert article._tag_ids is None
+    assert article.is_tagged_by(Tag('Mystery', 4))
+    session.close()
+
+
+def test_repository_finds_tags_without_regard_to_case(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    assert repo.get_article_ids_for_tag('sci-fi') == repo.get_article_ids_for_tag('Sci-Fi') != []
+
+
+def test_check_database_finds_no_problems_with_a_freshly_populated_database(database_engine):
+    assert check_database(database_engine, TEST_DATA_PATH_DATABASE) == []
+
+
+def test_check_database_allows_new_users_and_comments(database_engine):
+    database_engine.execute("INSERT INTO users (username, password) VALUES ('newuser', 'hash')")
+
+    assert check_database(database_engine, TEST_DATA_PATH_DATABASE) == []
+
+
+def test_check_database_reports_missing_rows(database_engine):
+    database_engine.execute('DELETE FROM article_tags WHERE article_id = 1')
+    database_engine.execute('DELETE FROM comments WHERE article_id = 1')
+    database_engine.execute(articles.delete().where(articles.c.id == 1))
+
+    problems = check_database(database_engine, TEST_DATA_PATH_DATABASE)
+    assert problems == [
+        'The database has 999 articles, but was populated with 1000',
+        'The database has 0 comments, but was populated with 3'
+    ]
+
+
+def test_check_database_rereads_source_files_that_may_have_changed(database_engine, tmp_path):
+    # Copies have new modification times, so their contents are compared.
+    for filename in SOURCE_FILES:
+        shutil.copy(f'{TEST_DATA_PATH_DATABASE}/{filename}', tmp_path)
+    assert check_database(database_engine, str(tmp_path)) == []
+
+    with open(tmp_path / 'users.csv', 'a') as users_file:
+        users_file.write('99,someone,password\n')
+    problems = check_database(database_engine, str(tmp_path))
+    assert problems == ['users.csv has changed since the database was populated from it']
+
+
+def test_check_database_rejects_another_schema_version(database_engine):
+    database_engine.execute(schema_version.update().values(version=0))
+
+    with pytest.raises(SchemaVersionException):
+        check_database(database_engine, TEST_DATA_PATH_DATABASE)
+
+
+def test_caching_repository_listings_show_new_comments(session_factory):
+    repo = CachingRepository(SqlAlchemyRepository(session_factory))
+    first = repo.get_first_article()
+    number_of_comments = first.number_of_comments
+    repo.get_articles_by_date(first.date)
+
+    repo.reset_session()
+    repo.add_comment(make_comment('A new comment', repo.get_user('thorke'), repo.get_article(first.id)))
+
+    repo.reset_session()
+    assert repo.get_first_article().number_of_comments == number_of_comments + 1
+    listed = next(article for article in repo.get_articles_by_date(first.date) if article.id == first.id)
+    assert listed.number_of_comments == number_of_comments + 1
+
+
+def test_caching_repository_sees_comments_added_by_another_process(database_engine):
+    # Two workers, each with its own engine and cache, sharing the database file.
+    workers = [
+        CachingRepository(SqlAlchemyRepository(sessionmaker(bind=create_engine(database_engine.url))))
+        for _ in range(2)
+    ]
+    assert [worker.get_article(1).number_of_comments for worker in workers] == [3, 3]
+    assert workers[0].get_number_of_articles() == 1000
+
+    workers[1].add_comment(make_comment('From the other worker', workers[1].get_user('thorke'),
+                                        workers[1].get_article(1)))
+
+    # The next request of the first worker finds its cache stale, and drops it.
+    workers[0].reset_session()
+    assert workers[0].get_article(1).number_of_comments == 4
+    assert workers[0].get_number_of_articles() == 1000
+    for worker in workers:
+        worker.close()
+
+
+def test_listing_articles_counts_their_comments_without_loading_them(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    # The Movies are held, so that the session (whose identity map holds them weakly) serves the same ones to
+    # get_articles_by_id.
+    articles = repo.get_articles_by_id([1, 2])
+    articles_as_dict = news_services.get_articles_by_id([1, 2], repo, include_comments=False)
+
+    assert [article['number_of_comments'] for article in articles_as_dict] == [3, 0]
+    assert all('_comments' in inspect(article).unloaded for article in articles)
+
+
+def test_cached_article_dicts_are_checked_for_new_tags_without_loading_them(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    news_services.get_articles_by_id([1, 2], repo, include_comments=False)
+
+    # A new session, as for the next http request, serves the cached dicts. The Movies are held, so that the session
+    # (whose identity map holds them weakly) serves the same ones to get_articles_by_id.
+    repo.reset_session()
+    articles = repo.get_articles_by_id([1, 2])
+    articles_as_dict = news_services.get_articles_by_id([1, 2], repo, include_comments=False)
+
+    assert [len(article['tags']) for article in articles_as_dict] == [3, 3]
+    assert all('_tags' in inspect(article).unloaded for article in articles)
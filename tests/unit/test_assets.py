@@ -0,0 +1,55 @@
+import gzip
+import os
+
+import pytest
+
+from chillax.utilities.assets import AssetManifest
+
+
+@pytest.fixture
+def static_folder(tmp_path):
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'css' / 'main.css').write_text('body { margin: 0; }\n' * 100)
+    (tmp_path / 'logo.png').write_bytes(b'\x89PNG' + bytes(1000))
+    return tmp_path
+
+
+def test_files_are_fingerprinted_by_content(static_folder):
+    manifest = AssetManifest(str(static_folder))
+    fingerprinted = manifest.fingerprinted('css/main.css')
+    assert fingerprinted.startswith('css/main.') and fingerprinted.endswith('.css')
+    assert fingerprinted != 'css/main.css'
+
+    # The name only changes when the content does.
+    assert AssetManifest(str(static_folder)).fingerprinted('css/main.css') == fingerprinted
+    (static_folder / 'css' / 'main.css').write_text('body { margin: 1em; }\n' * 100)
+    assert AssetManifest(str(static_folder)).fingerprinted('css/main.css') != fingerprinted
+
+
+def test_unknown_files_keep_their_names(static_folder):
+    manifest = AssetManifest(str(static_folder))
+    assert manifest.fingerprinted('missing.js') == 'missing.js'
+
+
+def test_url_defaults_fingerprint_static_urls_only(static_folder):
+    manifest = AssetManifest(str(static_folder))
+    values = {'filename': 'logo.png'}
+    manifest.url_defaults('static', values)
+    assert values['filename'] == manifest.fingerprinted('logo.png')
+
+    values = {'filename': 'logo.png'}
+    manifest.url_defaults('news_bp.articles_by_tag', values)
+    assert values['filename'] == 'logo.png'
+
+
+def test_build_variants_compresses_compressible_files(static_folder):
+    written = AssetManifest(str(static_folder)).build_variants()
+
+    css = os.path.join(str(static_folder), 'css', 'main.css')
+    assert css + '.gz' in written
+    assert not any(path.startswith(os.path.join(str(static_folder), 'logo.png')) for path in written)
+    with open(css + '.gz', 'rb') as variant:
+        assert gzip.decompress(variant.read()) == (static_folder / 'css' / 'main.css').read_bytes()
+
+    # Variants aren't assets in their own right.
+    assert AssetManifest(str(static_folder)).fingerprinted('css/main.css.gz') == 'css/main.css.gz'
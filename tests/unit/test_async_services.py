@@ -0,0 +1,81 @@
+import asyncio
+from datetime import date
+
+import pytest
+
+from chillax.adapters.async_repository import AsyncMemoryRepository
+from chillax.authentication import async_services as auth_services
+from chillax.authentication.services import AuthenticationException, NameNotUniqueException
+from chillax.news import async_services as news_services
+from chillax.news.services import NonExistentMoviesException, UnknownUserException
+
+
+@pytest.fixture
+def async_repo(in_memory_repo):
+    return AsyncMemoryRepository(in_memory_repo)
+
+
+def test_can_add_and_authenticate_user(async_repo):
+    asyncio.run(auth_services.add_user('jz', 'abcd1A23', async_repo))
+
+    user_as_dict = asyncio.run(auth_services.get_user('jz', async_repo))
+    assert user_as_dict['password'].startswith('pbkdf2:sha256:')
+
+    asyncio.run(auth_services.authenticate_user('jz', 'abcd1A23', async_repo))
+    with pytest.raises(AuthenticationException):
+        asyncio.run(auth_services.authenticate_user('jz', '0987654321', async_repo))
+
+
+def test_cannot_add_user_with_existing_name(async_repo):
+    with pytest.raises(NameNotUniqueException):
+        asyncio.run(auth_services.add_user('thorke', 'abcd1A23', async_repo))
+
+
+def test_can_add_comment(async_repo):
+    comment_text = 'The loonies are stripping the supermarkets bare!'
+    asyncio.run(news_services.add_comment(3, comment_text, 'fmercury', async_repo))
+
+    comments_as_dict = asyncio.run(news_services.get_comments_for_article(3, async_repo))
+    assert comment_text in [comment['comment_text'] for comment in comments_as_dict]
+
+
+def test_can_page_through_comments_for_article(async_repo):
+    first = asyncio.run(news_services.get_comments_for_article(1, async_repo, limit=1))
+    rest = asyncio.run(news_services.get_comments_for_article(1, async_repo, before=first[-1]['timestamp']))
+
+    assert len(first) == 1
+    assert len(rest) > 0
+    assert all(comment['timestamp'] < first[-1]['timestamp'] for comment in rest)
+
+
+def test_cannot_add_comment_by_unknown_user(async_repo):
+    with pytest.raises(UnknownUserException):
+        asyncio.run(news_services.add_comment(3, 'Hello', 'gmichael', async_repo))
+
+
+def test_can_get_article(async_repo):
+    article_as_dict = asyncio.run(news_services.get_article(2, async_repo))
+
+    assert article_as_dict['title'] == 'Prometheus'
+    assert article_as_dict['date'] == date.fromisoformat('2012-02-28')
+
+    with pytest.raises(NonExistentMoviesException):
+        asyncio.run(news_services.get_article(5000, async_repo))
+
+
+def test_get_articles_by_date(async_repo):
+    articles_as_dict, prev_date, next_date = asyncio.run(
+        news_services.get_articles_by_date(date.fromisoformat('2012-02-28'), async_repo, include_comments=False)
+    )
+
+    assert 2 in [article['id'] for article in articles_as_dict]
+    assert prev_date == date.fromisoformat('2011-02-28')
+    assert next_date == date.fromisoformat('2013-02-28')
+
+
+def test_services_run_concurrently(async_repo):
+    async def load_pages():
+        return await asyncio.gather(*(news_services.get_articles_by_id([id], async_repo) for id in range(1, 11)))
+
+    pages = asyncio.run(load_pages())
+    assert [page[0]['id'] for page in pages] == list(range(1, 11))
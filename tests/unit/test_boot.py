@@ -0,0 +1,37 @@
+import pstats
+
+from chillax.adapters import memory_repository
+from chillax.adapters.memory_repository import MemoryRepository
+from chillax.utilities.boot import BootTimings, profiled
+
+from conftest import TEST_DATA_PATH_MEMORY
+
+
+def test_marks_time_consecutive_phases():
+    timings = BootTimings()
+    timings.record('import', 0.25)
+    timings.mark('config')
+    timings.mark('repository')
+
+    assert [phase for phase, _ in timings.phases] == ['import', 'config', 'repository']
+    assert timings.total >= 0.25
+    assert timings.to_dict()['phases'][0] == {'phase': 'import', 'ms': 250.0}
+    assert timings.summary().startswith('Booted in ')
+
+
+def test_populate_marks_each_step():
+    timings = BootTimings()
+    memory_repository.populate(TEST_DATA_PATH_MEMORY, MemoryRepository(), timings)
+
+    assert [phase for phase, _ in timings.phases] == [
+        'populate articles and tags', 'populate users', 'populate comments'
+    ]
+
+
+def test_profiled_writes_stats(tmp_path):
+    path = str(tmp_path / 'populate.prof')
+    with profiled(path):
+        memory_repository.populate(TEST_DATA_PATH_MEMORY, MemoryRepository())
+
+    stats = pstats.Stats(path)
+    assert any(function[2] == 'load_articles_and_tags' for function in stats.stats)
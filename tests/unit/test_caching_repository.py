@@ -0,0 +1,143 @@
+from datetime import date, datetime
+
+import pytest
+
+from chillax.adapters.caching_repository import CachingRepository, LRUCache
+from chillax.domain.model import User, Movies, Tag, make_comment, make_tag_association
+
+
+@pytest.fixture
+def caching_repo(in_memory_repo):
+    return CachingRepository(in_memory_repo, maxsize=16)
+
+
+def test_lru_cache_evicts_least_recently_used_entry():
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+
+    assert cache.get('a') == 1
+    assert cache.get('b', None) is None
+    assert len(cache) == 2
+
+
+def test_caching_repository_serves_repeated_reads_from_cache(caching_repo, in_memory_repo):
+    article = caching_repo.get_article(1)
+
+    # Remove the article behind the cache's back; the cached copy is still served.
+    del in_memory_repo._articles_index[1]
+    assert caching_repo.get_article(1) is article
+
+
+def test_caching_repository_caches_missing_articles(caching_repo):
+    assert caching_repo.get_article(5000) is None
+    assert caching_repo.get_article(5000) is None
+
+
+def test_adding_an_article_invalidates_catalogue_reads(caching_repo):
+    assert caching_repo.get_number_of_articles() == 1000
+    assert caching_repo.get_article(5000) is None
+
+    article = Movies(date.fromisoformat('2020-03-09'), 'New movie', 'About it', 'link', 'image', 5000)
+    caching_repo.add_article(article)
+
+    assert caching_repo.get_number_of_articles() == 1001
+    assert caching_repo.get_article(5000) is article
+    assert caching_repo.get_last_article() is article
+    assert article in caching_repo.get_articles_by_date(date.fromisoformat('2020-03-09'))
+
+
+def test_adding_a_tag_invalidates_tag_reads(caching_repo):
+    assert caching_repo.get_article_ids_for_tag('Motoring') == []
+    number_of_tags = len(caching_repo.get_tags())
+
+    tag = Tag('Motoring')
+    make_tag_association(caching_repo.get_article(1), tag)
+    caching_repo.add_tag(tag)
+
+    assert caching_repo.get_article_ids_for_tag('Motoring') == [1]
+    assert len(caching_repo.get_tags()) == number_of_tags + 1
+
+
+def test_adding_a_user_invalidates_user_reads(caching_repo):
+    assert caching_repo.get_user('Dave') is None
+
+    user = User('Dave', '123456789')
+    caching_repo.add_user(user)
+
+    assert caching_repo.get_user('Dave') is user
+
+
+def test_caching_repository_returns_articles_by_id_from_cache_and_repository(caching_repo):
+    cached = caching_repo.get_article(5)
+
+    articles = caching_repo.get_articles_by_id([5, 6, 5000])
+
+    assert [article.id for article in articles] == [5, 6]
+    assert articles[0] is cached
+
+
+def test_adding_a_comment_is_visible_through_the_cache(caching_repo):
+    article = caching_repo.get_article(2)
+    user = caching_repo.get_user('thorke')
+
+    comment = make_comment('Great movie', user, article, datetime.today())
+    caching_repo.add_comment(comment)
+
+    assert comment in caching_repo.get_article(2).comments
+    assert comment in caching_repo.get_comments()
+
+
+def test_bulk_writes_invalidate_cached_reads(caching_repo):
+    assert caching_repo.get_number_of_articles() == 1000
+    assert caching_repo.get_user('Dave') is None
+
+    articles = [Movies(date.fromisoformat('2020-03-09'), f'Movie {id}', 'About it', 'link', 'image', id)
+                for id in (5000, 5001)]
+    caching_repo.add_articles(articles)
+    caching_repo.add_users([User('Dave', '123456789')])
+
+    assert caching_repo.get_number_of_articles() == 1002
+    assert caching_repo.get_user('Dave').username == 'Dave'
+
+
+def test_caching_repository_drops_its_entries_when_the_data_version_changes(in_memory_repo):
+    # A repository another process can change, as the database repository's data_version reports.
+    data_version = [1]
+    in_memory_repo.data_version = lambda: data_version[0]
+    caching_repo = CachingRepository(in_memory_repo, maxsize=16)
+
+    article = caching_repo.get_article(1)
+    caching_repo.refresh()
+    assert caching_repo.get_article(1) is article
+
+    # Replace the article behind the cache's back, as another process would.
+    changed = Movies(article.date, 'Changed elsewhere', 'About it', 'link', 'image', 1)
+    in_memory_repo._articles_index[1] = changed
+    data_version[0] = 2
+    caching_repo.refresh()
+    assert caching_repo.get_article(1) is changed
+
+
+def test_caching_repository_does_not_keep_what_it_loaded_while_dropping_its_entries(in_memory_repo):
+    data_version = [1]
+    in_memory_repo.data_version = lambda: data_version[0]
+    caching_repo = CachingRepository(in_memory_repo, maxsize=16)
+    get_user = in_memory_repo.get_user
+
+    def get_user_while_another_process_writes(username):
+        user = get_user(username)
+        data_version[0] += 1
+        caching_repo.refresh()
+        return user
+
+    in_memory_repo.get_user = get_user_while_another_process_writes
+    caching_repo.get_user('thorke')
+    in_memory_repo.get_user = get_user
+
+    # The user loaded as the entries were dropped wasn't cached, so a change made since is seen.
+    user = User('thorke', 'Changed elsewhere')
+    in_memory_repo._users = [user if u.username == 'thorke' else u for u in in_memory_repo._users]
+    assert caching_repo.get_user('thorke') is user
@@ -101,6 +101,25 @@ def test_make_tag_associations(article, tag):
     assert article in tag.tagged_articles
 
 
+def test_tag_membership_compares_tag_ids(article):
+    action, drama, western = Tag('Action', 1), Tag('Drama', 2), Tag('Western', 3)
+    make_tag_association(article, drama)
+    make_tag_association(article, action)
+
+    assert article.is_tagged_by(Tag('Drama', 2))
+    assert not article.is_tagged_by(western)
+    assert action.is_applied_to(article)
+    assert not western.is_applied_to(article)
+
+
+def test_tag_membership_falls_back_to_names_for_tags_without_ids(article, tag):
+    make_tag_association(article, tag)
+    make_tag_association(article, Tag('Travel', 4))
+
+    assert article.is_tagged_by(Tag('New Zealand'))
+    assert article.is_tagged_by(Tag('Travel'))
+
+
 def test_make_tag_associations_with_article_already_tagged(article, tag):
     make_tag_association(article, tag)
 
@@ -1,10 +1,15 @@
+import gc
+import threading
 from datetime import date, datetime
 from typing import List
 
 import pytest
 
-from chillax.domain.model import User, Movies, Tag, Comment, make_comment
+from chillax.domain.model import User, Movies, Tag, Comment, make_comment, make_tag_association
+from chillax.adapters import memory_repository
+from chillax.adapters.memory_repository import MemoryRepository
 from chillax.adapters.repository import RepositoryException
+from tests.conftest import TEST_DATA_PATH_MEMORY
 
 
 def test_repository_can_add_a_user(in_memory_repo):
@@ -91,6 +96,26 @@ def test_repository_can_get_last_article(in_memory_repo):
     assert article.title == 'The Black Room'
 
 
+def test_repository_can_get_catalogue_bounds(in_memory_repo):
+    bounds = in_memory_repo.get_catalogue_bounds()
+
+    assert bounds.first_article_id == in_memory_repo.get_first_article().id
+    assert bounds.last_article_id == in_memory_repo.get_last_article().id
+    assert bounds.first_date == date(2006, 2, 28)
+    assert bounds.last_date == date(2017, 2, 28)
+
+
+def test_catalogue_bounds_are_updated_when_an_article_is_added(in_memory_repo):
+    in_memory_repo.get_catalogue_bounds()
+
+    article = Movies(date.fromisoformat('2020-03-09'), 'New movie', 'About it', 'link', 'image', 1001)
+    in_memory_repo.add_article(article)
+
+    bounds = in_memory_repo.get_catalogue_bounds()
+    assert bounds.last_date == date(2020, 3, 9)
+    assert bounds.last_article_id == 1001
+
+
 def test_repository_can_get_articles_by_ids(in_memory_repo):
     articles = in_memory_repo.get_articles_by_id([2, 5, 6])
 
@@ -121,6 +146,20 @@ def test_repository_returns_article_ids_for_existing_tag(in_memory_repo):
     assert article_ids == []
 
 
+def test_repository_finds_tags_by_normalized_name(in_memory_repo):
+    article_ids = in_memory_repo.get_article_ids_for_tag(' sci-fi')
+
+    assert article_ids[:2] == [1, 2]
+    assert article_ids == in_memory_repo.get_article_ids_for_tag('Sci-Fi')
+
+
+def test_repository_loads_tags_with_their_ids(in_memory_repo):
+    tags = in_memory_repo.get_tags()
+
+    assert [(tag.id, tag.tag_name) for tag in tags[:3]] == [(1, 'Action'), (2, 'Adventure'), (3, 'Sci-Fi')]
+    assert in_memory_repo.get_article(1).is_tagged_by(Tag('Sci-Fi', 3))
+
+
 def test_repository_returns_an_empty_list_for_non_existent_tag(in_memory_repo):
     article_ids = in_memory_repo.get_article_ids_for_tag('United States')
 
@@ -182,4 +221,225 @@ def test_repository_can_retrieve_comments(in_memory_repo):
     assert len(in_memory_repo.get_comments()) == 2
 
 
+def test_thread_safe_repository_under_concurrent_reads_and_writes():
+    repo = MemoryRepository(thread_safe=True)
+    memory_repository.populate(TEST_DATA_PATH_MEMORY, repo)
+
+    number_of_comments = len(repo.get_comments())
+    number_of_writers, writes_per_writer = 4, 200
+    errors = list()
+    writers_done = threading.Event()
+
+    def read():
+        try:
+            while not writers_done.is_set():
+                article = repo.get_article(1)
+                assert article in repo.get_articles_by_date(article.date)
+                repo.get_date_of_previous_article(article)
+                repo.get_date_of_next_article(article)
+                comments = repo.get_comments()
+                assert all(comment.user is not None for comment in comments)
+        except Exception as e:
+            errors.append(e)
+
+    def write(writer):
+        try:
+            user = repo.get_user('fmercury')
+            for i in range(writes_per_writer):
+                comment = make_comment(f'Comment {i} from writer {writer}', user, repo.get_article(1), datetime.today())
+                repo.add_comment(comment)
+                article_id = 10000 + writer * writes_per_writer + i
+                repo.add_article(Movies(date(2000 + i % 20, 1, 1), f'Movie {article_id}', '', '', '', article_id))
+        except Exception as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(8)]
+    writers = [threading.Thread(target=write, args=(writer,)) for writer in range(number_of_writers)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    writers_done.set()
+    for thread in readers:
+        thread.join()
+
+    assert errors == []
+    assert len(repo.get_comments()) == number_of_comments + number_of_writers * writes_per_writer
+    assert repo.get_number_of_articles() == 1000 + number_of_writers * writes_per_writer
+
+    # The Movies are still ordered by date.
+    articles = repo._articles
+    assert all(articles[i].date <= articles[i + 1].date for i in range(len(articles) - 1))
+
+
+def test_populate_shared_freezes_the_loaded_catalogue():
+    repo = MemoryRepository()
+    try:
+        memory_repository.populate_shared(TEST_DATA_PATH_MEMORY, repo)
+
+        assert repo.get_number_of_articles() == 1000
+        assert gc.get_freeze_count() > 0
+        assert gc.isenabled()
+    finally:
+        gc.unfreeze()
+
+
+def make_articles(first_id, dates):
+    return [
+        Movies(date.fromisoformat(article_date), f'Movie {first_id + i}', 'About it', 'link', 'image', first_id + i)
+        for i, article_date in enumerate(dates)
+    ]
+
+
+def test_bulk_added_articles_are_ordered_as_if_added_one_at_a_time():
+    dates = ['2010-02-28', '2008-02-28', '2010-02-28', '2012-02-28', '2008-02-28', '2010-02-28']
+    one_at_a_time = MemoryRepository()
+    bulk = MemoryRepository()
+
+    for batch in (make_articles(1, dates), make_articles(100, dates)):
+        for article in batch:
+            one_at_a_time.add_article(article)
+        bulk.add_articles(batch)
+
+    assert [article.id for article in bulk.get_articles_by_date(date.fromisoformat('2010-02-28'))] == \
+           [article.id for article in one_at_a_time.get_articles_by_date(date.fromisoformat('2010-02-28'))]
+    assert bulk.get_first_article().id == one_at_a_time.get_first_article().id
+    assert bulk.get_last_article().id == one_at_a_time.get_last_article().id
+    assert bulk.get_article(103) is not None
+    assert bulk.get_number_of_articles() == 12
+
+
+def test_repository_can_add_users_and_tags_in_bulk(in_memory_repo):
+    articles = make_articles(5000, ['2020-03-09', '2020-03-10'])
+    in_memory_repo.add_articles(articles)
+    tag = Tag('Motoring')
+    for article in articles:
+        make_tag_association(article, tag)
+
+    in_memory_repo.add_tags([tag])
+    in_memory_repo.add_users([User('Dave', '123456789'), User('Martin', '123456789')])
+
+    assert in_memory_repo.get_article_ids_for_tag('Motoring') == [5000, 5001]
+    assert in_memory_repo.get_user('Martin') == User('Martin', '123456789')
+    assert in_memory_repo.get_catalogue_bounds().last_date == date.fromisoformat('2020-03-10')
+
+
+def test_repository_adds_no_comments_from_a_batch_with_an_unattached_comment(in_memory_repo):
+    user = in_memory_repo.get_user('thorke')
+    comments = [
+        make_comment('Great movie', user, in_memory_repo.get_article(2), datetime.today()),
+        Comment(user, in_memory_repo.get_article(2), 'Not attached', datetime.today())
+    ]
+    number_of_comments = len(in_memory_repo.get_comments())
+
+    with pytest.raises(RepositoryException):
+        in_memory_repo.add_comments(comments)
+
+    assert len(in_memory_repo.get_comments()) == number_of_comments
+
+
+def test_repository_does_not_add_a_copy_of_an_attached_comment(in_memory_repo):
+    user = in_memory_repo.get_user('thorke')
+    article = in_memory_repo.get_article(2)
+    timestamp = datetime.today()
+    make_comment('Great movie', user, article, timestamp)
+    # Equal to the attached Comment, but not itself attached to the User or the Movies.
+    copy = Comment(user, article, 'Great movie', timestamp)
+
+    with pytest.raises(RepositoryException):
+        in_memory_repo.add_comment(copy)
+    with pytest.raises(RepositoryException):
+        in_memory_repo.add_comments([copy])
+
+
+def test_repository_pages_through_comments_for_an_article_newest_first(in_memory_repo):
+    user = in_memory_repo.get_user('thorke')
+    article = in_memory_repo.get_article(2)
+    timestamps = ['2020-03-01 10:00', '2020-03-03 10:00', '2020-03-02 10:00', '2020-03-02 10:00', '2020-03-04 10:00']
+    for i, timestamp in enumerate(timestamps):
+        in_memory_repo.add_comment(make_comment(f'Comment {i}', user, article, datetime.fromisoformat(timestamp)))
+
+    page = in_memory_repo.get_comments_for_article(2, limit=2)
+    assert [comment.comment for comment in page] == ['Comment 4', 'Comment 1']
+
+    # The next page doesn't stop part way through the two Comments made at the same time.
+    page = in_memory_repo.get_comments_for_article(2, before=page[-1].timestamp, limit=1)
+    assert [comment.comment for comment in page] == ['Comment 3', 'Comment 2']
+
+    page = in_memory_repo.get_comments_for_article(2, before=page[-1].timestamp, limit=2)
+    assert [comment.comment for comment in page] == ['Comment 0']
+
+    assert len(in_memory_repo.get_comments_for_article(2)) == 5
+    assert in_memory_repo.get_comments_for_article(5000) == []
+
+
+def test_repository_keeps_the_most_recent_comments(in_memory_repo):
+    # The seeded Comments, newest first.
+    assert [c.comment for c in in_memory_repo.get_recent_comments()] == [
+        'Yeah Freddie, bad news', 'Oh no, COVID-19 has hit New Zealand'
+    ]
+
+    user = in_memory_repo.get_user('thorke')
+    article = in_memory_repo.get_article(2)
+    in_memory_repo.add_comment(make_comment("Trump's onto it!", user, article))
+
+    recent = in_memory_repo.get_recent_comments(limit=1)
+    assert len(recent) == 1
+    assert (recent[0].username, recent[0].article_id, recent[0].comment) == ('thorke', 2, "Trump's onto it!")
+    assert recent[0].article_title == article.title
+
+
+def test_repository_recent_comments_are_bounded(in_memory_repo):
+    repo = MemoryRepository(recent_comments_size=3)
+    user = in_memory_repo.get_user('thorke')
+    article = in_memory_repo.get_article(2)
+    for i in range(5):
+        repo.add_comment(make_comment(f'Comment {i}', user, article))
+
+    assert [c.comment for c in repo.get_recent_comments()] == ['Comment 4', 'Comment 3', 'Comment 2']
+
+
+def test_repository_ranks_trending_movies(in_memory_repo):
+    user = in_memory_repo.get_user('thorke')
+    in_memory_repo.add_comment(make_comment('Comment', user, in_memory_repo.get_article(2)))
+    in_memory_repo.add_comment(make_comment('Comment', user, in_memory_repo.get_article(3)))
+    in_memory_repo.add_comment(make_comment('Comment', user, in_memory_repo.get_article(3)))
+
+    # The seeded Comments are from 2020, long outside every window.
+    assert in_memory_repo.get_trending_article_ids('hour') == [(3, 2), (2, 1)]
+
+    in_memory_repo.rebuild_trending()
+    assert in_memory_repo.get_trending_article_ids('week', limit=1) == [(3, 2)]
+
+
+def test_repository_pages_through_comments_by_a_user_newest_first(in_memory_repo):
+    user = in_memory_repo.get_user('thorke')
+    timestamps = ['2020-03-01 10:00', '2020-03-03 10:00', '2020-03-02 10:00', '2020-03-02 10:00']
+    for i, timestamp in enumerate(timestamps):
+        article = in_memory_repo.get_article(i + 2)
+        in_memory_repo.add_comment(make_comment(f'Comment {i}', user, article, datetime.fromisoformat(timestamp)))
+
+    page = in_memory_repo.get_comments_by_user('thorke', limit=2)
+    assert [comment.comment for comment in page] == ['Comment 1', 'Comment 3', 'Comment 2']
+
+    page = in_memory_repo.get_comments_by_user('thorke', before=page[-1].timestamp, limit=2)
+    assert [comment.comment for comment in page] == ['Comment 0', 'Yeah Freddie, bad news']
+
+    comments = in_memory_repo.get_comments_by_user('fmercury')
+    assert [comment.comment for comment in comments] == ['Oh no, COVID-19 has hit New Zealand']
+    assert in_memory_repo.get_comments_by_user('nobody') == []
+
+
+def test_repository_keeps_a_watchlist_for_each_user(in_memory_repo):
+    for article_id in [5, 2, 9, 2]:
+        in_memory_repo.add_to_watchlist('thorke', article_id)
+    in_memory_repo.add_to_watchlist('fmercury', 7)
+
+    assert in_memory_repo.get_watchlist('thorke') == [2, 5, 9]
+    assert in_memory_repo.get_watchlisted_article_ids('thorke', range(1, 1001)) == {2, 5, 9}
 
+    in_memory_repo.remove_from_watchlist('thorke', 5)
+    in_memory_repo.remove_from_watchlist('thorke', 6)
+    assert in_memory_repo.get_watchlist('thorke') == [2, 9]
+    assert in_memory_repo.get_watchlist('fmercury') == [7]
+    assert in_memory_repo.get_watchlist('nobody') == []
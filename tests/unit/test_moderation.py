@@ -0,0 +1,62 @@
+import pytest
+from better_profanity import profanity
+
+from chillax.domain.model import User, Movies, make_comment
+from chillax.news import moderation
+from chillax.news.moderation import ProfanityFilter
+
+
+@pytest.fixture
+def profanity_filter():
+    return ProfanityFilter(['shit', 'ass', 'blow job'])
+
+
+def test_filter_finds_whole_words_in_any_case(profanity_filter):
+    assert profanity_filter.contains_profanity('Well, SHIT.')
+    assert profanity_filter.contains_profanity('ass')
+    assert not profanity_filter.contains_profanity('A classic, worth the pass')
+    assert not profanity_filter.contains_profanity('')
+
+
+def test_filter_finds_leetspeak_spellings(profanity_filter):
+    assert profanity_filter.contains_profanity('5h1t happens')
+    assert profanity_filter.contains_profanity('what an 4$$')
+    assert not profanity_filter.contains_profanity('5h!t happens')
+
+
+def test_filter_finds_phrases_across_whitespace(profanity_filter):
+    assert profanity_filter.contains_profanity('a bl0w \n job')
+    assert not profanity_filter.contains_profanity('blow the job')
+
+
+def test_filter_censors_profane_words(profanity_filter):
+    assert profanity_filter.censor('Oh shit, not again') == 'Oh ****, not again'
+
+
+def test_filter_finds_profane_texts_in_a_batch(profanity_filter):
+    texts = ['fine', 'shit', 'also fine', 'ass and shit', 'sh', 'it']
+    assert profanity_filter.find_profane(texts) == [1, 3]
+    assert profanity_filter.find_profane([]) == []
+
+
+def test_filter_finds_no_phrase_spanning_two_texts_in_a_batch():
+    profanity_filter = ProfanityFilter(['blow job'])
+    assert profanity_filter.find_profane(['I hate that blow', 'job was fine']) == []
+    assert profanity_filter.find_profane(['I hate that blow', 'a blow job']) == [1]
+
+
+def test_default_filter_agrees_with_better_profanity():
+    texts = [
+        'This movie was great', 'What a classic', 'Sh1t happens', 'You are an a55', 'assassin', 'Hello hell',
+        'bl0w job', 'Scunthorpe', 'pass the salt', 'bitches', 'FUCK!', '_fuck_', "'shit'", '2 girls 1 cup'
+    ]
+    for text in texts:
+        assert moderation.contains_profanity(text) == profanity.contains_profanity(text), text
+
+
+def test_profane_comments_are_found_among_existing_comments():
+    user = User('dbowie', '1234567890')
+    article = Movies(None, 'Movie', 'About it', 'link', 'image', 1)
+    comments = [make_comment(text, user, article) for text in ['Loved it', 'Sh1t ending', 'Fine']]
+
+    assert moderation.find_profane_comments(comments) == [comments[1]]
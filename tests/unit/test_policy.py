@@ -0,0 +1,42 @@
+import pytest
+
+from chillax.authentication.policy import CredentialPolicy, UsernameBloomFilter
+
+
+@pytest.fixture
+def policy():
+    return CredentialPolicy(['thorke', 'fmercury'])
+
+
+def test_bloom_filter_contains_every_added_username():
+    bloom_filter = UsernameBloomFilter(capacity=1000)
+    usernames = [f'user{i}' for i in range(1000)]
+    for username in usernames:
+        bloom_filter.add(username)
+
+    assert all(bloom_filter.might_contain(username) for username in usernames)
+
+
+def test_bloom_filter_false_positive_rate_is_near_its_target():
+    bloom_filter = UsernameBloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom_filter.add(f'user{i}')
+
+    false_positives = sum(bloom_filter.might_contain(f'other{i}') for i in range(10000))
+    assert false_positives < 300
+
+
+def test_policy_knows_taken_usernames(policy):
+    assert policy.username_might_be_taken('thorke')
+    assert not policy.username_might_be_taken('jz')
+
+    policy.record_username('jz')
+    assert policy.username_might_be_taken('jz')
+
+
+def test_policy_checks_password_rules(policy):
+    assert policy.password_is_valid('abcd1A23')
+    assert not policy.password_is_valid('abcd1A2')
+    assert not policy.password_is_valid('abcdefgh1')
+    assert not policy.password_is_valid('ABCDEFGH1')
+    assert not policy.password_is_valid('abcdEFGH')
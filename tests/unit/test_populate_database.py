@@ -6,13 +6,15 @@ from chillax.adapters.orm import metadata
 def test_database_populate_inspect_table_names(database_engine):
     # Get table information
     inspector = inspect(database_engine)
-    assert inspector.get_table_names() == ['article_tags', 'articles', 'comments', 'tags', 'users']
+    assert inspector.get_table_names() == [
+        'article_tags', 'articles', 'comments', 'schema_version', 'tags', 'users', 'watchlist'
+    ]
 
 
 def test_database_populate_select_all_tags(database_engine):
     # Get table information
     inspector = inspect(database_engine)
-    name_of_tags_table = inspector.get_table_names()[3]
+    name_of_tags_table = inspector.get_table_names()[4]
 
     with database_engine.connect() as connection:
         # query for records in table tags
@@ -49,7 +51,7 @@ def test_database_populate_select_all_tags(database_engine):
 def test_database_populate_select_all_users(database_engine):
     # Get table information
     inspector = inspect(database_engine)
-    name_of_users_table = inspector.get_table_names()[4]
+    name_of_users_table = inspector.get_table_names()[5]
 
     with database_engine.connect() as connection:
         # query for records in table users
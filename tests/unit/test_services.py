@@ -2,6 +2,7 @@ from datetime import date
 
 import pytest
 
+from chillax.authentication.policy import CredentialPolicy
 from chillax.authentication.services import AuthenticationException
 from chillax.news import services as news_services
 from chillax.authentication import services as auth_services
@@ -29,6 +30,23 @@ def test_cannot_add_user_with_existing_name(in_memory_repo):
         auth_services.add_user(username, password, in_memory_repo)
 
 
+def test_cannot_add_user_with_existing_name_known_to_the_policy(in_memory_repo):
+    policy = CredentialPolicy(in_memory_repo.get_usernames())
+
+    with pytest.raises(auth_services.NameNotUniqueException):
+        auth_services.add_user('thorke', 'abcd1A23', in_memory_repo, policy)
+
+
+def test_adding_user_records_username_in_the_policy(in_memory_repo):
+    policy = CredentialPolicy(in_memory_repo.get_usernames())
+
+    auth_services.add_user('jz', 'abcd1A23', in_memory_repo, policy)
+
+    assert policy.username_might_be_taken('jz')
+    with pytest.raises(auth_services.NameNotUniqueException):
+        auth_services.add_user('jz', 'abcd1A23', in_memory_repo, policy)
+
+
 def test_authentication_with_valid_credentials(in_memory_repo):
     new_username = 'pmccartney'
     new_password = 'abcd1A23'
@@ -155,3 +173,80 @@ def test_get_comments_for_article(in_memory_repo):
 def test_get_comments_for_article_without_comments(in_memory_repo):
     comments_as_dict = news_services.get_comments_for_article(2, in_memory_repo)
     assert len(comments_as_dict) == 0
+
+
+def test_article_dicts_reference_tags_by_name_only(in_memory_repo):
+    article_as_dict = news_services.get_article(1, in_memory_repo)
+
+    for tag_as_dict in article_as_dict['tags']:
+        assert list(tag_as_dict.keys()) == ['name']
+
+
+def test_article_dicts_are_reused_until_the_article_changes(in_memory_repo, monkeypatch):
+    conversions = list()
+    article_to_dict = news_services.article_to_dict
+    monkeypatch.setattr(news_services, 'article_to_dict',
+                        lambda *args: conversions.append(args[0].id) or article_to_dict(*args))
+
+    first = news_services.get_article(3, in_memory_repo)
+    second = news_services.get_article(3, in_memory_repo)
+    assert conversions == [3]
+
+    # Each caller gets its own copy, down to the comment and tag dicts, so changing one doesn't change the others.
+    first['comments'].append({'comment_text': 'Not stored'})
+    first['tags'][0]['url'] = '/articles_by_tag?tag=Not+stored'
+    third = news_services.get_article(3, in_memory_repo)
+    assert third == second
+    assert third['comments'] is not second['comments']
+
+    news_services.add_comment(3, 'A comment that changes the article', 'fmercury', in_memory_repo)
+    fourth = news_services.get_article(3, in_memory_repo)
+
+    assert conversions == [3, 3]
+    assert len(fourth['comments']) == len(second['comments']) + 1
+
+
+def test_get_articles_by_id_without_comments(in_memory_repo):
+    articles_as_dict = news_services.get_articles_by_id([1], in_memory_repo, include_comments=False)
+
+    assert 'comments' not in articles_as_dict[0]
+    assert articles_as_dict[0]['number_of_comments'] == 2
+
+
+def test_cursor_round_trips_an_article_id():
+    cursor = news_services.encode_cursor(42)
+
+    assert cursor != '42'
+    assert news_services.decode_cursor(cursor) == 42
+
+
+def test_malformed_cursor_is_ignored():
+    assert news_services.decode_cursor('not a cursor!') is None
+    assert news_services.decode_cursor(None) is None
+
+
+def test_get_page_of_article_ids():
+    article_ids = list(range(1, 12))
+
+    page, prev_cursor, next_cursor, last_cursor = news_services.get_page_of_article_ids(article_ids, None, 5)
+    assert page == [1, 2, 3, 4, 5]
+    assert prev_cursor is None
+    assert news_services.decode_cursor(next_cursor) == 6
+    assert news_services.decode_cursor(last_cursor) == 11
+
+    page, prev_cursor, next_cursor, last_cursor = news_services.get_page_of_article_ids(article_ids, next_cursor, 5)
+    assert page == [6, 7, 8, 9, 10]
+    assert news_services.decode_cursor(prev_cursor) == 1
+
+    page, prev_cursor, next_cursor, last_cursor = news_services.get_page_of_article_ids(article_ids, last_cursor, 5)
+    assert page == [11]
+    assert next_cursor is None and last_cursor is None
+
+
+def test_can_find_profane_comments(in_memory_repo):
+    assert news_services.get_profane_comments(in_memory_repo) == []
+
+    news_services.add_comment(2, 'What a load of sh1t', 'fmercury', in_memory_repo)
+
+    comments = news_services.get_profane_comments(in_memory_repo)
+    assert [comment['comment_text'] for comment in comments] == ['What a load of sh1t']
@@ -0,0 +1,35 @@
+from chillax.adapters.tag_dictionary import TagDictionary, normalize_tag_name, split_tag_names, tag_key
+
+
+def test_tag_names_are_normalized():
+    assert normalize_tag_name('  Science   Fiction ') == 'Science Fiction'
+    assert split_tag_names('Action, Adventure ,,Sci-Fi') == ['Action', 'Adventure', 'Sci-Fi']
+
+
+def test_repeated_tag_names_are_dropped():
+    assert split_tag_names('Drama,drama, Drama,Comedy') == ['Drama', 'Comedy']
+
+
+def test_tag_names_are_interned_as_ids_in_the_order_first_seen():
+    dictionary = TagDictionary()
+
+    assert dictionary.intern('Action') == 1
+    assert dictionary.intern('Drama') == 2
+    assert dictionary.intern(' action') == 1
+    assert len(dictionary) == 2
+    assert list(dictionary.items()) == [(1, 'Action'), (2, 'Drama')]
+
+
+def test_tag_names_are_looked_up_without_interning():
+    dictionary = TagDictionary()
+    dictionary.intern('Sci-Fi')
+
+    assert dictionary.id_of('SCI-FI ') == 1
+    assert dictionary.name_of(1) == 'Sci-Fi'
+    assert dictionary.id_of('Western') is None
+    assert len(dictionary) == 1
+
+
+def test_tag_names_fold_only_ascii_letters_as_the_database_does():
+    assert tag_key(' SCI-FI ') == 'sci-fi'
+    assert tag_key('ÉPOQUE') == 'Époque'
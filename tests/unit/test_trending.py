@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from chillax.adapters.trending import TrendingCounters
+
+
+class Clock:
+    def __init__(self, now: datetime):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock(datetime(2020, 3, 1, 12, 0))
+
+
+def test_trending_counters_rank_movies_by_comments_in_each_window(clock):
+    trending = TrendingCounters(clock=clock)
+    trending.add(1, clock.now - timedelta(minutes=10))
+    trending.add(2, clock.now - timedelta(hours=3))
+    trending.add(2, clock.now - timedelta(hours=4))
+    trending.add(3, clock.now - timedelta(days=3))
+    # Older than every window, so never counted.
+    trending.add(4, clock.now - timedelta(days=30))
+
+    assert trending.top('hour') == [(1, 1)]
+    assert trending.top('day') == [(2, 2), (1, 1)]
+    assert trending.top('week') == [(2, 2), (1, 1), (3, 1)]
+    assert trending.top('week', limit=1) == [(2, 2)]
+
+    with pytest.raises(KeyError):
+        trending.top('year')
+
+
+def test_trending_counters_slide_forward_with_time(clock):
+    trending = TrendingCounters(clock=clock)
+    trending.add(1, clock.now)
+    trending.add(1, clock.now)
+    trending.add(2, clock.now - timedelta(minutes=30))
+
+    clock.now += timedelta(minutes=45)
+    assert trending.top('hour') == [(1, 2)]
+
+    clock.now += timedelta(minutes=20)
+    trending.add(3, clock.now)
+    assert trending.top('hour') == [(3, 1)]
+    assert trending.top('day') == [(1, 2), (2, 1), (3, 1)]
+
+    clock.now += timedelta(weeks=2)
+    assert trending.top('week') == []
+
+
+def test_trending_counters_keep_only_their_capacity_of_top_movies(clock):
+    trending = TrendingCounters(capacity=2, clock=clock)
+    for article_id, count in [(1, 1), (2, 2), (3, 3), (4, 4)]:
+        for _ in range(count):
+            trending.add(article_id, clock.now)
+
+    assert trending.top('day', limit=5) == [(4, 4), (3, 3)]
+
+    # Once the top Movies' Comments have left the window, the next most commented take their place.
+    trending.add(5, clock.now + timedelta(minutes=50))
+    trending.add(5, clock.now + timedelta(minutes=50))
+    clock.now += timedelta(minutes=70)
+    assert trending.top('hour', limit=5) == [(5, 2)]
+
+
+def test_trending_counters_can_be_replayed(clock):
+    trending = TrendingCounters(clock=clock)
+    trending.add(9, clock.now)
+
+    trending.replay([(1, clock.now), (2, clock.now), (2, clock.now)])
+
+    assert trending.top('hour') == [(2, 2), (1, 1)]
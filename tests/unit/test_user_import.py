@@ -0,0 +1,74 @@
+import pytest
+
+from chillax.authentication import services as auth_services
+from chillax.authentication.policy import CredentialPolicy
+from chillax.authentication.user_import import import_users, read_credentials
+
+
+USERS_CSV = [
+    'id,username,password\n',
+    '1,jz,abcd1A23\n',
+    '2,thorke,abcd1A23\n',
+    '3,pmccartney,short\n',
+    '4,jlennon,abcd1A23\n',
+    '5,jlennon,efgh4B56\n',
+    '6,rstarr,abcd1A23\n',
+]
+
+
+def test_read_credentials_streams_usernames_and_passwords():
+    assert list(read_credentials(USERS_CSV[:3])) == [(2, 'jz', 'abcd1A23'), (3, 'thorke', 'abcd1A23')]
+
+
+def test_read_credentials_requires_username_and_password_columns():
+    with pytest.raises(ValueError):
+        list(read_credentials(['id,name\n', '1,jz\n']))
+
+
+def test_import_users_in_batches(in_memory_repo):
+    policy = CredentialPolicy(in_memory_repo.get_usernames())
+    hashed_batches = list()
+    rejects = list()
+
+    def hash_passwords(passwords):
+        hashed_batches.append(len(passwords))
+        return auth_services.hash_in_turn(passwords)
+
+    report = import_users(read_credentials(USERS_CSV), in_memory_repo, policy, batch_size=2,
+                          hash_passwords=hash_passwords, reject=lambda *reject: rejects.append(reject))
+
+    assert (report.imported, report.rejected) == (2, 4)
+    assert rejects == [
+        (2, 'jz', CredentialPolicy.USERNAME_MESSAGE),
+        (3, 'thorke', auth_services.USERNAME_TAKEN),
+        (4, 'pmccartney', CredentialPolicy.PASSWORD_MESSAGE),
+        (6, 'jlennon', auth_services.USERNAME_TAKEN),
+    ]
+    # A batch with no users to add encrypts no passwords.
+    assert hashed_batches == [1, 1]
+
+    auth_services.authenticate_user('jlennon', 'abcd1A23', in_memory_repo)
+    auth_services.authenticate_user('rstarr', 'abcd1A23', in_memory_repo)
+    assert policy.username_might_be_taken('rstarr')
+
+
+def test_import_users_checks_each_user_against_the_repository_the_import_and_the_policy(in_memory_repo):
+    policy = CredentialPolicy(in_memory_repo.get_usernames())
+    credentials = [
+        (1, 'jzappa', 'abcd1A23'), (2, 'thorke', 'abcd1A23'), (3, 'pmccartney', 'short'), (4, 'jzappa', 'efgh4B56')
+    ]
+    rejects = list()
+
+    report = import_users(credentials, in_memory_repo, policy, reject=lambda *reject: rejects.append(reject))
+
+    assert (report.imported, report.rejected) == (1, 3)
+    assert rejects == [
+        (2, 'thorke', auth_services.USERNAME_TAKEN),
+        (3, 'pmccartney', CredentialPolicy.PASSWORD_MESSAGE),
+        (4, 'jzappa', auth_services.USERNAME_TAKEN),
+    ]
+    # The first of the duplicated usernames is added, with its password encrypted.
+    assert auth_services.get_user('jzappa', in_memory_repo)['password'].startswith('pbkdf2:sha256:')
+    auth_services.authenticate_user('jzappa', 'abcd1A23', in_memory_repo)
+    assert in_memory_repo.get_user('pmccartney') is None
+    assert policy.username_might_be_taken('jzappa')